@@ -1,23 +1,48 @@
 import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 import matplotlib.pyplot as plt
-import yfinance as yf
+import numpy as np
 import pandas as pd
-import tqdm
 
+import schedules
+
+import price_store
 
 _SP500_TICKER = '^GSPC'
 _NASDAQ_TICKER = '^IXIC'
 
+# 输出文件名前缀，其他代码使用代码本身（去掉 ^ 等符号，小写）
+_PREFIXES = {_SP500_TICKER: 'sp500', _NASDAQ_TICKER: 'nasdaq'}
+
+_STRATEGY_NAMES = {'ls': '梭哈', 'dca': '定投'}
+
+_STATS_FILE = 'stats.csv'
+_BOOTSTRAP_STATS_FILE = 'bootstrap_stats.csv'
+_STRATEGY_STATS_FILE = 'strategy_stats.csv'
+
 _DCA = 100000
 _TOTAL = 1000000
+# 定投间隔（交易日，约一个月）
+_DCA_STEP = 22
 
 _FIELDS = ['date', 'yield', 'avg_yield']
 
 _NUM_YEARS = [10, 20, 30]
 
+# 区块自助法（bootstrap）: 合成路径的每年交易日数、平均区块长度（交易日），
+# 每块生成的价格数上限（路径数 × 交易日数，约 32MB），以及输出的分位数
+_TRADING_DAYS = 252
+_BLOCK_LENGTH = 250
+_BOOTSTRAP_CELLS = 4000000
+_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
 def download_data(ticker):
-    data = yf.download(ticker, start='1920-01-01', end=pd.to_datetime('today').strftime('%Y-%m-%d'))
+    data = price_store.get_history(ticker, start='1920-01-01', end=pd.to_datetime('today').strftime('%Y-%m-%d'))
     return data
 
 
@@ -36,101 +61,552 @@ def save_figure(df, title: str, file_name: str) -> None:
     plt.close()
 
 
-def is_dca_date(day, index, df):
-    if day == 15:
-        return True
-    if day > 15:
-        return False
-    if index + 1 < len(df) and df.iloc[index + 1]['Date'].day > 15:
-        return True
-    return False
+def compute_avg_yield(total_invested, total_value, num_year):
+    """年化收益（%），总投入为0的位置为 NaN"""
+    invested = np.asarray(total_invested, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(invested != 0, np.asarray(total_value, dtype=np.float64) / invested, np.nan)
+        return (np.power(ratio, 1 / num_year) - 1) * 100
+
 
+def strided_prefix_sum(values, step):
+    """沿最后一维按步长累加的前缀和: prefix[j] = values[j] + values[j - step] + values[j - 2*step] + ..."""
+    n = values.shape[-1]
+    batch = values.shape[:-1]
+    padded = np.concatenate([values, np.zeros(batch + (-n % step,))], axis=-1)
+    return padded.reshape(batch + (-1, step)).cumsum(axis=-2).reshape(batch + (-1,))[..., :n]
 
-def compute_avg_yield(total_invested, total_value, num_year):
-    return ((total_value / total_invested) ** (1 / num_year) - 1) * 100
-
-
-def simulate_dca(df, num_year):
-    df = df.reset_index()
-    result = pd.DataFrame(columns=_FIELDS)
-    for outer_index, row in tqdm.tqdm(df.iterrows(), total=len(df)):
-        end_date = row['Date'] + pd.DateOffset(years=num_year)
-        end_result = df.loc[df['Date'] > end_date]
-        if end_result.empty:
-            break
-        else:
-            end_row = end_result.iloc[0]
-        num_shares = 0
-        total_invested = 0
-        for inner_index in range(outer_index + 1, len(df), 22):
-            inner_row = df.iloc[inner_index]
-            investing = _DCA
-            num_shares += investing / inner_row['Close']
-            total_invested += investing
-            if inner_row['Date'] > end_date:
-                break
-        total = num_shares * end_row['Close']
-        if total_invested != 0:
-            new_column = {
-                'date': row['Date'], 'yield': total / total_invested, 'avg_yield': compute_avg_yield(total_invested, total, num_year)
-            }
-            result = pd.concat([result if not result.empty else None, pd.DataFrame([new_column])], ignore_index=True)
-    result['date'] = pd.to_datetime(result['date'], format='%Y-%m')
+
+def dca_totals(close, end, step=_DCA_STEP, amount=_DCA, start=None):
+    """
+    所有起始日的定投结果（向量化）
+
+    起始日 i 从第 i+1 个交易日开始每隔 step 个交易日投入 amount，直到第一笔晚于结束日的投入（含）为止，
+    不超过最后一个交易日。每个交易日买入的份额（amount / 收盘价）按步长做前缀和，
+    起始日 i 的总份额就是两个前缀和之差
+
+    参数:
+        close: 收盘价数组，也可以是 (路径数, 交易日数) 的多条价格路径
+        end: 每个起始日的结束位置（end_positions 的结果，可以是 (期限数, 交易日数) 的二维数组）
+        start: 起始日位置，默认所有交易日；最后一维与 end 的最后一维对应
+
+    返回:
+        (总投入, 结束日市值)，总投入的形状与 end 相同，结束日市值为 close 的前几维 + end 的形状；
+        没有结束日的位置为 NaN
+    """
+    n = close.shape[-1]
+    prefix = strided_prefix_sum(amount / close, step)
+    first = (np.arange(n) if start is None else np.asarray(start, dtype=np.int64)) + 1
+    valid = (end < n) & (first < n)
+    end = np.where(valid, end, n - 1)
+    first = np.broadcast_to(np.minimum(first, n - 1), end.shape)
+
+    # 投入次数: 到达结束位置所需的次数（向上取整）和数据末尾允许的次数取较小者
+    count = np.minimum(-((first - end) // step), (n - 1 - first) // step) + 1
+    last = first + (count - 1) * step
+    before = first - step
+    shares = prefix[..., last] - np.where(before >= 0, prefix[..., np.maximum(before, 0)], 0.0)
+
+    invested = np.where(valid, count * float(amount), np.nan)
+    total = np.where(valid, shares * close[..., end], np.nan)
+    return invested, total
+
+
+def _schedule_window(schedule, n, end):
+    """每个起始日在日程中的投入区间 [lo, hi): 从起始日之后的第一次投入到第一个不早于结束位置的投入（含）"""
+    lo = np.searchsorted(schedule, np.arange(n) + 1, side='left')
+    hi = np.maximum(np.minimum(np.searchsorted(schedule, end, side='left') + 1, len(schedule)), lo)
+    return np.broadcast_to(lo, hi.shape), hi
+
+
+def schedule_totals(close, schedule, end, amounts=_DCA):
+    """
+    按预先计算的定投日程（交易日位置数组，见 schedules.py）计算所有起始日的定投结果
+
+    起始日 i 在日程中晚于 i 的交易日投入，直到日程中第一个不早于结束日的投入（含）为止，
+    与 dca_totals（-s rows）的结束规则相同。每次投入买入的份额按日程做前缀和，每个起始日的总份额、总投入都是两个前缀和之差
+
+    参数:
+        schedule: 升序的投入日位置数组
+        end: 每个起始日的结束位置，可以是 (期限数, 交易日数) 的二维数组
+        amounts: 每次投入的金额，标量、与 schedule 等长的数组，或 (策略数, 投入次数) 的二维数组（多个策略一次计算）
+
+    返回:
+        (总投入, 结束日市值)，形状为 amounts 的前几维 + end 的形状；没有结束日或期间没有投入的位置为 NaN
+    """
+    n = len(close)
+    schedule = np.asarray(schedule, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    amounts = np.broadcast_to(amounts, amounts.shape[:-1] + schedule.shape)
+    zeros = np.zeros(amounts.shape[:-1] + (1,))
+    shares = np.concatenate([zeros, np.cumsum(amounts / close[schedule], axis=-1)], axis=-1)
+    paid = np.concatenate([zeros, np.cumsum(amounts, axis=-1)], axis=-1)
+
+    lo, hi = _schedule_window(schedule, n, end)
+    valid = (end < n) & (hi > lo)
+    invested = np.where(valid, paid[..., hi] - paid[..., lo], np.nan)
+    total = np.where(valid, (shares[..., hi] - shares[..., lo]) * close[np.minimum(end, n - 1)], np.nan)
+    return invested, total
+
+
+def value_averaging_totals(close, schedule, end, amount=_DCA):
+    """
+    价值平均: 第 k 次投入后持仓市值补足到 k * amount（市值超过目标时卖出），其他规则同 schedule_totals
+
+    投入额取决于从哪天开始（目标从起始日起增长），不能表示为所有起始日共用的投入向量。
+    第 k 次（k >= 2）投入 = k * amount - (k - 1) * amount * r，r 为本次与上次投入日的价格比，
+    对 r 和 (日程位置 × r) 做前缀和后，每个起始日的总投入仍是前缀和之差；最终份额 = 目标市值 / 最后一次投入日的价格
+
+    返回:
+        (净投入, 结束日市值)，没有结束日或期间没有投入的位置为 NaN
+    """
+    n = len(close)
+    schedule = np.asarray(schedule, dtype=np.int64)
+    price = close[schedule]
+    ratio = np.concatenate([[0.0], price[1:] / price[:-1]])
+    ratio_sum = np.concatenate([[0.0], np.cumsum(ratio)])
+    weighted_sum = np.concatenate([[0.0], np.cumsum(np.arange(len(schedule)) * ratio)])
+
+    lo, hi = _schedule_window(schedule, n, end)
+    valid = (end < n) & (hi > lo)
+    count = hi - lo
+    # 第一次投入（k = 1）之后的 sum((j - lo) * r_j)，j 为日程中的序号
+    after = np.minimum(lo + 1, hi)
+    drift = weighted_sum[hi] - weighted_sum[after] - lo * (ratio_sum[hi] - ratio_sum[after])
+    invested = np.where(valid, amount * (count * (count + 1) / 2 - drift), np.nan)
+    last = np.where(valid, schedule[np.maximum(hi - 1, 0)], 0)
+    total = np.where(valid, count * amount / close[last] * close[np.minimum(end, n - 1)], np.nan)
+    return invested, total
+
+
+def strategy_signals(df, cape=None):
+    """
+    与交易日对齐的信号数组，作为策略的输入
+
+    close 收盘价，drawdown 距历史最高收盘价的回撤（<= 0），cape 为当天已知的最近一个月的 CAPE（没有数据时为 NaN）
+    """
+    close = close_prices(df)
+    signals = {'close': close, 'drawdown': close / np.maximum.accumulate(close) - 1}
+    if cape is not None:
+        signals['cape'] = cape.sort_index().reindex(df.index, method='ffill').to_numpy(dtype=np.float64)
+    return signals
+
+
+def load_cape():
+    """Shiller CAPE 月度数据（../sp500_cape_analysis），只在使用 CAPE 策略时下载"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sp500_cape_analysis'))
+    import sp500_cape_returns
+    return sp500_cape_returns.get_shiller_cape()['CAPE']
+
+
+def fixed_amount(amount=_DCA):
+    """每次投入固定金额（普通定投）"""
+    return lambda signals: np.full(len(signals['close']), float(amount))
+
+
+def cape_multiplier(threshold=20, multiple=2, amount=_DCA):
+    """CAPE 低于 threshold 时投入 multiple 倍，没有 CAPE 数据（例如数据开始之前）时投入 amount"""
+    return lambda signals: np.where(np.isfinite(signals['cape']) & (signals['cape'] < threshold),
+                                    multiple * amount, float(amount))
+
+
+def drawdown_multiplier(threshold=0.2, multiple=2, amount=_DCA):
+    """距历史最高点回撤超过 threshold 时投入 multiple 倍"""
+    return lambda signals: np.where(signals['drawdown'] <= -threshold, multiple * amount, float(amount))
+
+
+# 策略: 信号 -> 每个交易日的投入金额（只在定投日程中的交易日投入），所有策略共用同一份价格和日程一次计算。
+# 信号缺失时由策略自己决定投入多少，投入日的金额必须是有限值
+STRATEGIES = {
+    'dca': fixed_amount(),
+    'cape-2x': cape_multiplier(),
+    'drawdown-2x': drawdown_multiplier(),
+    'drawdown-3x': drawdown_multiplier(0.3, 3),
+}
+
+# 价值平均的投入额与起始日有关，由 value_averaging_totals 单独计算
+_VALUE_AVERAGING = 'value-averaging'
+
+
+def simulate_strategies(df, years, schedule, strategies, signals):
+    """
+    在同一份价格、同一个日程上一次计算多个策略、多个期限，返回 {策略名: {期限: 按起始年份平均的结果}}
+
+    strategies: {名称: 策略函数}，名称为 _VALUE_AVERAGING 时函数不使用（可以为 None）
+
+    价值平均在期间卖出较多时净投入可能 <= 0，这些起始日没有收益率，不参与平均，
+    每个结果的 attrs['excluded'] 记录被排除的起始日数
+    """
+    close = close_prices(df)
+    end = np.stack([end_positions(df.index, num_year) for num_year in years])
+    names = [name for name in strategies if name != _VALUE_AVERAGING]
+    amounts = np.stack([np.broadcast_to(np.asarray(strategies[name](signals), dtype=np.float64), close.shape)[schedule]
+                        for name in names]) if names else np.zeros((0, len(schedule)))
+    for name, row in zip(names, amounts):
+        missing = np.count_nonzero(~np.isfinite(row))
+        if missing:
+            raise ValueError(f"策略 {name} 在 {missing} 个投入日没有给出有限的投入金额")
+    invested, total = schedule_totals(close, schedule, end, amounts)
+    outcomes = dict(zip(names, zip(invested, total)))
+    if _VALUE_AVERAGING in strategies:
+        outcomes[_VALUE_AVERAGING] = value_averaging_totals(close, schedule, end)
+
+    results = {}
+    for name in strategies:
+        invested, total = outcomes[name]
+        results[name] = {}
+        for row, num_year in enumerate(years):
+            finite = np.isfinite(invested[row])
+            valid = finite & (invested[row] > 0)
+            result = group_by_year(df.index[valid], invested[row, valid], total[row, valid], num_year)
+            result.attrs['excluded'] = int(np.count_nonzero(finite & ~valid))
+            results[name][num_year] = result
+    return results
+
+
+def group_by_year(dates, invested, total, num_year):
+    """每个起始日的收益按起始年份取平均"""
+    result = pd.DataFrame({
+        'date': dates, 'yield': total / invested, 'avg_yield': compute_avg_yield(invested, total, num_year)
+    })
     result['year'] = result['date'].dt.year
-    grouped_result = result.groupby('year').mean()
-    return grouped_result
+    return result.groupby('year').mean()
+
+
+def simulate_dca_horizons(df, years, schedule=None):
+    """
+    一次计算多个持有期限的定投结果，返回 {期限: 按起始年份平均的结果}
+
+    schedule: 定投日程（交易日位置数组）；为None时沿用每隔 _DCA_STEP 个交易日投入一次
+    """
+    close = close_prices(df)
+    end = np.stack([end_positions(df.index, num_year) for num_year in years])
+    if schedule is None:
+        invested, total = dca_totals(close, end)
+    else:
+        invested, total = schedule_totals(close, schedule, end)
+    results = {}
+    for row, num_year in enumerate(years):
+        valid = np.isfinite(invested[row])
+        results[num_year] = group_by_year(df.index[valid], invested[row, valid], total[row, valid], num_year)
+    return results
+
+
+def simulate_dca(df, num_year, schedule=None):
+    return simulate_dca_horizons(df, [num_year], schedule)[num_year]
+
+
+def close_prices(df):
+    """收盘价数组（新版 yfinance 返回 (字段, 代码) 两层列名，取第一个代码）"""
+    close = df['Close']
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+    return close.to_numpy(dtype=np.float64)
+
+
+def end_positions(dates, num_year):
+    """
+    每个起始日持有 num_year 年后的结束位置: 第一个晚于 起始日 + num_year 年 的交易日
+
+    dates 为升序的 DatetimeIndex，一次 searchsorted 求出所有起始日的结果；没有结束日时为 len(dates)
+    """
+    end_dates = dates + pd.DateOffset(years=num_year)
+    return dates.searchsorted(end_dates, side='right')
 
 
 def simulate_ls(df, num_year):
-    result = pd.DataFrame(columns=_FIELDS)
-    for index, row in tqdm.tqdm(df.iterrows(), total=len(df)):
-        end_date = index + pd.DateOffset(years=num_year)
-        end_result = df.loc[df.index > end_date]
-        if end_result.empty:
-            break
-        else:
-            end_row = end_result.iloc[0]
-        num_shares = _TOTAL / row['Close']
-        total = num_shares * end_row['Close']
-        new_column = {
-            'date': index, 'yield': total / _TOTAL, 'avg_yield': compute_avg_yield(_TOTAL, total, num_year)
-        }
-        result = pd.concat([result if not result.empty else None, pd.DataFrame([new_column])], ignore_index=True)
-    result['date'] = pd.to_datetime(result['date'], format='%Y-%m')
+    close = close_prices(df)
+    end = end_positions(df.index, num_year)
+    # 结束日随起始日单调不减，有结果的起始日是开头的一段
+    count = int(np.count_nonzero(end < len(df)))
+    num_shares = _TOTAL / close[:count]
+    total = num_shares * close[end[:count]]
+    result = pd.DataFrame({
+        'date': df.index[:count], 'yield': total / _TOTAL, 'avg_yield': compute_avg_yield(_TOTAL, total, num_year)
+    })
     result = result.reset_index()
     result['year'] = result['date'].dt.year
     grouped_result = result.groupby('year').mean()
     return grouped_result
 
 
+def bootstrap_indices(rng, n, num_paths, length, block=_BLOCK_LENGTH):
+    """
+    stationary block bootstrap 的抽样位置 (路径数, length)
+
+    每天以 1/block 的概率开始一个新区块（起点随机），否则取上一天的下一个位置（到末尾后回到开头），
+    区块长度服从平均为 block 的几何分布
+    """
+    t = np.arange(length)
+    new_block = rng.random((num_paths, length)) < 1 / block
+    new_block[:, 0] = True
+    block_start = np.maximum.accumulate(np.where(new_block, t, 0), axis=1)
+    origin = np.take_along_axis(rng.integers(0, n, size=(num_paths, length)), block_start, axis=1)
+    return (origin + t - block_start) % n
+
+
+def bootstrap_paths(log_returns, rng, num_paths, length, block=_BLOCK_LENGTH):
+    """由历史日对数收益合成的价格路径 (路径数, length + 1)，起点为1"""
+    idx = bootstrap_indices(rng, len(log_returns), num_paths, length, block)
+    paths = np.empty((num_paths, length + 1))
+    paths[:, 0] = 1.0
+    np.cumsum(log_returns[idx], axis=1, out=paths[:, 1:])
+    np.exp(paths[:, 1:], out=paths[:, 1:])
+    return paths
+
+
+def bootstrap_yields(paths, years, step=_DCA_STEP, amount=_DCA):
+    """
+    每条路径从第一天起持有各期限的年化收益，返回 {(策略, 期限): 数组}
+
+    梭哈在第一天买入；定投直接使用 dca_totals（起始日为第一天），所有路径、所有期限一次计算
+    """
+    ends = np.array([num_year * _TRADING_DAYS for num_year in years])
+    invested, total = dca_totals(paths, ends[:, None], step, amount, start=np.zeros(1, dtype=np.int64))
+    results = {}
+    for row, (num_year, end) in enumerate(zip(years, ends)):
+        results[('ls', num_year)] = compute_avg_yield(_TOTAL, _TOTAL * paths[:, end] / paths[:, 0], num_year)
+        results[('dca', num_year)] = compute_avg_yield(invested[row, 0], total[:, row, 0], num_year)
+    return results
+
+
+def simulate_bootstrap(df, years, num_paths, block=_BLOCK_LENGTH, seed=None, max_cells=_BOOTSTRAP_CELLS):
+    """
+    用历史日收益的 stationary block bootstrap 生成 num_paths 条合成路径，在所有路径上同时计算梭哈和定投
+
+    路径分块生成，每块不超过 max_cells 个价格，内存与路径总数无关。
+    返回每条路径、每个 (策略, 期限) 一行的 DataFrame，列为 path, strategy, years, avg_yield
+    """
+    close = close_prices(df)
+    log_returns = np.diff(np.log(close))
+    log_returns = log_returns[np.isfinite(log_returns)]
+    length = max(years) * _TRADING_DAYS
+    chunk = max(1, max_cells // (length + 1))
+    rng = np.random.default_rng(seed)
+
+    parts = {}
+    for start in range(0, num_paths, chunk):
+        paths = bootstrap_paths(log_returns, rng, min(chunk, num_paths - start), length, block)
+        for key, avg_yield in bootstrap_yields(paths, years).items():
+            parts.setdefault(key, []).append(avg_yield)
+    return pd.concat([
+        pd.DataFrame({'path': np.arange(num_paths), 'strategy': strategy, 'years': num_year,
+                      'avg_yield': np.concatenate(values)})
+        for (strategy, num_year), values in parts.items()
+    ], ignore_index=True)
+
+
+def summarize_distribution(dist):
+    """每个 (策略, 期限) 的年化收益分布: 均值、标准差、分位数、最小/最大值和亏损概率"""
+    grouped = dist.groupby(['strategy', 'years'], sort=False)['avg_yield']
+    stats = grouped.agg(['mean', 'std', 'min', 'max'])
+    quantiles = grouped.quantile(_QUANTILES).unstack()
+    quantiles.columns = [f'p{round(q * 100)}' for q in _QUANTILES]
+    stats = stats.join(quantiles)
+    stats['prob_loss'] = grouped.apply(lambda values: (values < 0).mean())
+    columns = ['mean', 'std'] + list(quantiles.columns) + ['min', 'max', 'prob_loss']
+    return stats[columns].reset_index()
+
+
+def save_distribution(dist, title, file_name):
+    """各期限年化收益的分布直方图"""
+    plt.figure(figsize=(10, 6))
+    for num_year, values in dist.groupby('years')['avg_yield']:
+        plt.hist(values, bins=100, alpha=0.5, label=f'{num_year}年')
+    plt.title(title)
+    plt.xlabel('年化收益')
+    plt.ylabel('路径数')
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(f'{file_name}.png', format='png')
+    plt.close()
+
+
+def run_bootstrap(tickers, years, num_paths, block, seed):
+    """每个代码生成合成路径，保存每条路径的结果（<前缀>_bootstrap.csv）和分布图，返回汇总统计"""
+    summaries = []
+    for ticker in tickers:
+        df = download_data(ticker)
+        if df.empty:
+            print(f'{ticker} 没有价格数据，跳过')
+            continue
+        prefix = file_prefix(ticker)
+        dist = simulate_bootstrap(df, years, num_paths, block, seed)
+        dist.to_csv(f'{prefix}_bootstrap.csv', index=False, float_format='%.4f')
+        for strategy, name in _STRATEGY_NAMES.items():
+            save_distribution(dist[dist['strategy'] == strategy], f'{prefix} {name} {num_paths}条合成路径',
+                              f'{prefix}_{strategy}_bootstrap')
+        summary = summarize_distribution(dist)
+        summary.insert(0, 'ticker', ticker)
+        summaries.append(summary)
+    return pd.concat(summaries, ignore_index=True) if summaries else pd.DataFrame()
+
+
+def save_comparison(results, num_year, title, file_name):
+    """多个策略同一期限的结果画在一张图上，results 为 {策略名: {期限: 按起始年份平均的结果}}"""
+    plt.figure(figsize=(10, 6))
+    for name, by_years in results.items():
+        plt.plot(by_years[num_year].index, by_years[num_year]['avg_yield'], marker='o', markersize=3, label=name)
+    plt.title(title)
+    plt.xlabel('日期')
+    plt.ylabel('年化收益')
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(f'{file_name}.png', format='png')
+    plt.close()
+
+
+def run_strategies(tickers, years, names, schedule_name='month-start', contribution_dates=None):
+    """每个代码在同一个定投日程上一次比较多个策略，保存每个期限的对比图，返回汇总统计"""
+    strategies = {name: STRATEGIES.get(name) for name in names}
+    cape = load_cape() if any(name.startswith('cape') for name in names) else None
+    rows = []
+    for ticker in tickers:
+        df = download_data(ticker)
+        if df.empty:
+            print(f'{ticker} 没有价格数据，跳过')
+            continue
+        prefix = file_prefix(ticker)
+        schedule = schedules.build_schedule(schedule_name, df.index, contribution_dates)
+        results = simulate_strategies(df, years, schedule, strategies, strategy_signals(df, cape))
+        for num_year in years:
+            save_comparison(results, num_year, f'{prefix} 定投策略 {num_year}年', f'{prefix}_strategies_{num_year}')
+            for name in names:
+                result = results[name][num_year]
+                avg_yield = result['avg_yield']
+                rows.append({'ticker': ticker, 'strategy': name, 'years': num_year, 'mean': avg_yield.mean(),
+                             'median': avg_yield.median(), 'min': avg_yield.min(), 'max': avg_yield.max(),
+                             'excluded': result.attrs['excluded']})
+                if result.attrs['excluded']:
+                    print(f"  {ticker} {name} {num_year}年: {result.attrs['excluded']} 个起始日净投入 <= 0，不计入统计")
+    return pd.DataFrame(rows, columns=['ticker', 'strategy', 'years', 'mean', 'median', 'min', 'max', 'excluded'])
+
+
+def file_prefix(ticker):
+    if ticker in _PREFIXES:
+        return _PREFIXES[ticker]
+    return re.sub(r'[^0-9a-z]+', '_', ticker.lower()).strip('_')
+
+
+def share_prices(df):
+    """把日期和收盘价复制到共享内存，返回 (SharedMemory, 工作进程用来挂载的描述)"""
+    n = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=max(n * 16, 1))
+    np.ndarray((n,), dtype=np.int64, buffer=shm.buf)[:] = df.index.as_unit('ns').asi8
+    np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=n * 8)[:] = close_prices(df)
+    return shm, {'shm': shm.name, 'rows': n}
+
+
+# 工作进程中已挂载的共享内存 {名称: (SharedMemory, DataFrame)}，每个进程每个代码只挂载一次
+_attached = {}
+
+
+def _shared_frame(source):
+    if source['shm'] not in _attached:
+        shm = shared_memory.SharedMemory(name=source['shm'])
+        n = source['rows']
+        dates = np.ndarray((n,), dtype='datetime64[ns]', buffer=shm.buf)
+        close = np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+        frame = pd.DataFrame({'Close': close}, index=pd.DatetimeIndex(dates, name='Date'), copy=False)
+        _attached[source['shm']] = (shm, frame)
+    return _attached[source['shm']][1]
+
+
+def run_job(job):
+    """
+    一个 (代码, 策略, 期限) 任务：回测、保存图表，返回统计
+
+    job['source'] 是 DataFrame（当前进程执行）或共享内存描述（进程池执行）
+    """
+    df = job['source'] if isinstance(job['source'], pd.DataFrame) else _shared_frame(job['source'])
+    num_year = job['years']
+    if job['strategy'] == 'ls':
+        result = simulate_ls(df, num_year)
+    else:
+        result = simulate_dca(df, num_year, job['schedule'])
+    prefix = job['prefix']
+    if not result.empty:
+        save_figure(result, f"{prefix} {_STRATEGY_NAMES[job['strategy']]} {num_year}年",
+                    f"{prefix}_{job['strategy']}_{num_year}")
+    avg_yield = result['avg_yield']
+    return {
+        'ticker': job['ticker'], 'strategy': job['strategy'], 'years': num_year,
+        'mean': avg_yield.mean(), 'median': avg_yield.median(), 'min': avg_yield.min(), 'max': avg_yield.max(),
+    }
+
+
+def run_sweep(jobs, workers):
+    """workers 大于1时用进程池执行，否则在当前进程依次执行；结果顺序与 jobs 相同"""
+    if workers <= 1:
+        return [run_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_job, jobs))
+
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('-t', '--ticker', default=_SP500_TICKER)
+    parser.add_argument('-t', '--ticker', nargs='+', default=[_SP500_TICKER], help='一个或多个代码')
+    parser.add_argument('-y', '--years', nargs='+', type=int, default=_NUM_YEARS, help='持有年数')
+    parser.add_argument('-s', '--schedule', choices=['rows', 'custom'] + list(schedules.SCHEDULES), default='rows',
+                        help=f'定投日程，rows 为每隔 {_DCA_STEP} 个交易日投入一次')
+    parser.add_argument('--dates', nargs='+', help='custom 日程的投入日期，例如 2000-01-15 2000-07-15')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='并行进程数，1 表示在当前进程依次执行')
+    parser.add_argument('-o', '--output',
+                        help=f'汇总统计表，默认 {_STATS_FILE}（bootstrap 时为 {_BOOTSTRAP_STATS_FILE}，'
+                             f'策略比较时为 {_STRATEGY_STATS_FILE}）')
+    parser.add_argument('-b', '--bootstrap', type=int, help='用区块自助法生成的合成路径数，不使用历史滚动窗口')
+    parser.add_argument('--block', type=float, default=_BLOCK_LENGTH, help='平均区块长度（交易日）')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('-S', '--strategies', nargs='+', choices=list(STRATEGIES) + [_VALUE_AVERAGING],
+                        help='在同一个定投日程上比较多个定投策略（日程为 rows 时使用 month-start）')
     args = parser.parse_args()
-    if args.ticker == _SP500_TICKER:
-        prefix = 'sp500'
-    else:
-        prefix = 'nasdaq'
-    df = download_data(args.ticker)
-    stats = []
-    for num_year in _NUM_YEARS:
-        ls_result = simulate_ls(df, num_year)
-        mean = ls_result['avg_yield'].mean()
-        median = ls_result['avg_yield'].median()
-        min = ls_result['avg_yield'].min()
-        max = ls_result['avg_yield'].max()
-        stats.append(f'ls, {num_year} years, mean yield: {mean:.2f}, median yield: {median:.2f}, min yield: {min:.2f}, max yield: {max:.2f}')
-        save_figure(ls_result, f'{prefix} 梭哈 {num_year}年', f'{prefix}_ls_{num_year}')
-        dca_result = simulate_dca(df, num_year)
-        mean = dca_result['avg_yield'].mean()
-        median = dca_result['avg_yield'].median()
-        min = dca_result['avg_yield'].min()
-        max = dca_result['avg_yield'].max()
-        stats.append(f'dca, {num_year} years, mean yield: {mean:.2f}, median yield: {median:.2f}, min yield: {min:.2f}, max yield: {max:.2f}')
-        save_figure(dca_result, f'{prefix} 定投 {num_year}年', f'{prefix}_dca_{num_year}')
-    with open(f'stats_{prefix}.txt', 'w') as f:
-        f.write('\n'.join(stats))
+
+    if args.strategies:
+        schedule_name = 'month-start' if args.schedule == 'rows' else args.schedule
+        stats = run_strategies(args.ticker, args.years, args.strategies, schedule_name, args.dates)
+        stats.to_csv(args.output or _STRATEGY_STATS_FILE, index=False, float_format='%.2f')
+        print(stats.to_string(index=False, float_format=lambda v: f'{v:.2f}'))
+        return
+
+    if args.bootstrap:
+        stats = run_bootstrap(args.ticker, args.years, args.bootstrap, args.block, args.seed)
+        stats.to_csv(args.output or _BOOTSTRAP_STATS_FILE, index=False, float_format='%.4f')
+        print(stats.to_string(index=False, float_format=lambda v: f'{v:.2f}'))
+        return
+
+    jobs = []
+    shared = []
+    workers = min(args.workers, len(args.ticker) * len(args.years) * len(_STRATEGY_NAMES))
+    try:
+        for ticker in args.ticker:
+            df = download_data(ticker)
+            if df.empty:
+                print(f'{ticker} 没有价格数据，跳过')
+                continue
+            schedule = None if args.schedule == 'rows' else schedules.build_schedule(args.schedule, df.index, args.dates)
+            if workers > 1:
+                shm, source = share_prices(df)
+                shared.append(shm)
+            else:
+                source = df
+            for num_year in args.years:
+                for strategy in _STRATEGY_NAMES:
+                    jobs.append({'ticker': ticker, 'prefix': file_prefix(ticker), 'strategy': strategy,
+                                 'years': num_year, 'schedule': schedule, 'source': source})
+        stats = pd.DataFrame(run_sweep(jobs, workers), columns=['ticker', 'strategy', 'years', 'mean', 'median', 'min', 'max'])
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+
+    stats.to_csv(args.output or _STATS_FILE, index=False, float_format='%.2f')
+    print(stats.to_string(index=False, float_format=lambda v: f'{v:.2f}'))
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,252 @@
+"""
+多资产组合回测
+按目标权重持有多个标的（例如 VOO/QQQM/TLT/GLD），定期或按偏离阈值再平衡，再平衡的成交额按比例扣除交易成本。
+
+权重组合是矩阵 (组合数, 标的数)，一次批量计算所有组合的净值曲线，用于有效前沿搜索:
+- 定期再平衡: 两次再平衡之间持仓份额不变，净值 = 区间起点净值 × 相对价格 @ 权重，
+  各区间起点净值是区间收益（扣除成本）的累乘，整个时间轴没有循环
+- 偏离阈值再平衡: 是否再平衡取决于之前的路径，按检查日循环，但每一步对所有组合向量化
+
+用法:
+    python portfolio.py -t VOO QQQM TLT GLD -w 0.4 0.3 0.2 0.1 -r quarter-start --cost 10
+    python portfolio.py -t VOO TLT GLD -r band --band 0.05 --grid 0.05
+"""
+
+import argparse
+import itertools
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import schedules
+
+import price_store
+
+TRADING_DAYS = 252
+
+DEFAULT_TICKERS = ['VOO', 'QQQM', 'TLT', 'GLD']
+DEFAULT_COST_BPS = 10
+DEFAULT_BAND = 0.05
+DEFAULT_WINDOW_YEARS = 3
+
+REBALANCE_RULES = ['none', 'month-start', 'quarter-start', 'year-start', 'band']
+
+# 批量计算时每块的组合数，控制 (交易日数 × 组合数) 净值矩阵的内存
+CHUNK_COMBOS = 256
+
+STAT_COLUMNS = ['final', 'cagr', 'volatility', 'sharpe', 'max_drawdown', 'rebalances', 'turnover']
+
+
+def load_prices(tickers, start=None):
+    """各标的的复权收盘价，按共同的交易日对齐 (交易日 × 标的)"""
+    closes = {ticker: price_store.get_history(ticker, start=start)['Close'] for ticker in tickers}
+    prices = pd.DataFrame(closes).dropna()
+    if prices.empty:
+        raise ValueError(f"{' '.join(tickers)} 没有共同的交易日")
+    return prices
+
+
+def weight_grid(n_assets, step):
+    """权重之和为1、以 step 为间隔的所有组合 (组合数 × 标的数)"""
+    units = int(round(1 / step))
+    combos = [c + (units - sum(c),) for c in itertools.product(range(units + 1), repeat=n_assets - 1)
+              if sum(c) <= units]
+    return np.array(combos, dtype=np.float64) / units
+
+
+def calendar_equity(prices, weights, rebalance, cost=0.0):
+    """
+    定期再平衡的净值（初始资金为1）
+
+    参数:
+        prices: (交易日, 标的) 价格数组
+        weights: (组合, 标的) 目标权重
+        rebalance: 再平衡日的位置数组（None 或空数组表示买入后不再调整）
+        cost: 交易成本（成交额的比例）
+
+    返回:
+        (净值 (交易日, 组合), 再平衡次数 (组合,), 累计换手率 (组合,))
+    """
+    n_days = len(prices)
+    rebalance = np.asarray(rebalance if rebalance is not None else [], dtype=np.int64)
+    starts = np.unique(np.concatenate([[0], rebalance[(rebalance > 0) & (rebalance < n_days)]]))
+    segment = np.searchsorted(starts, np.arange(n_days), side='right') - 1
+
+    # 区间末（下一次再平衡前）的相对价格、组合收益和漂移后的权重
+    rel_end = prices[starts[1:]] / prices[starts[:-1]]
+    growth = rel_end @ weights.T
+    drifted = weights[None, :, :] * rel_end[:, None, :] / growth[:, :, None]
+    turnover = np.abs(drifted - weights[None, :, :]).sum(axis=2)
+
+    # 各区间起点的净值: 初始买入成本 × 之前各区间的 收益 × (1 - 成本 × 换手率)
+    factor = growth * (1 - cost * turnover)
+    start_value = (1 - cost) * np.vstack([np.ones((1, len(weights))), np.cumprod(factor, axis=0)])
+
+    relative = prices / prices[starts[segment]]
+    equity = start_value[segment] * (relative @ weights.T)
+    return equity, np.full(len(weights), len(starts) - 1), turnover.sum(axis=0)
+
+
+def band_equity(prices, weights, band, cost=0.0, checks=None):
+    """
+    偏离阈值再平衡的净值（初始资金为1）：检查日任一标的权重偏离目标超过 band 时再平衡
+
+    checks: 检查日的位置数组，默认每个交易日检查。返回值同 calendar_equity
+    """
+    n_days = len(prices)
+    checks = np.arange(1, n_days) if checks is None else np.asarray(checks, dtype=np.int64)
+    checks = checks[(checks > 0) & (checks < n_days)]
+    bounds = np.concatenate([[0], checks, [n_days]])
+
+    shares = (1 - cost) * weights / prices[0]
+    equity = np.empty((n_days, len(weights)))
+    rebalances = np.zeros(len(weights), dtype=np.int64)
+    turnover = np.zeros(len(weights))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if lo > 0:
+            holding = shares * prices[lo]
+            value = holding.sum(axis=1)
+            deviation = np.abs(holding / value[:, None] - weights)
+            breach = (deviation > band).any(axis=1)
+            if breach.any():
+                traded = deviation[breach].sum(axis=1)
+                new_value = value[breach] * (1 - cost * traded)
+                shares[breach] = new_value[:, None] * weights[breach] / prices[lo]
+                rebalances[breach] += 1
+                turnover[breach] += traded
+        equity[lo:hi] = prices[lo:hi] @ shares.T
+    return equity, rebalances, turnover
+
+
+def simulate(prices, weights, rule='quarter-start', band=DEFAULT_BAND, cost=0.0, dates=None):
+    """按再平衡规则计算净值，参数见 calendar_equity / band_equity"""
+    if rule == 'band':
+        return band_equity(prices, weights, band, cost)
+    if rule == 'none':
+        return calendar_equity(prices, weights, None, cost)
+    return calendar_equity(prices, weights, schedules.build_schedule(rule, dates), cost)
+
+
+def summarize(equity, dates, rebalances, turnover, risk_free=0.0):
+    """每个组合的统计（净值以初始资金1为基准）"""
+    years = (dates[-1] - dates[0]).days / 365.25
+    daily = equity[1:] / equity[:-1] - 1
+    volatility = daily.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = (daily.mean(axis=0) * TRADING_DAYS - risk_free) / volatility
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+    return pd.DataFrame({
+        'final': equity[-1],
+        'cagr': equity[-1] ** (1 / years) - 1,
+        'volatility': volatility,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=0),
+        'rebalances': rebalances,
+        'turnover': turnover,
+    })
+
+
+def rolling_stats(equity, dates, window=DEFAULT_WINDOW_YEARS * TRADING_DAYS):
+    """单个组合的净值曲线和滚动统计（滚动年化收益、年化波动率、回撤），用前缀和计算"""
+    log_return = np.diff(np.log(equity), prepend=np.log(equity[0]))
+    s1 = np.cumsum(log_return)
+    s2 = np.cumsum(log_return ** 2)
+    mean = np.full(len(equity), np.nan)
+    var = np.full(len(equity), np.nan)
+    if len(equity) > window:
+        n = window
+        sum1 = s1[window:] - s1[:-window]
+        sum2 = s2[window:] - s2[:-window]
+        mean[window:] = sum1 / n
+        var[window:] = (sum2 - sum1 ** 2 / n) / (n - 1)
+    return pd.DataFrame({
+        'equity': equity,
+        'drawdown': equity / np.maximum.accumulate(equity) - 1,
+        'rolling_return': np.exp(mean * TRADING_DAYS) - 1,
+        'rolling_volatility': np.sqrt(np.maximum(var, 0) * TRADING_DAYS),
+    }, index=dates)
+
+
+def efficient_frontier(summary):
+    """波动率从低到高，只保留年化收益比所有更低波动率组合都高的组合"""
+    ordered = summary.sort_values(['volatility', 'cagr'], ascending=[True, False])
+    best_so_far = ordered['cagr'].cummax().shift(fill_value=-np.inf)
+    return ordered[ordered['cagr'] > best_so_far]
+
+
+def run_grid(prices, weights, rule, band, cost, chunk=CHUNK_COMBOS):
+    """批量评估权重组合（分块，内存只与块大小有关），返回每个组合的权重和统计"""
+    values = prices.to_numpy(dtype=np.float64)
+    summaries = []
+    for start in range(0, len(weights), chunk):
+        block = weights[start:start + chunk]
+        equity, rebalances, turnover = simulate(values, block, rule, band, cost, prices.index)
+        summaries.append(summarize(equity, prices.index, rebalances, turnover))
+    summary = pd.concat(summaries, ignore_index=True)
+    return pd.concat([pd.DataFrame(weights, columns=prices.columns), summary], axis=1)
+
+
+def save_plot(x, y, title, xlabel, ylabel, file_name, scatter=False, highlight=None):
+    plt.figure(figsize=(10, 6))
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+    if scatter:
+        plt.scatter(x, y, s=8, alpha=0.4, color='gray')
+        if highlight is not None:
+            plt.plot(highlight[0], highlight[1], marker='o', color='dodgerblue')
+    else:
+        plt.plot(x, y, color='dodgerblue')
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.tight_layout()
+    plt.savefig(f'{file_name}.png', format='png')
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多资产组合回测')
+    parser.add_argument('-t', '--ticker', nargs='+', default=DEFAULT_TICKERS)
+    parser.add_argument('-w', '--weights', nargs='+', type=float, help='目标权重，默认等权')
+    parser.add_argument('-r', '--rebalance', choices=REBALANCE_RULES, default='quarter-start')
+    parser.add_argument('--band', type=float, default=DEFAULT_BAND, help='偏离阈值（rebalance=band 时）')
+    parser.add_argument('--cost', type=float, default=DEFAULT_COST_BPS, help='交易成本（基点，按成交额）')
+    parser.add_argument('--start', help='起始日期')
+    parser.add_argument('--grid', type=float, help='按此间隔枚举所有权重组合并输出有效前沿，例如 0.05')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW_YEARS, help='滚动统计的窗口（年）')
+    args = parser.parse_args()
+
+    prices = load_prices(args.ticker, args.start)
+    cost = args.cost / 10000
+    print(f"共同交易日: {prices.index[0]:%Y-%m-%d} 至 {prices.index[-1]:%Y-%m-%d}，共 {len(prices)} 天")
+
+    if args.grid:
+        weights = weight_grid(len(args.ticker), args.grid)
+        grid = run_grid(prices, weights, args.rebalance, args.band, cost)
+        frontier = efficient_frontier(grid)
+        grid.to_csv('portfolio_grid.csv', index=False, float_format='%.6f')
+        frontier.to_csv('portfolio_frontier.csv', index=False, float_format='%.6f')
+        save_plot(grid['volatility'] * 100, grid['cagr'] * 100, f'{len(grid)} 个权重组合', '年化波动率 (%)',
+                  '年化收益 (%)', 'portfolio_frontier', scatter=True,
+                  highlight=(frontier['volatility'] * 100, frontier['cagr'] * 100))
+        print(f"评估 {len(grid)} 个权重组合，有效前沿 {len(frontier)} 个:")
+        print(frontier.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+        return
+
+    weights = np.array(args.weights or [1 / len(args.ticker)] * len(args.ticker), dtype=np.float64)
+    if len(weights) != len(args.ticker):
+        parser.error('权重数量与标的数量不一致')
+    weights = weights / weights.sum()
+    values = prices.to_numpy(dtype=np.float64)
+    equity, rebalances, turnover = simulate(values, weights[None, :], args.rebalance, args.band, cost, prices.index)
+    stats = summarize(equity, prices.index, rebalances, turnover)
+    curve = rolling_stats(equity[:, 0], prices.index, args.window * TRADING_DAYS)
+    curve.to_csv('portfolio_equity.csv', float_format='%.6f')
+    save_plot(curve.index, curve['equity'], ' / '.join(f'{t} {w:.0%}' for t, w in zip(args.ticker, weights)),
+              '日期', '净值', 'portfolio_equity')
+    print(stats.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+
+
+if __name__ == '__main__':
+    main()
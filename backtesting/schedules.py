@@ -0,0 +1,75 @@
+"""
+定投/再平衡日程
+按日历规则生成投入日（或再平衡日），结果是交易日的位置数组（升序、不重复），只需要计算一次，
+可以直接交给 analyze.schedule_totals，不同日程的比较共用同一份价格数据。
+
+投入日不是交易日时顺延到下一个交易日
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _naive(dates):
+    dates = pd.DatetimeIndex(dates)
+    return dates.tz_localize(None) if dates.tz is not None else dates
+
+
+def on_or_after(dates, targets):
+    """每个目标日期当天或之后的第一个交易日位置（超出数据范围的丢弃，重复的合并）"""
+    dates = _naive(dates)
+    targets = _naive(targets)
+    targets = targets[targets >= dates[0]]
+    positions = dates.searchsorted(targets, side='left')
+    return np.unique(positions[positions < len(dates)]).astype(np.int64)
+
+
+def monthly(dates, day=15):
+    """每月 day 日（月份天数不足时取月末）"""
+    dates = _naive(dates)
+    months = pd.period_range(dates[0], dates[-1], freq='M')
+    offsets = np.minimum(day, months.days_in_month) - 1
+    return on_or_after(dates, months.to_timestamp() + pd.to_timedelta(offsets, unit='D'))
+
+
+def period_start(dates, freq='M'):
+    """每个周期（M 月、Q 季度、Y 年）的第一个交易日"""
+    periods = _naive(dates).to_period(freq).asi8
+    return np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]]).astype(np.int64)
+
+
+def month_start(dates):
+    """每月第一个交易日"""
+    return period_start(dates, 'M')
+
+
+def biweekly(dates, anchor=None, days=14):
+    """从 anchor（默认第一个交易日）起每 days 天一次，例如双周发薪日"""
+    dates = _naive(dates)
+    anchor = pd.Timestamp(anchor) if anchor is not None else dates[0]
+    return on_or_after(dates, pd.date_range(anchor, dates[-1], freq=f'{days}D'))
+
+
+def custom(dates, contribution_dates):
+    """自定义的投入日期列表"""
+    return on_or_after(dates, sorted(pd.to_datetime(list(contribution_dates))))
+
+
+SCHEDULES = {
+    'mid-month': monthly,
+    'month-start': month_start,
+    'quarter-start': lambda dates: period_start(dates, 'Q'),
+    'year-start': lambda dates: period_start(dates, 'Y'),
+    'biweekly': biweekly,
+}
+
+
+def build_schedule(name, dates, contribution_dates=None):
+    """按名称生成日程；name 为 'custom' 时使用 contribution_dates"""
+    if name == 'custom':
+        if not contribution_dates:
+            raise ValueError('custom 日程需要提供投入日期')
+        return custom(dates, contribution_dates)
+    if name not in SCHEDULES:
+        raise ValueError(f'未知的定投日程: {name}')
+    return SCHEDULES[name](dates)
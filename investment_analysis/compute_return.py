@@ -1,21 +1,20 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+import price_store
+
 def calculate_historical_metrics(ticker, etf_ticker=None, start_year=None, include_dividends=True):
     """计算历史年化回报率和波动率，可选使用ETF的股息率"""
     try:
         # 获取指数数据
-        index = yf.Ticker(ticker)
-        hist = index.history(period="max")
+        hist = price_store.get_history(ticker)
         
         # 如果指定了ETF，获取其股息率
         if etf_ticker:
-            etf = yf.Ticker(etf_ticker)
-            etf_hist = etf.history(period="max")
+            etf_hist = price_store.get_history(etf_ticker)
             etf_hist['Dividends'] = etf_hist['Dividends'].fillna(0)
             annual_dividends = etf_hist['Dividends'].resample('YE').sum()
             annual_prices = etf_hist['Close'].resample('YE').last()
@@ -1,16 +1,16 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+import price_store
+
 def calculate_historical_metrics(ticker, start_year=None, dividend_yield=0):
     """计算历史年化回报率和波动率，加入估算的股息收益率"""
     try:
         # 获取尽可能长的历史数据
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="max")
+        hist = price_store.get_history(ticker)
         
         # 如果指定了起始年份，只使用该年份之后的数据
         if start_year:
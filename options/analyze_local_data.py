@@ -2,263 +2,67 @@
 # -*- coding: utf-8 -*-
 
 import pandas as pd
-import numpy as np
-from datetime import datetime
-import matplotlib.pyplot as plt
-from scipy.stats import norm
+import matplotlib
 import os
-import json
-import glob
+import sys
+import argparse
+
+import screening
+import charts
+import montecarlo
+import ranking
+from rules import RuleError, Screen, compile_rule, run_screens, uses_monte_carlo
 
 # 设置中文显示
-plt.rcParams['font.sans-serif'] = ['SimHei']
-plt.rcParams['axes.unicode_minus'] = False
+matplotlib.rcParams['font.sans-serif'] = ['SimHei']
+matplotlib.rcParams['axes.unicode_minus'] = False
 
 # 数据目录和结果目录
 data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
 os.makedirs(results_dir, exist_ok=True)
 
-# Black-Scholes模型计算期权的隐含波动率和被行权概率
-def calculate_implied_probability(S, K, T, r, sigma, option_type='put'):
-    """
-    计算期权被行权的概率
-    S: 当前股价
-    K: 行权价
-    T: 到期时间（年）
-    r: 无风险利率
-    sigma: 波动率
-    option_type: 'call' 或 'put'
+def analyze_local_options(band=screening.STRIKE_BAND, where=screening.DEFAULT_SCREEN,
+                          top=screening.DEFAULT_TOP, screens=(), tickers=None, mc_paths=0, stream=False,
+                          make_charts=True):
     """
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    
-    if option_type == 'call':
-        # 看涨期权被行权的概率
-        return norm.cdf(d2)
-    else:
-        # 看跌期权被行权的概率
-        return norm.cdf(-d2)
+    分析本地存储的期权数据（向量化筛选，见 screening.py）
 
-def calculate_annualized_return(option_price, strike_price, spot_price, days_to_expiry, option_type='put'):
-    """
-    计算期权卖方的年化收益率
-    option_price: 期权价格
-    strike_price: 行权价
-    spot_price: 当前股价
-    days_to_expiry: 到期天数
-    option_type: 'call' 或 'put'
+    参数:
+        band: 行权价范围（现价的 ±band）
+        where: 选择最佳期权的条件表达式（语法见 rules.py）
+        top: 全市场排行的条数
+        screens: 额外的 rules.Screen 列表，结果分别保存为 screen_<名称>.csv
+        tickers: 只分析这些股票（默认 data 目录下所有股票）
+        mc_paths: 大于0时对满足 where 条件的候选做蒙特卡洛评估（期望盈亏、CVaR、凯利仓位），
+                  结果保存为 mc_scores.csv。where 或 screens 用到 ev/cvar/pop/kelly 时先评估所有期权，
+                  评估结果并入结果表后再筛选
+        stream: 流式排行（见 analyze_streaming），只保留排行，不生成完整结果表
+        make_charts: 是否生成图表。图表在后台进程中渲染，本函数不等待渲染完成，
+                     需要确认图表已保存时调用 charts.wait()
     """
-    if option_type == 'put':
-        # 对于看跌期权，最大盈利是期权费
-        max_profit = option_price
-        # 最大风险是行权价减去期权费（考虑股票价格可能跌至零）
-        max_risk = strike_price - option_price
-    else:
-        # 对于看涨期权，最大盈利是期权费
-        max_profit = option_price
-        # 最大风险理论上是无限的，但为了计算，我们假设一个最大损失
-        max_risk = spot_price * 2  # 假设最大损失是当前股价的两倍
-    
-    # 年化收益率计算
-    if max_risk > 0:
-        return (max_profit / max_risk) * (365 / days_to_expiry) * 100
-    return 0
+    where_rule = compile_rule(where)
+    needs_mc = uses_monte_carlo(where_rule) or any(uses_monte_carlo(screen.rule, screen.sort) for screen in screens)
+    if needs_mc and (stream or mc_paths <= 0):
+        raise RuleError("筛选条件用到了蒙特卡洛评估的字段（ev/cvar/pop/kelly），需要 --monte-carlo，且不能与 --stream 同时使用")
+    if stream:
+        return analyze_streaming(band, where, top, tickers)
 
-def analyze_local_options():
-    """分析本地存储的期权数据"""
-    all_results = []
-    best_options = []
-    
-    # 获取无风险利率（这里使用美国10年期国债收益率的近似值）
-    risk_free_rate = 0.04  # 4%，您可以根据最新数据调整
-    
-    # 检查数据目录中的所有股票文件夹
-    tickers = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
-    
-    for ticker in tickers:
-        print(f"分析 {ticker} 的期权数据...")
-        ticker_dir = os.path.join(data_dir, ticker)
-        
-        # 读取股票信息文件
-        info_file = os.path.join(ticker_dir, 'info.json')
-        if not os.path.exists(info_file):
-            print(f"  未找到 {ticker} 的信息文件，跳过...")
-            continue
-        
-        try:
-            with open(info_file, 'r') as f:
-                ticker_info = json.load(f)
-            
-            current_price = ticker_info.get('current_price', 0)
-            if current_price == 0:
-                print(f"  无法获取 {ticker} 的当前价格，跳过...")
-                continue
-                
-            print(f"  当前股价: {current_price}")
-            
-            # 获取该股票所有的期权文件
-            expiration_dates = ticker_info.get('expiration_dates', [])
-            if not expiration_dates:
-                print(f"  未找到 {ticker} 的到期日信息，尝试从文件名中获取...")
-                put_files = glob.glob(os.path.join(ticker_dir, "*_puts.csv"))
-                expiration_dates = [os.path.basename(f).split('_')[0] for f in put_files]
-            
-            if not expiration_dates:
-                print(f"  未找到 {ticker} 的到期日信息，跳过...")
-                continue
-                
-            print(f"  分析以下到期日: {expiration_dates}")
-            
-            for exp_date in expiration_dates:
-                # 计算到期天数
-                try:
-                    exp_datetime = datetime.strptime(exp_date, '%Y-%m-%d')
-                    days_to_expiry = (exp_datetime - datetime.now()).days
-                    if days_to_expiry <= 0:
-                        print(f"  到期日 {exp_date} 已过期，跳过...")
-                        continue
-                        
-                    years_to_expiry = days_to_expiry / 365
-                    
-                    print(f"  分析到期日: {exp_date} (还有 {days_to_expiry} 天)")
-                    
-                    # 读取看跌期权数据
-                    puts_file = os.path.join(ticker_dir, f"{exp_date}_puts.csv")
-                    if os.path.exists(puts_file):
-                        puts = pd.read_csv(puts_file)
-                        print(f"    分析看跌期权 (总共 {len(puts)} 个)")
-                        
-                        # 只分析接近当前价格的期权 (价内和价外10%)
-                        min_strike = current_price * 0.9
-                        max_strike = current_price * 1.1
-                        filtered_puts = puts[(puts['strike'] >= min_strike) & (puts['strike'] <= max_strike)]
-                        
-                        if len(filtered_puts) > 0:
-                            print(f"    过滤后剩余 {len(filtered_puts)} 个看跌期权 (行权价在 {min_strike:.2f} 和 {max_strike:.2f} 之间)")
-                            puts = filtered_puts
-                        else:
-                            # 如果没有期权在范围内，则选择最接近当前价格的几个
-                            puts = puts.iloc[abs(puts['strike'] - current_price).argsort()[:5]]
-                            print(f"    没有期权在价格范围内，选择最接近当前价格的 {len(puts)} 个")
-                        
-                        for idx, put in puts.iterrows():
-                            strike = put['strike']
-                            put_price = put['lastPrice']
-                            implied_volatility = put['impliedVolatility']
-                            volume = put['volume'] if not pd.isna(put['volume']) else 0
-                            open_interest = put['openInterest'] if not pd.isna(put['openInterest']) else 0
-                            
-                            # 计算被行权概率
-                            exercise_prob = calculate_implied_probability(
-                                current_price, strike, years_to_expiry, risk_free_rate, implied_volatility, 'put'
-                            )
-                            
-                            # 计算年化收益率
-                            annualized_return = calculate_annualized_return(
-                                put_price, strike, current_price, days_to_expiry, 'put'
-                            )
-                            
-                            # 保存结果
-                            result = {
-                                'ticker': ticker,
-                                'option_type': 'put',
-                                'expiration_date': exp_date,
-                                'days_to_expiry': days_to_expiry,
-                                'strike': strike,
-                                'current_price': current_price,
-                                'option_price': put_price,
-                                'implied_volatility': implied_volatility,
-                                'exercise_probability': exercise_prob * 100,
-                                'annualized_return': annualized_return,
-                                'volume': volume,
-                                'open_interest': open_interest
-                            }
-                            all_results.append(result)
-                            print(f"      分析看跌期权: 行权价={strike}, 价格={put_price}, 被行权概率={exercise_prob*100:.2f}%, 年化收益率={annualized_return:.2f}%")
-                    
-                    # 读取看涨期权数据
-                    calls_file = os.path.join(ticker_dir, f"{exp_date}_calls.csv")
-                    if os.path.exists(calls_file):
-                        calls = pd.read_csv(calls_file)
-                        print(f"    分析看涨期权 (总共 {len(calls)} 个)")
-                        
-                        # 只分析接近当前价格的期权 (价内和价外10%)
-                        filtered_calls = calls[(calls['strike'] >= min_strike) & (calls['strike'] <= max_strike)]
-                        
-                        if len(filtered_calls) > 0:
-                            print(f"    过滤后剩余 {len(filtered_calls)} 个看涨期权 (行权价在 {min_strike:.2f} 和 {max_strike:.2f} 之间)")
-                            calls = filtered_calls
-                        else:
-                            # 如果没有期权在范围内，则选择最接近当前价格的几个
-                            calls = calls.iloc[abs(calls['strike'] - current_price).argsort()[:5]]
-                            print(f"    没有期权在价格范围内，选择最接近当前价格的 {len(calls)} 个")
-                        
-                        for idx, call in calls.iterrows():
-                            strike = call['strike']
-                            call_price = call['lastPrice']
-                            implied_volatility = call['impliedVolatility']
-                            volume = call['volume'] if not pd.isna(call['volume']) else 0
-                            open_interest = call['openInterest'] if not pd.isna(call['openInterest']) else 0
-                            
-                            # 计算被行权概率
-                            exercise_prob = calculate_implied_probability(
-                                current_price, strike, years_to_expiry, risk_free_rate, implied_volatility, 'call'
-                            )
-                            
-                            # 计算年化收益率
-                            annualized_return = calculate_annualized_return(
-                                call_price, strike, current_price, days_to_expiry, 'call'
-                            )
-                            
-                            # 保存结果
-                            result = {
-                                'ticker': ticker,
-                                'option_type': 'call',
-                                'expiration_date': exp_date,
-                                'days_to_expiry': days_to_expiry,
-                                'strike': strike,
-                                'current_price': current_price,
-                                'option_price': call_price,
-                                'implied_volatility': implied_volatility,
-                                'exercise_probability': exercise_prob * 100,
-                                'annualized_return': annualized_return,
-                                'volume': volume,
-                                'open_interest': open_interest
-                            }
-                            all_results.append(result)
-                            print(f"      分析看涨期权: 行权价={strike}, 价格={call_price}, 被行权概率={exercise_prob*100:.2f}%, 年化收益率={annualized_return:.2f}%")
-                
-                except Exception as e:
-                    print(f"    处理到期日 {exp_date} 时出错: {e}")
-                    continue
-            
-            # 对该股票找出最优的期权（收益率最高且行权概率低于30%的）
-            ticker_results = [r for r in all_results if r['ticker'] == ticker]
-            if ticker_results:
-                # 筛选行权概率小于30%的期权
-                low_prob_options = [r for r in ticker_results if r['exercise_probability'] < 30]
-                if low_prob_options:
-                    # 按年化收益率排序
-                    sorted_options = sorted(low_prob_options, key=lambda x: x['annualized_return'], reverse=True)
-                    # 选取最优的看跌和看涨期权
-                    best_put = next((o for o in sorted_options if o['option_type'] == 'put'), None)
-                    best_call = next((o for o in sorted_options if o['option_type'] == 'call'), None)
-                    
-                    if best_put:
-                        best_options.append(best_put)
-                        print(f"  找到最佳看跌期权: 到期日={best_put['expiration_date']}, 行权价={best_put['strike']}, 年化收益率={best_put['annualized_return']:.2f}%")
-                    if best_call:
-                        best_options.append(best_call)
-                        print(f"  找到最佳看涨期权: 到期日={best_call['expiration_date']}, 行权价={best_call['strike']}, 年化收益率={best_call['annualized_return']:.2f}%")
-            
-        except Exception as e:
-            print(f"处理 {ticker} 时出错: {e}")
-            continue
-    
-    # 转换为DataFrame
-    results_df = pd.DataFrame(all_results)
-    best_options_df = pd.DataFrame(best_options)
+    chains = screening.load_local_chains(data_dir, tickers, band=band)
+    print(f"读取 {chains['ticker'].nunique()} 个股票的 {len(chains)} 个期权")
+
+    results_df = screening.compute_metrics(chains)
+    if mc_paths > 0 and not results_df.empty:
+        # 筛选条件用到评估结果时评估所有期权，否则只评估满足 where 条件的候选
+        candidates = results_df if needs_mc else results_df[where_rule(results_df)]
+        scored = montecarlo.score_candidates(candidates, paths=mc_paths)
+        results_df = results_df.join(scored[montecarlo.SCORE_COLUMNS])
+        mc_file = os.path.join(results_dir, "mc_scores.csv")
+        scored.sort_values('mc_ev', ascending=False).to_csv(mc_file, index=False)
+        print(f"蒙特卡洛评估 {len(scored)} 个候选 ({mc_paths} 条路径)，保存到 {mc_file}")
+
+    best_options_df = screening.select_best_per_ticker(results_df, where)
+    screening.print_summary(results_df, best_options_df)
     
     # 保存结果
     if not results_df.empty:
@@ -266,7 +70,7 @@ def analyze_local_options():
         print(f"保存分析结果到 {os.path.join(results_dir, 'options_analysis_results.csv')}")
         
         # 按年化收益率排序，找出最佳期权
-        best_overall_df = results_df[results_df['exercise_probability'] < 30].sort_values('annualized_return', ascending=False).head(10)
+        best_overall_df = screening.top_overall(results_df, top, where)
         best_overall_df.to_csv(os.path.join(results_dir, "best_options_overall.csv"), index=False)
         print(f"保存最佳期权到 {os.path.join(results_dir, 'best_options_overall.csv')}")
         
@@ -274,72 +78,126 @@ def analyze_local_options():
         if not best_options_df.empty:
             best_options_df.to_csv(os.path.join(results_dir, "best_options_by_ticker.csv"), index=False)
             print(f"保存按股票分类的最佳期权到 {os.path.join(results_dir, 'best_options_by_ticker.csv')}")
-            
-        # 创建可视化
-        create_visualizations(results_df, best_overall_df)
+
+        # 自定义筛选（一次遍历求出所有筛选的掩码）
+        for name, selected in run_screens(results_df, screens).items():
+            screen_file = os.path.join(results_dir, f"screen_{name}.csv")
+            selected.to_csv(screen_file, index=False)
+            print(f"筛选 {name}: {len(selected)} 个期权，保存到 {screen_file}")
+
+        # 创建可视化（后台渲染）
+        if make_charts:
+            create_visualizations(results_df, best_overall_df)
     
     return results_df, best_options_df
 
+def analyze_streaming(band=screening.STRIKE_BAND, where=screening.DEFAULT_SCREEN,
+                      top=screening.DEFAULT_TOP, tickers=None):
+    """
+    流式分析: 逐个标的读取期权链，只在有界堆中保留排行（见 ranking.py），内存占用不随标的数量增长
+
+    不保存完整的 options_analysis_results.csv，自定义筛选、蒙特卡洛评估和图表需要完整结果，流式模式下不执行。
+    除 best_options_overall.csv / best_options_by_ticker.csv 外，另外保存每个标的、每种期权类型的前 top 名
+
+    返回:
+        (全市场前 top 名, 每个标的的最佳期权)
+    """
+    ranker = ranking.rank_local_options(data_dir, tickers, top, where, band)
+    print(f"流式读取 {ranker.partitions} 个股票的 {ranker.rows} 个期权，{ranker.candidates} 个满足条件")
+
+    outputs = [
+        ("best_options_overall.csv", ranker.top_overall(), "最佳期权"),
+        ("best_options_by_ticker.csv", ranker.best_per_ticker(), "按股票分类的最佳期权"),
+        ("top_options_by_ticker.csv", ranker.top_by('ticker'), f"每个股票的前 {top} 名"),
+        ("top_options_by_type.csv", ranker.top_by('option_type'), f"看跌/看涨期权各自的前 {top} 名"),
+    ]
+    for filename, frame, label in outputs:
+        if frame.empty:
+            continue
+        frame.to_csv(os.path.join(results_dir, filename), index=False)
+        print(f"保存{label}到 {os.path.join(results_dir, filename)}")
+
+    return ranker.top_overall(), ranker.best_per_ticker()
+
 def create_visualizations(results_df, best_options_df):
-    """创建可视化图表"""
+    """创建可视化图表（生成图表描述，交给 charts.py 在后台渲染）"""
     print("创建可视化图表...")
-    
+    specs = []
+
     # 1. 不同股票的最佳期权年化收益率比较
-    plt.figure(figsize=(12, 8))
-    best_by_ticker = results_df.sort_values(['ticker', 'annualized_return'], ascending=[True, False]).groupby('ticker').first()
-    best_by_ticker['annualized_return'].plot(kind='bar')
-    plt.title('各股票最佳期权年化收益率')
-    plt.xlabel('股票代码')
-    plt.ylabel('年化收益率 (%)')
-    plt.tight_layout()
-    plt.savefig(os.path.join(results_dir, 'best_returns_by_ticker.png'))
-    print(f"保存图表到 {os.path.join(results_dir, 'best_returns_by_ticker.png')}")
-    
+    best_by_ticker = results_df.groupby('ticker')['annualized_return'].max()
+    specs.append(charts.bar_spec('best_returns_by_ticker.png', best_by_ticker.index, best_by_ticker.to_numpy(),
+                                 '各股票最佳期权年化收益率', '股票代码', '年化收益率 (%)'))
+
     # 2. 到期日vs收益率散点图
-    plt.figure(figsize=(12, 8))
-    plt.scatter(results_df['days_to_expiry'], results_df['annualized_return'], alpha=0.5)
-    plt.title('到期日vs年化收益率')
-    plt.xlabel('到期天数')
-    plt.ylabel('年化收益率 (%)')
-    plt.tight_layout()
-    plt.savefig(os.path.join(results_dir, 'expiry_vs_return.png'))
-    print(f"保存图表到 {os.path.join(results_dir, 'expiry_vs_return.png')}")
-    
+    specs.append(charts.scatter_spec('expiry_vs_return.png',
+                                     results_df['days_to_expiry'].to_numpy(), results_df['annualized_return'].to_numpy(),
+                                     '到期日vs年化收益率', '到期天数', '年化收益率 (%)'))
+
     # 3. 行权概率vs收益率散点图
-    plt.figure(figsize=(12, 8))
-    plt.scatter(results_df['exercise_probability'], results_df['annualized_return'], alpha=0.5)
-    plt.title('行权概率vs年化收益率')
-    plt.xlabel('行权概率 (%)')
-    plt.ylabel('年化收益率 (%)')
-    plt.tight_layout()
-    plt.savefig(os.path.join(results_dir, 'probability_vs_return.png'))
-    print(f"保存图表到 {os.path.join(results_dir, 'probability_vs_return.png')}")
-    
+    specs.append(charts.scatter_spec('probability_vs_return.png',
+                                     results_df['exercise_probability'].to_numpy(), results_df['annualized_return'].to_numpy(),
+                                     '行权概率vs年化收益率', '行权概率 (%)', '年化收益率 (%)'))
+
     # 4. 最佳期权详情
     if len(best_options_df) > 0:
-        plt.figure(figsize=(12, 8))
-        best_options_df.sort_values('annualized_return', ascending=False).head(10).plot(
-            x='ticker', y='annualized_return', kind='bar', color='green'
-        )
-        plt.title('十大最佳期权(按年化收益率)')
-        plt.xlabel('股票代码')
-        plt.ylabel('年化收益率 (%)')
-        plt.tight_layout()
-        plt.savefig(os.path.join(results_dir, 'top10_best_options.png'))
-        print(f"保存图表到 {os.path.join(results_dir, 'top10_best_options.png')}")
+        top10 = best_options_df.sort_values('annualized_return', ascending=False).head(10)
+        specs.append(charts.bar_spec('top10_best_options.png', top10['ticker'], top10['annualized_return'].to_numpy(),
+                                     '十大最佳期权(按年化收益率)', '股票代码', '年化收益率 (%)', color='green'))
+
+    charts.render_async(specs, results_dir)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='分析本地期权数据')
+    parser.add_argument('--band', type=float, default=screening.STRIKE_BAND,
+                        help='只分析行权价在现价 ±band 范围内的期权（默认 0.1）')
+    parser.add_argument('--where', default=screening.DEFAULT_SCREEN,
+                        help='选择最佳期权的条件，例如 "prob < 0.2 and oi > 500 and dte between 7 and 45"')
+    parser.add_argument('--top', type=int, default=screening.DEFAULT_TOP, help='全市场排行的条数')
+    parser.add_argument('--screen', action='append', default=[], metavar='NAME=EXPR',
+                        help='额外的筛选，可重复，例如 --screen "weekly=type == put and dte <= 7"')
+    parser.add_argument('--screen-sort', default='-ret', help='额外筛选的排序字段，"-"前缀降序')
+    parser.add_argument('--screen-limit', type=int, help='额外筛选最多保留的条数')
+    parser.add_argument('--monte-carlo', type=int, nargs='?', const=montecarlo.DEFAULT_PATHS, default=0,
+                        metavar='PATHS', help=f'对候选做蒙特卡洛评估（默认 {montecarlo.DEFAULT_PATHS} 条路径）')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式排行: 逐个股票读取，只保留排行（适合大量股票），不生成完整结果表和图表')
+    parser.add_argument('--no-charts', action='store_true', help='不生成图表')
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
+    args = parse_args()
+    try:
+        screens = [Screen.parse(spec, sort=args.screen_sort, limit=args.screen_limit) for spec in args.screen]
+        # 提前编译默认条件，表达式有误时直接退出
+        where = Screen('where', args.where)
+        if any(uses_monte_carlo(screen.rule, screen.sort) for screen in screens + [where]) \
+                and (args.stream or not args.monte_carlo):
+            raise RuleError("用到了蒙特卡洛评估的字段（ev/cvar/pop/kelly），需要 --monte-carlo，且不能与 --stream 同时使用")
+    except RuleError as e:
+        print(f"筛选条件有误: {e}")
+        sys.exit(2)
+
     print("开始分析本地期权数据...")
-    results_df, best_options_df = analyze_local_options()
+    if args.stream:
+        best_overall, best_options_df = analyze_streaming(args.band, args.where, args.top)
+        found = not best_overall.empty
+    else:
+        results_df, best_options_df = analyze_local_options(args.band, args.where, args.top, screens,
+                                                            mc_paths=args.monte_carlo, make_charts=not args.no_charts)
+        best_overall = screening.top_overall(results_df, args.top, args.where)
+        found = not results_df.empty
     
-    if not results_df.empty:
+    if found:
         print("\n分析完成! 结果已保存到 'results' 目录")
         
-        print("\n十大最佳期权 (按年化收益率排序):")
-        best_overall = results_df[results_df['exercise_probability'] < 30].sort_values('annualized_return', ascending=False).head(10)
+        print(f"\n最佳期权前 {args.top} 名 (按年化收益率排序):")
         pd.set_option('display.max_columns', None)
         pd.set_option('display.width', 1000)
         print(best_overall[['ticker', 'option_type', 'expiration_date', 'strike', 'current_price', 
                            'option_price', 'exercise_probability', 'annualized_return']])
     else:
-        print("没有找到符合条件的期权数据。请先运行 download_options_data.py 下载数据。") 
\ No newline at end of file
+        print("没有找到符合条件的期权数据。请先运行 download_options_data.py 下载数据。")
+
+    # 结果已经输出，最后等待后台图表完成
+    charts.shutdown()
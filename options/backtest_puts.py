@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+卖出看跌期权筛选的回测
+按日期重放归档的期权链（chain_archive.py），每个交易日用筛选条件选出最佳看跌期权卖出一张，
+持有到期，按标的价格路径结算。输出已实现收益、最大回撤和被行权比例
+
+所有交易日的筛选一次性向量化完成（compute_metrics + 分组取前N），
+持仓的逐日估值用不规则下标展开 + merge，不逐日循环
+
+用法:
+    python backtest_puts.py --where "prob < 0.2 and dte between 20 and 45" --tickers SPY QQQ
+"""
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import screening
+from rules import RuleError, compile_rule
+import chain_archive
+
+# 一张期权对应的股数
+CONTRACT_MULTIPLIER = 100
+
+DEFAULT_WHERE = f"type == put and {screening.DEFAULT_SCREEN}"
+
+TRADE_COLUMNS = [
+    'ticker', 'entry_date', 'expiration_date', 'days_to_expiry', 'strike', 'entry_spot', 'premium',
+    'exercise_probability', 'annualized_return', 'settle_date', 'settle_price', 'status', 'assigned',
+    'pnl', 'trade_return'
+]
+
+
+def load_history(data_dir, tickers=None):
+    """读取所有标的的归档看跌期权链，返回一个DataFrame（带 asof 列）"""
+    tickers = tickers or chain_archive.list_archived_tickers(data_dir)
+    frames = []
+    for ticker in tickers:
+        chains = chain_archive.load_archived_chains(data_dir, ticker)
+        if chains is None:
+            print(f"  {ticker} 没有归档数据，跳过...")
+            continue
+        frames.append(chains)
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def price_paths(chains, calendar):
+    """
+    各标的的价格路径（归档时的现价），对齐到统一的交易日历并向前填充
+
+    返回:
+        DataFrame: 行为 calendar，列为标的
+    """
+    prices = chains.groupby(['asof', 'ticker'])['current_price'].first().unstack('ticker')
+    return prices.reindex(calendar).ffill()
+
+
+def select_entries(results, where=DEFAULT_WHERE, per_day=1, entry_every=1):
+    """
+    每个标的每个交易日选出年化收益率最高的 per_day 个满足条件的期权
+
+    entry_every: 每隔几个交易日开一次仓（按标的各自的归档日计数）
+    """
+    candidates = results[compile_rule(where)(results)]
+    if entry_every > 1:
+        day_number = candidates.groupby('ticker')['asof'].rank(method='dense').astype(int) - 1
+        candidates = candidates[(day_number % entry_every) == 0]
+    candidates = candidates.sort_values(['asof', 'ticker', 'annualized_return'],
+                                        ascending=[True, True, False], kind='stable')
+    return candidates.groupby(['asof', 'ticker'], sort=False).head(per_day).reset_index(drop=True)
+
+
+def settle_trades(entries, prices):
+    """
+    按价格路径结算每笔交易
+
+    到期日在数据范围内的交易用到期日（或之前最后一个交易日）的价格结算，
+    到期日晚于最后一个交易日的交易标记为 open
+    """
+    calendar = prices.index
+    tickers = entries['ticker'].to_numpy()
+    expiry = pd.to_datetime(entries['expiration_date']).to_numpy()
+    settle_pos = np.searchsorted(calendar.to_numpy(), expiry, side='right') - 1
+    closed = expiry <= calendar[-1].to_datetime64()
+
+    columns = {t: i for i, t in enumerate(prices.columns)}
+    price_matrix = prices.to_numpy()
+    settle_price = price_matrix[settle_pos, [columns[t] for t in tickers]]
+
+    strike = entries['strike'].to_numpy(dtype=np.float64)
+    premium = entries['option_price'].to_numpy(dtype=np.float64)
+    intrinsic = np.maximum(strike - settle_price, 0)
+
+    trades = pd.DataFrame({
+        'ticker': tickers,
+        'entry_date': entries['asof'].to_numpy(),
+        'expiration_date': entries['expiration_date'].to_numpy(),
+        'days_to_expiry': entries['days_to_expiry'].to_numpy(),
+        'strike': strike,
+        'entry_spot': entries['current_price'].to_numpy(),
+        'premium': premium,
+        'exercise_probability': entries['exercise_probability'].to_numpy(),
+        'annualized_return': entries['annualized_return'].to_numpy(),
+        'settle_date': np.where(closed, calendar[settle_pos].to_numpy(), np.datetime64('NaT')),
+        'settle_price': np.where(closed, settle_price, np.nan),
+        'status': np.where(closed, 'closed', 'open'),
+        'assigned': closed & (settle_price < strike),
+        'pnl': np.where(closed, (premium - intrinsic) * CONTRACT_MULTIPLIER, np.nan),
+    })
+    # 收益率的分母沿用 screening 的约定: 最大风险 = 行权价 - 权利金
+    trades['trade_return'] = trades['pnl'] / ((strike - premium) * CONTRACT_MULTIPLIER)
+    trades['_settle_pos'] = np.where(closed, settle_pos, len(calendar))
+    trades['_entry_pos'] = calendar.get_indexer(pd.to_datetime(trades['entry_date']))
+    return trades
+
+
+def equity_curve(trades, chains, prices):
+    """
+    逐日的账户权益（盯市）
+
+    持仓期间用当天归档中同一合约的价格估值，当天没有该合约报价时用内在价值；
+    到期结算后计入已实现盈亏
+    """
+    calendar = prices.index
+    n_days = len(calendar)
+    entry = trades['_entry_pos'].to_numpy()
+    settle = trades['_settle_pos'].to_numpy()
+
+    # 把每笔交易展开到它的每个持仓日: [entry, settle)
+    counts = np.maximum(settle - entry, 0)
+    trade_idx = np.repeat(np.arange(len(trades)), counts)
+    day_idx = entry[trade_idx] + np.arange(len(trade_idx)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    held = pd.DataFrame({
+        'asof': calendar[day_idx],
+        'ticker': trades['ticker'].to_numpy()[trade_idx],
+        'expiration_date': trades['expiration_date'].to_numpy()[trade_idx],
+        'strike': trades['strike'].to_numpy()[trade_idx],
+    })
+    quotes = chains[['asof', 'ticker', 'expiration_date', 'strike', 'option_price']].drop_duplicates(
+        ['asof', 'ticker', 'expiration_date', 'strike'])
+    marks = held.merge(quotes, on=['asof', 'ticker', 'expiration_date', 'strike'], how='left')['option_price'].to_numpy()
+
+    columns = {t: i for i, t in enumerate(prices.columns)}
+    spot = prices.to_numpy()[day_idx, [columns[t] for t in held['ticker']]]
+    intrinsic = np.maximum(held['strike'].to_numpy() - spot, 0)
+    marks = np.where(np.isfinite(marks), marks, intrinsic)
+
+    premium = trades['premium'].to_numpy()[trade_idx]
+    unrealized = np.bincount(day_idx, (premium - marks) * CONTRACT_MULTIPLIER, minlength=n_days)
+    collateral = np.bincount(day_idx, (held['strike'].to_numpy() - premium) * CONTRACT_MULTIPLIER, minlength=n_days)
+
+    closed = trades['status'].to_numpy() == 'closed'
+    realized = np.cumsum(np.bincount(settle[closed], trades['pnl'].to_numpy()[closed], minlength=n_days))
+
+    curve = pd.DataFrame({
+        'realized': realized,
+        'unrealized': unrealized,
+        'equity': realized + unrealized,
+        'collateral': collateral,
+        'open_positions': np.bincount(day_idx, minlength=n_days),
+    }, index=calendar)
+    curve.index.name = 'date'
+    return curve
+
+
+def summarize(trades, curve, capital=None):
+    """
+    回测统计
+
+    capital: 账户资金，默认取回测期间占用保证金（行权价-权利金）的峰值
+    """
+    capital = capital or float(curve['collateral'].max()) or 1.0
+    closed = trades[trades['status'] == 'closed']
+    years = max((curve.index[-1] - curve.index[0]).days / 365, 1 / 365)
+
+    equity = curve['equity'] / capital
+    drawdown = equity - np.maximum.accumulate(np.maximum(equity, 0))
+    total_return = float(curve['realized'].iloc[-1]) / capital
+    return {
+        'trades': len(trades),
+        'closed_trades': len(closed),
+        'open_trades': len(trades) - len(closed),
+        'assignment_rate': float(closed['assigned'].mean()) if len(closed) else np.nan,
+        'win_rate': float((closed['pnl'] > 0).mean()) if len(closed) else np.nan,
+        'avg_trade_return': float(closed['trade_return'].mean()) if len(closed) else np.nan,
+        'total_premium': float(closed['premium'].sum() * CONTRACT_MULTIPLIER),
+        'realized_pnl': float(closed['pnl'].sum()),
+        'capital': capital,
+        'realized_return': total_return,
+        'annualized_return': (1 + total_return) ** (1 / years) - 1 if total_return > -1 else -1.0,
+        'max_drawdown': float(drawdown.min()),
+    }
+
+
+def run_backtest(chains, where=DEFAULT_WHERE, per_day=1, entry_every=1, capital=None):
+    """
+    运行回测
+
+    返回:
+        (交易明细, 权益曲线, 统计) ；没有任何交易时返回 (None, None, None)
+    """
+    results = screening.compute_metrics(chains, keep=['asof'])
+    entries = select_entries(results, where, per_day, entry_every)
+    if entries.empty:
+        return None, None, None
+
+    calendar = pd.DatetimeIndex(np.sort(chains['asof'].unique()))
+    prices = price_paths(chains, calendar)
+    trades = settle_trades(entries, prices)
+    curve = equity_curve(trades, chains, prices)
+    stats = summarize(trades, curve, capital)
+    return trades[TRADE_COLUMNS], curve, stats
+
+
+def print_stats(stats, trades):
+    print(f"\n交易数: {stats['trades']} (已到期 {stats['closed_trades']}，未到期 {stats['open_trades']})")
+    print(f"被行权比例: {stats['assignment_rate']:.2%}")
+    print(f"胜率: {stats['win_rate']:.2%}")
+    print(f"平均单笔收益率: {stats['avg_trade_return']:.2%}")
+    print(f"收取权利金: ${stats['total_premium']:,.2f}")
+    print(f"已实现盈亏: ${stats['realized_pnl']:,.2f} (资金 ${stats['capital']:,.0f})")
+    print(f"已实现收益率: {stats['realized_return']:.2%} (年化 {stats['annualized_return']:.2%})")
+    print(f"最大回撤: {stats['max_drawdown']:.2%}")
+
+    closed = trades[trades['status'] == 'closed']
+    if closed['ticker'].nunique() > 1:
+        by_ticker = closed.groupby('ticker').agg(
+            trades=('pnl', 'size'), pnl=('pnl', 'sum'),
+            assignment_rate=('assigned', 'mean'), avg_return=('trade_return', 'mean'))
+        print("\n按标的:")
+        print(by_ticker.to_string(float_format=lambda x: f'{x:.4f}'))
+
+
+def main():
+    default_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='卖出看跌期权筛选回测')
+    parser.add_argument('--data-dir', default=os.path.join(default_dir, 'data'))
+    parser.add_argument('--tickers', nargs='*', help='只回测这些标的（默认所有有归档的标的）')
+    parser.add_argument('--where', default=DEFAULT_WHERE, help='开仓条件（rules.py 语法）')
+    parser.add_argument('--per-day', type=int, default=1, help='每个标的每次开仓的张数（取前N个）')
+    parser.add_argument('--entry-every', type=int, default=1, help='每隔几个交易日开仓一次')
+    parser.add_argument('--capital', type=float, help='账户资金（默认取保证金峰值）')
+    parser.add_argument('--output-dir', default=os.path.join(default_dir, 'results'))
+    args = parser.parse_args()
+
+    try:
+        compile_rule(args.where)
+    except RuleError as e:
+        print(f"筛选条件有误: {e}")
+        return 2
+
+    chains = load_history(args.data_dir, args.tickers)
+    if chains is None:
+        print("没有归档数据。download_options_data.py 每次下载后会自动归档当天的期权链")
+        return 1
+    print(f"读取 {chains['ticker'].nunique()} 个标的、{chains['asof'].nunique()} 个交易日的 {len(chains)} 个期权")
+
+    trades, curve, stats = run_backtest(chains, args.where, args.per_day, args.entry_every, args.capital)
+    if trades is None:
+        print("没有满足条件的交易")
+        return 1
+    print_stats(stats, trades)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    trades.to_csv(os.path.join(args.output_dir, 'backtest_trades.csv'), index=False)
+    curve.to_csv(os.path.join(args.output_dir, 'backtest_equity.csv'))
+    print(f"\n交易明细和权益曲线保存到 {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+期权链每日归档
+download_options_data.py 每次下载后把期权链复制到 data/<标的>/archive/<YYYYMMDDTHHMMSS>/（布局见 snapshot_archive），
+同一天只保留最后一次归档，回测时按日期重放。归档的看跌期权汇总成一个增量缓存文件，重复回测不必重新读几千个CSV
+"""
+
+import os
+import glob
+import json
+import pickle
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+import snapshot_archive
+from snapshot_archive import ARCHIVE_DIRNAME, list_archives
+
+import screening
+
+ARCHIVE_CACHE = 'chains.pkl'
+
+
+def archive_ticker_data(ticker_dir, asof=None):
+    """
+    把 ticker_dir 下当前的 info.json 和期权链CSV归档到 archive/<时间戳>/
+
+    同一天之前的归档在新归档写好后删除。返回归档目录
+    """
+    asof = asof or datetime.now()
+
+    with open(os.path.join(ticker_dir, 'info.json'), 'r') as f:
+        info = json.load(f)
+    # 只归档本次下载的到期日，目录里残留的旧到期日文件不复制
+    expirations = info.get('expiration_dates') or []
+    if expirations:
+        files = [f"{exp}_{kind}.csv" for exp in expirations for kind in ('puts', 'calls')]
+    else:
+        files = [os.path.basename(path) for path in glob.glob(os.path.join(ticker_dir, '*.csv'))]
+    info['timestamp'] = asof.isoformat(timespec='seconds')
+
+    name = snapshot_archive.archive_name(asof)
+    target = snapshot_archive.create_archive(ticker_dir, name, files, info=info, replace=True)
+
+    archive_dir = os.path.dirname(target)
+    for old in list_archives(os.path.dirname(ticker_dir), os.path.basename(ticker_dir)):
+        if old != name and snapshot_archive.archive_time(old).date() == asof.date():
+            shutil.rmtree(os.path.join(archive_dir, old))
+    return target
+
+
+def _daily_sources(data_dir, ticker):
+    """每个归档日最后一次归档的 {日期: (目录名, 修改时间)}，用来判断缓存中哪些日期需要重新读取"""
+    archive_dir = os.path.join(data_dir, ticker, ARCHIVE_DIRNAME)
+    sources = {}
+    for name in list_archives(data_dir, ticker):
+        day = snapshot_archive.archive_time(name).strftime('%Y-%m-%d')
+        sources[day] = (name, os.stat(os.path.join(archive_dir, name)).st_mtime_ns)
+    return sources
+
+
+def list_archived_tickers(data_dir):
+    return sorted(t for t in screening.list_tickers(data_dir) if list_archives(data_dir, t))
+
+
+def load_archived_chains(data_dir, ticker, option_types=('put',), band=None):
+    """
+    读取标的所有归档日的期权链，增加 asof（归档日期）列
+
+    结果缓存在 archive/chains.pkl，按每天使用的归档目录及其修改时间增量更新：
+    只读取新增或重新归档的日期，已删除的日期从缓存中去掉。
+    缓存与参数 (option_types, band) 绑定，参数不同时重新读取
+    """
+    archive_dir = os.path.join(data_dir, ticker, ARCHIVE_DIRNAME)
+    cache_file = os.path.join(archive_dir, ARCHIVE_CACHE)
+    key = (tuple(option_types), band)
+
+    cached = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = pickle.load(f)
+        except Exception:
+            cached = None
+    # 旧版缓存只记录了日期，无法判断是否重新归档，直接重建
+    if cached is not None and (cached.get('key') != key or 'sources' not in cached):
+        cached = None
+
+    sources = _daily_sources(data_dir, ticker)
+    known = cached['sources'] if cached is not None else {}
+    stale = [day for day in known if known[day] != sources.get(day)]
+    fresh = [day for day in sources if known.get(day) != sources[day]]
+
+    frames = []
+    if cached is not None and cached['frame'] is not None:
+        frame = cached['frame']
+        if stale:
+            frame = frame[~frame['asof'].isin(pd.to_datetime(stale))]
+        frames.append(frame)
+    for day in fresh:
+        name = sources[day][0]
+        asof = datetime.strptime(day, '%Y-%m-%d')
+        chains = screening.load_chain_dir(os.path.join(archive_dir, name), ticker, asof, band, option_types)
+        if chains is None:
+            continue
+        chains.insert(0, 'asof', pd.Timestamp(asof))
+        frames.append(chains)
+
+    frame = None
+    if frames:
+        frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if stale or fresh:
+        if frame is not None:
+            frame = frame.sort_values(['asof', 'expiration_date', 'strike'], kind='stable').reset_index(drop=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump({'key': key, 'sources': sources, 'frame': frame}, f)
+    return frame
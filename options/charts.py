@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台图表渲染
+分析代码只生成图表描述（spec，见 bar_spec / scatter_spec），交给进程池在后台用 Agg 渲染，
+分析结果不必等图表画完就可以返回。
+
+每个工作进程只创建一个 Figure，每张图画完保存后 clear() 复用；不经过 pyplot，
+不会在全局状态里堆积未关闭的图形。进程池在 wait() / shutdown() 时回收
+"""
+
+import os
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+DEFAULT_WORKERS = 2
+DEFAULT_SIZE = (12, 8)
+
+# 传给工作进程的绘图设置（中文字体等）
+RC_KEYS = ['font.sans-serif', 'axes.unicode_minus']
+
+_executor = None
+_pending = []
+_figure = None
+
+
+def bar_spec(filename, labels, values, title, xlabel, ylabel, color=None, size=DEFAULT_SIZE):
+    """柱状图描述（labels 可以重复，按位置绘制）"""
+    return {'kind': 'bar', 'filename': filename, 'x': list(labels), 'y': list(values),
+            'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'color': color, 'size': size}
+
+
+def scatter_spec(filename, x, y, title, xlabel, ylabel, alpha=0.5, size=DEFAULT_SIZE):
+    """散点图描述"""
+    return {'kind': 'scatter', 'filename': filename, 'x': x, 'y': y,
+            'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'alpha': alpha, 'size': size}
+
+
+def _init_worker(rc):
+    matplotlib.use('Agg')
+    matplotlib.rcParams.update(rc)
+
+
+def _get_figure():
+    """当前进程复用的 Figure（Agg 画布）"""
+    global _figure
+    if _figure is None:
+        _figure = Figure()
+        FigureCanvasAgg(_figure)
+    return _figure
+
+
+def render(spec, output_dir):
+    """按描述画一张图并保存，返回文件路径"""
+    fig = _get_figure()
+    fig.clear()
+    fig.set_size_inches(*spec['size'])
+    ax = fig.add_subplot()
+    if spec['kind'] == 'bar':
+        positions = range(len(spec['x']))
+        ax.bar(positions, spec['y'], color=spec['color'])
+        ax.set_xticks(list(positions), [str(label) for label in spec['x']], rotation=90)
+    elif spec['kind'] == 'scatter':
+        ax.scatter(spec['x'], spec['y'], alpha=spec['alpha'])
+    else:
+        raise ValueError(f"未知的图表类型: {spec['kind']}")
+    ax.set_title(spec['title'])
+    ax.set_xlabel(spec['xlabel'])
+    ax.set_ylabel(spec['ylabel'])
+    fig.tight_layout()
+
+    path = os.path.join(output_dir, spec['filename'])
+    fig.savefig(path)
+    fig.clear()
+    return path
+
+
+def render_async(specs, output_dir, workers=DEFAULT_WORKERS):
+    """
+    提交图表到后台进程池，立即返回
+
+    workers 为0时在当前进程同步渲染（同样不经过 pyplot）
+    """
+    global _executor
+    if workers <= 0:
+        for spec in specs:
+            print(f"保存图表到 {render(spec, output_dir)}")
+        return
+    if _executor is None:
+        rc = {key: matplotlib.rcParams[key] for key in RC_KEYS}
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rc,))
+    _pending.extend(_executor.submit(render, spec, output_dir) for spec in specs)
+
+
+def wait():
+    """等待已提交的图表全部完成，输出保存路径；返回成功保存的路径列表"""
+    paths = []
+    while _pending:
+        future = _pending.pop(0)
+        try:
+            path = future.result()
+        except Exception as e:
+            print(f"图表渲染失败: {e}")
+            continue
+        print(f"保存图表到 {path}")
+        paths.append(path)
+    return paths
+
+
+def shutdown():
+    """等待未完成的图表并关闭进程池"""
+    global _executor
+    wait()
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+atexit.register(shutdown)
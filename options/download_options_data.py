@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import yfinance as yf
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -10,6 +13,9 @@ import time
 import json
 import pickle
 
+from chain_archive import archive_ticker_data
+from expirations import ExpirationCalendar
+
 # 创建数据目录
 data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 os.makedirs(data_dir, exist_ok=True)
@@ -17,115 +23,143 @@ os.makedirs(data_dir, exist_ok=True)
 # 需要分析的股票列表 - 只下载SPY
 tickers = ["SPY"]
 
-def find_closest_expiration(expirations, target_date):
-    """找到最接近目标日期的到期日"""
-    if not expirations:
+# 本地缓存的有效期（秒）：超过有效期的股价/到期日列表/期权链才重新下载
+DEFAULT_TTL = 15 * 60
+
+# 目标到期天数（一周、两周、一个月、两个月）
+TARGET_DAYS = [7, 14, 30, 60]
+
+def select_expirations(expiration_dates, today=None):
+    """找到最接近各目标日期的到期日（去重，保持目标顺序）"""
+    today = today or datetime.now()
+    calendar = ExpirationCalendar(expiration_dates)
+    selected_expirations = []
+    for closest_exp in calendar.nearest([today + timedelta(days=days) for days in TARGET_DAYS]):
+        if closest_exp and closest_exp not in selected_expirations:
+            selected_expirations.append(closest_exp)
+    return selected_expirations
+
+def _is_fresh(path, ttl):
+    """文件存在且修改时间在有效期内"""
+    return ttl > 0 and os.path.exists(path) and time.time() - os.path.getmtime(path) < ttl
+
+def _load_info(ticker_dir, ttl):
+    """读取未过期的 info.json，过期或不存在时返回None"""
+    info_file = os.path.join(ticker_dir, 'info.json')
+    if not _is_fresh(info_file, ttl):
         return None
-    
-    closest = expirations[0]
-    closest_diff = abs((datetime.strptime(closest, '%Y-%m-%d') - target_date).days)
-    
-    for exp in expirations:
-        exp_date = datetime.strptime(exp, '%Y-%m-%d')
-        diff = abs((exp_date - target_date).days)
-        if diff < closest_diff:
-            closest = exp
-            closest_diff = diff
-    
-    return closest
+    with open(info_file, 'r') as f:
+        info = json.load(f)
+    if not info.get('current_price') or not info.get('expiration_dates'):
+        return None
+    return info
+
+def ensure_ticker_data(ticker, ttl=DEFAULT_TTL):
+    """
+    缓存优先：只下载本地缺失或超过有效期的数据
+
+    参数:
+        ttl: 有效期（秒），0 表示全部重新下载
+
+    返回:
+        (是否成功, 本次下载的期权链数量)
+    """
+    ticker_dir = os.path.join(data_dir, ticker)
+    os.makedirs(ticker_dir, exist_ok=True)
+
+    ticker_data = _load_info(ticker_dir, ttl)
+    stale = []
+    if ticker_data is not None:
+        stale = [exp for exp in ticker_data['expiration_dates']
+                 if not all(_is_fresh(os.path.join(ticker_dir, f"{exp}_{kind}.csv"), ttl) for kind in ('puts', 'calls'))]
+        if not stale:
+            print(f"{ticker} 的本地数据在有效期内，无需下载")
+            return True, 0
+
+    if yf is None:
+        print(f"  未安装yfinance，无法下载 {ticker} 的数据")
+        return False, 0
 
-def download_ticker_data(ticker):
-    """下载单个股票的期权数据"""
     print(f"下载 {ticker} 的数据...")
-    
     try:
-        ticker_data = {}
-        
-        # 创建该股票的数据目录
-        ticker_dir = os.path.join(data_dir, ticker)
-        os.makedirs(ticker_dir, exist_ok=True)
-        
-        # 获取股票信息
         stock = yf.Ticker(ticker)
-        time.sleep(1)  # 添加延时
-        
-        # 获取股票当前价格
-        current_price = stock.info.get('regularMarketPrice', 0)
-        if current_price == 0:
-            current_price = stock.history(period="1d")['Close'].iloc[-1]
-        
-        print(f"  当前股价: {current_price}")
-        ticker_data['current_price'] = current_price
-        
-        # 获取期权到期日列表
-        print(f"  获取期权到期日列表...")
-        time.sleep(2)  # 添加延时
-        
-        try:
-            expiration_dates = stock.options
-            print(f"  获取到 {len(expiration_dates)} 个到期日")
+
+        if ticker_data is None:
+            time.sleep(1)  # 添加延时
             
-            # 计算特定的目标日期（一周、两周、一个月、两个月）
-            today = datetime.now()
-            target_dates = [
-                today + timedelta(days=7),    # 一周
-                today + timedelta(days=14),   # 两周
-                today + timedelta(days=30),   # 一个月
-                today + timedelta(days=60)    # 两个月
-            ]
+            # 获取股票当前价格
+            current_price = stock.info.get('regularMarketPrice', 0)
+            if current_price == 0:
+                current_price = stock.history(period="1d")['Close'].iloc[-1]
+            print(f"  当前股价: {current_price}")
             
-            # 找到最接近目标日期的到期日
-            selected_expirations = []
-            for target in target_dates:
-                closest_exp = find_closest_expiration(expiration_dates, target)
-                if closest_exp and closest_exp not in selected_expirations:
-                    selected_expirations.append(closest_exp)
+            # 获取期权到期日列表
+            print(f"  获取期权到期日列表...")
+            time.sleep(2)  # 添加延时
+            try:
+                expiration_dates = stock.options
+            except Exception as e:
+                print(f"  获取期权到期日出错: {e}")
+                return False, 0
+            print(f"  获取到 {len(expiration_dates)} 个到期日")
             
-            print(f"  选择下载以下到期日: {selected_expirations}")
-            ticker_data['expiration_dates'] = selected_expirations
+            selected_expirations = select_expirations(expiration_dates)
+            ticker_data = {
+                'current_price': float(current_price),
+                'expiration_dates': selected_expirations,
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+            }
             
             # 保存基本信息
             with open(os.path.join(ticker_dir, 'info.json'), 'w') as f:
                 json.dump(ticker_data, f)
             
-            # 为每个选定的到期日下载期权数据
-            for exp_date in selected_expirations:
-                # 添加延时
-                time.sleep(3)
+            # 股价更新后所有期权链都要重新下载
+            stale = selected_expirations
+        
+        print(f"  下载以下到期日: {stale}")
+        
+        fetched = 0
+        for i, exp_date in enumerate(stale):
+            if i > 0:
+                time.sleep(2)  # 两次请求之间的延时
+            
+            print(f"  下载到期日 {exp_date} 的期权数据...")
+            try:
+                option_chain = stock.option_chain(exp_date)
                 
-                print(f"  下载到期日 {exp_date} 的期权数据...")
+                # 保存看跌期权数据
+                puts_df = option_chain.puts
+                puts_file = os.path.join(ticker_dir, f"{exp_date}_puts.csv")
+                puts_df.to_csv(puts_file, index=False)
+                print(f"    保存了 {len(puts_df)} 个看跌期权到 {puts_file}")
                 
-                try:
-                    option_chain = stock.option_chain(exp_date)
-                    
-                    # 保存看跌期权数据
-                    puts_df = option_chain.puts
-                    puts_file = os.path.join(ticker_dir, f"{exp_date}_puts.csv")
-                    puts_df.to_csv(puts_file, index=False)
-                    print(f"    保存了 {len(puts_df)} 个看跌期权到 {puts_file}")
-                    
-                    # 保存看涨期权数据
-                    calls_df = option_chain.calls
-                    calls_file = os.path.join(ticker_dir, f"{exp_date}_calls.csv")
-                    calls_df.to_csv(calls_file, index=False)
-                    print(f"    保存了 {len(calls_df)} 个看涨期权到 {calls_file}")
-                    
-                    # 添加延时
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    print(f"    下载到期日 {exp_date} 的期权数据时出错: {e}")
-                    continue
-            
-            return True
-            
-        except Exception as e:
-            print(f"  获取期权到期日出错: {e}")
-            return False
+                # 保存看涨期权数据
+                calls_df = option_chain.calls
+                calls_file = os.path.join(ticker_dir, f"{exp_date}_calls.csv")
+                calls_df.to_csv(calls_file, index=False)
+                print(f"    保存了 {len(calls_df)} 个看涨期权到 {calls_file}")
+                fetched += 1
+                
+            except Exception as e:
+                print(f"    下载到期日 {exp_date} 的期权数据时出错: {e}")
+                continue
+        
+        if fetched:
+            # 归档当天的期权链，供 backtest_puts.py 回测使用
+            archive_dir = archive_ticker_data(ticker_dir)
+            print(f"  归档到 {archive_dir}")
+        
+        return True, fetched
         
     except Exception as e:
         print(f"下载 {ticker} 数据时出错: {e}")
-        return False
+        return False, 0
+
+def download_ticker_data(ticker):
+    """下载单个股票的期权数据（忽略本地缓存）"""
+    success, _ = ensure_ticker_data(ticker, ttl=0)
+    return success
 
 def download_all_data():
     """下载所有股票的期权数据"""
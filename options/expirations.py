@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+到期日日历
+到期日字符串只解析一次，保存为有序的日序数（date.toordinal）数组，
+最近到期日、之后第一个到期日、日期范围查询都用 searchsorted 完成，支持一次查询多个目标日期
+
+目标时间带有时分秒时按 (到期日 - 目标时间).days 的取整方式换算（与 datetime 相减后取 .days 一致），
+因此结果与逐个 strptime 比较的旧实现相同
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# 到期天数分组: (标签, 最小天数, 最大天数)，扫描器用来按期限分组
+DTE_BUCKETS = [
+    ('weekly', 0, 9),
+    ('monthly', 10, 45),
+    ('quarterly', 46, 120),
+    ('leaps', 121, None),
+]
+
+
+def _ordinal(value):
+    """
+    目标日期换算为日序数
+
+    datetime 带有时间部分时向上取整到下一天：
+    (到期日 - 目标时间).days == 到期日序数 - 向上取整后的序数
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value, DATE_FORMAT)
+    if isinstance(value, datetime):
+        has_time = value.time() != datetime.min.time()
+        return value.toordinal() + (1 if has_time else 0)
+    if isinstance(value, date):
+        return value.toordinal()
+    if isinstance(value, np.datetime64):
+        return _ordinal(value.astype('datetime64[us]').item())
+    # pandas.Timestamp
+    return _ordinal(value.to_pydatetime())
+
+
+def _ordinals(values):
+    if isinstance(values, (str, date, np.datetime64)) or not hasattr(values, '__iter__'):
+        return np.array([_ordinal(values)], dtype=np.int64), True
+    return np.array([_ordinal(v) for v in values], dtype=np.int64), False
+
+
+class ExpirationCalendar:
+    """
+    一个标的的到期日集合
+
+    dates: 到期日字符串（YYYY-MM-DD）或 date 对象。无法解析的字符串记录在 invalid 中
+    """
+
+    def __init__(self, dates):
+        parsed = {}
+        self.invalid = []
+        for value in dates:
+            try:
+                ordinal = _ordinal(value)
+            except (ValueError, TypeError):
+                self.invalid.append(value)
+                continue
+            label = value if isinstance(value, str) else date.fromordinal(ordinal).strftime(DATE_FORMAT)
+            parsed.setdefault(ordinal, label)
+
+        self.ordinals = np.array(sorted(parsed), dtype=np.int64)
+        self.labels = np.array([parsed[o] for o in self.ordinals], dtype=object)
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __iter__(self):
+        return iter(self.labels.tolist())
+
+    def __repr__(self):
+        return f"ExpirationCalendar({len(self)} 个到期日)"
+
+    def _result(self, idx, valid, single):
+        if len(self) == 0:
+            labels = np.full(len(idx), None, dtype=object)
+        else:
+            labels = self.labels[np.minimum(idx, len(self) - 1)]
+            labels[~valid] = None
+        return labels[0] if single else labels.tolist()
+
+    def nearest(self, targets):
+        """
+        最接近目标日期的到期日，距离相同时取较早的到期日
+
+        targets 为单个日期时返回字符串，为序列时返回列表；没有到期日时返回None
+        """
+        target, single = _ordinals(targets)
+        return self._nearest(target, single)
+
+    def _nearest(self, target, single):
+        if len(self) == 0:
+            return self._result(target, np.zeros(len(target), dtype=bool), single)
+        right = np.searchsorted(self.ordinals, target, side='left')
+        left = np.clip(right - 1, 0, len(self) - 1)
+        right = np.clip(right, 0, len(self) - 1)
+        take_left = np.abs(target - self.ordinals[left]) <= np.abs(self.ordinals[right] - target)
+        idx = np.where(take_left, left, right)
+        return self._result(idx, np.ones(len(target), dtype=bool), single)
+
+    def next_after(self, targets, inclusive=True):
+        """目标日期之后（inclusive=True 时含当天）的第一个到期日，没有时为None"""
+        target, single = _ordinals(targets)
+        idx = np.searchsorted(self.ordinals, target, side='left' if inclusive else 'right')
+        return self._result(idx, idx < len(self), single)
+
+    def between(self, start=None, end=None):
+        """start 与 end 之间（含两端）的到期日"""
+        lo = 0 if start is None else np.searchsorted(self.ordinals, _ordinal(start), side='left')
+        hi = len(self) if end is None else np.searchsorted(self.ordinals, _ordinal(end), side='right')
+        return self.labels[lo:hi].tolist()
+
+    def dte(self, asof=None):
+        """各到期日距 asof 的天数（与 (到期日 - asof).days 相同），返回 {到期日: 天数}"""
+        days = self.ordinals - _ordinal(asof or datetime.now())
+        return dict(zip(self.labels.tolist(), days.tolist()))
+
+    def buckets(self, asof=None, buckets=DTE_BUCKETS):
+        """按到期天数分组，返回 {标签: [到期日...]}，已到期的不计入"""
+        days = self.ordinals - _ordinal(asof or datetime.now())
+        labels = dte_bucket(days, buckets)
+        return {name: self.labels[labels == name].tolist() for name, _, _ in buckets}
+
+
+def dte_bucket(days, buckets=DTE_BUCKETS):
+    """
+    到期天数数组 -> 分组标签数组（向量化）
+
+    不属于任何分组（如负数）的为None
+    """
+    days = np.asarray(days, dtype=np.float64)
+    labels = np.full(days.shape, None, dtype=object)
+    for name, low, high in buckets:
+        mask = days >= low
+        if high is not None:
+            mask &= days <= high
+        labels[mask] = name
+    return labels
+
+
+def nearest_for_tickers(calendars, targets):
+    """
+    多个标的批量查询最近到期日
+
+    参数:
+        calendars: {标的: ExpirationCalendar}
+        targets: 目标日期列表
+
+    返回:
+        {标的: [到期日...]}，与 targets 一一对应
+    """
+    target, _ = _ordinals(list(targets))
+    return {ticker: calendar._nearest(target, False) for ticker, calendar in calendars.items()}
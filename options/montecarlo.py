@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+蒙特卡洛评估卖出期权的期望收益、CVaR和凯利仓位
+每个候选合约按自己的隐含波动率模拟到期价格（对数正态），计算卖方到期盈亏的分布。
+
+同一标的的所有候选共用一组随机数（common random numbers + 对偶变量），
+一次生成 (候选数 × 路径数) 的矩阵批量计算；候选按块处理，内存占用有上限
+"""
+
+import zlib
+
+import numpy as np
+
+import screening
+
+DEFAULT_PATHS = 20000
+DEFAULT_ALPHA = 0.05
+DEFAULT_SEED = 42
+
+# 每块最多处理的 候选数×路径数，控制内存（约 8 字节/元素，多个临时数组）
+CHUNK_ELEMENTS = 2_000_000
+
+# 凯利公式的牛顿迭代次数
+KELLY_ITERATIONS = 8
+
+SCORE_COLUMNS = ['mc_ev', 'mc_cvar', 'mc_pop', 'mc_ev_to_cvar', 'kelly_fraction']
+
+
+def common_normals(paths, seed):
+    """标准正态随机数（对偶变量: 前一半与后一半互为相反数）"""
+    half = np.random.default_rng(seed).standard_normal((paths + 1) // 2)
+    return np.concatenate([half, -half])[:paths]
+
+
+def terminal_prices(spot, sigma, years, z, drift):
+    """
+    到期价格矩阵
+
+    参数:
+        spot: 现价（标量）
+        sigma, years: 形状为 (n,) 的候选参数
+        z: 形状为 (paths,) 的共用随机数
+    返回:
+        形状为 (n, paths) 的数组
+    """
+    sigma = sigma[:, None]
+    years = years[:, None]
+    return spot * np.exp((drift - 0.5 * sigma**2) * years + sigma * np.sqrt(years) * z[None, :])
+
+
+def kelly_fraction(returns):
+    """
+    凯利仓位: 最大化 E[log(1 + f·R)] 的 f（每行一个候选）
+
+    returns 按最大模拟亏损归一化（最差情况 R = -1），f 为投入风险资金的比例，限制在 [0, 1)
+    """
+    mean = returns.mean(axis=1)
+    second = (returns ** 2).mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = np.clip(np.where(second > 0, mean / second, 0.0), 0.0, 0.99)
+    for _ in range(KELLY_ITERATIONS):
+        q = returns / (1 + f[:, None] * returns)
+        grad = q.mean(axis=1)
+        hess = -np.einsum('ij,ij->i', q, q) / q.shape[1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(hess < 0, grad / hess, 0.0)
+        f = np.clip(f - step, 0.0, 0.99)
+    return np.where(mean > 0, f, 0.0)
+
+
+def score_block(spot, strike, premium, sigma, years, is_call, z, drift, alpha):
+    """一块候选的卖方盈亏统计（每股）"""
+    prices = terminal_prices(spot, sigma, years, z, drift)
+    intrinsic = np.where(is_call[:, None], prices - strike[:, None], strike[:, None] - prices)
+    pnl = premium[:, None] - np.maximum(intrinsic, 0)
+    del prices, intrinsic
+
+    paths = pnl.shape[1]
+    tail = max(int(paths * alpha), 1)
+    worst = np.partition(pnl, tail - 1, axis=1)[:, :tail]
+    cvar = worst.mean(axis=1)
+    ev = pnl.mean(axis=1)
+
+    # 按最大模拟亏损归一化；所有路径都不亏损时按权利金归一化（凯利仓位取上限）
+    max_loss = -pnl.min(axis=1)
+    scale = np.where(max_loss > 0, max_loss, np.maximum(premium, 1e-12))
+    kelly = kelly_fraction(pnl / scale[:, None])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ev_to_cvar = np.where(cvar < 0, ev / -cvar, np.inf)
+    return ev, cvar, (pnl > 0).mean(axis=1), ev_to_cvar, kelly
+
+
+def score_candidates(candidates, paths=DEFAULT_PATHS, alpha=DEFAULT_ALPHA, seed=DEFAULT_SEED,
+                     drift=screening.RISK_FREE_RATE, sigma_column='implied_volatility'):
+    """
+    对筛选出的候选（compute_metrics 的结果格式）做蒙特卡洛评估
+
+    参数:
+        paths: 模拟路径数
+        alpha: CVaR 的尾部比例（0.05 即最差 5% 路径的平均盈亏）
+        drift: 标的的年化漂移率，默认无风险利率（风险中性）
+        sigma_column: 波动率列，默认合约自身的IV；有拟合曲面时可以传入曲面插值得到的列
+
+    返回:
+        candidates 的副本，增加 SCORE_COLUMNS 各列（按每股计）
+    """
+    scored = candidates.copy()
+    for column in SCORE_COLUMNS:
+        scored[column] = np.nan
+    if scored.empty:
+        return scored
+
+    chunk = max(CHUNK_ELEMENTS // paths, 1)
+    for ticker, group in scored.groupby('ticker', sort=False):
+        # 同一标的的所有候选使用同一组随机数（种子由标的代码决定，结果与其他标的无关）
+        z = common_normals(paths, [seed, zlib.crc32(ticker.encode())])
+        spot = float(group['current_price'].iloc[0])
+        strike = group['strike'].to_numpy(dtype=np.float64)
+        premium = group['option_price'].to_numpy(dtype=np.float64)
+        sigma = group[sigma_column].to_numpy(dtype=np.float64)
+        years = group['days_to_expiry'].to_numpy(dtype=np.float64) / 365
+        is_call = (group['option_type'] == 'call').to_numpy()
+
+        valid = np.flatnonzero((sigma > 0) & (years > 0) & np.isfinite(premium))
+        results = [np.full(len(group), np.nan) for _ in SCORE_COLUMNS]
+        for start in range(0, len(valid), chunk):
+            rows = valid[start:start + chunk]
+            block = score_block(spot, strike[rows], premium[rows], sigma[rows], years[rows],
+                                is_call[rows], z, drift, alpha)
+            for out, values in zip(results, block):
+                out[rows] = values
+        for column, values in zip(SCORE_COLUMNS, results):
+            scored.loc[group.index, column] = values
+    return scored
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式排行
+期权链按标的逐个读取（每个标的是一个分区），每个分区算完指标、更新排行后即丢弃，
+排行只保存在有界的最小堆中：全市场前k、每个标的前k、每种期权类型前k，以及每个标的的最佳看跌/看涨期权。
+内存占用只与单个标的的期权数量和 k 有关，与标的总数无关
+
+排序与 screening.top_overall 一致（按年化收益率降序），收益率相同时先读取的排在前面
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+import screening
+from rules import compile_rule
+
+DEFAULT_KEY = 'annualized_return'
+
+
+class TopK:
+    """
+    保留 key 最大的 k 条记录
+
+    堆中元素为 (key, -序号, 记录)：堆顶是当前最小的 key，key 相同时后读取的先被淘汰
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push_many(self, keys, seqs, records):
+        """批量加入（keys/seqs 为数组，records 为与之对应的元组列表）"""
+        heap = self._heap
+        for key, seq, record in zip(keys.tolist(), seqs.tolist(), records):
+            item = (key, -seq, record)
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def items(self):
+        """按 key 降序、序号升序返回记录"""
+        return [record for _, _, record in sorted(self._heap, reverse=True)]
+
+
+def _preselect(keys, k):
+    """分区内先选出前k个的位置（稳定排序，key 相同时保留先出现的），减少入堆次数"""
+    order = np.argsort(-keys, kind='stable')
+    return order[:k]
+
+
+class StreamingRanker:
+    """
+    流式排行器
+
+    参数:
+        k: 每个排行保留的条数
+        where: 候选条件（rules.py 语法），不满足的期权不进入任何排行
+        key: 排序字段，默认年化收益率
+    """
+
+    def __init__(self, k=screening.DEFAULT_TOP, where=screening.DEFAULT_SCREEN, key=DEFAULT_KEY):
+        self.k = k
+        self.where = where
+        self.key = key
+        self._rule = compile_rule(where)
+        self._offset = 0
+        self.columns = None
+        self.overall = TopK(k)
+        self.by_ticker = {}
+        self.by_type = {}
+        self.best = []
+        self.partitions = 0
+        self.rows = 0
+        self.candidates = 0
+
+    def update(self, results):
+        """
+        加入一个分区（compute_metrics 的结果，通常是一个标的）
+
+        返回该分区每个标的的最佳看跌/看涨期权（与 select_best_per_ticker 相同）
+        """
+        if self.columns is None:
+            self.columns = list(results.columns)
+        # 序号按读取顺序连续编号，用来在收益率相同时保持先后顺序
+        start = self._offset
+        self._offset += len(results)
+        self.partitions += 1
+        self.rows += len(results)
+
+        best = screening.select_best_per_ticker(results, self.where)
+        if not best.empty:
+            self.best.append(best)
+
+        mask = self._rule(results) & results[self.key].notna().to_numpy()
+        candidates = results[mask]
+        self.candidates += len(candidates)
+        if candidates.empty:
+            return best
+
+        keys = candidates[self.key].to_numpy(dtype=np.float64)
+        seqs = start + np.flatnonzero(mask)
+
+        # 每个排行先在分区内预选前k（位置数组），只把预选出的行转换为记录
+        selections = [(self.overall, _preselect(keys, self.k))]
+        for column, heaps in (('ticker', self.by_ticker), ('option_type', self.by_type)):
+            for value, idx in candidates.groupby(column, sort=False).indices.items():
+                heap = heaps.setdefault(value, TopK(self.k))
+                selections.append((heap, idx[_preselect(keys[idx], self.k)]))
+
+        needed = np.unique(np.concatenate([keep for _, keep in selections]))
+        rows = candidates[self.columns].iloc[needed].itertuples(index=False, name=None)
+        records = dict(zip(needed.tolist(), rows))
+        for heap, keep in selections:
+            heap.push_many(keys[keep], seqs[keep], [records[i] for i in keep.tolist()])
+        return best
+
+    def _frame(self, records):
+        return pd.DataFrame(records, columns=self.columns or screening.RESULT_COLUMNS)
+
+    def top_overall(self):
+        """全市场前k（同 screening.top_overall）"""
+        return self._frame(self.overall.items())
+
+    def top_by(self, category):
+        """按 'ticker' 或 'option_type' 分组的前k，分组按首次出现的顺序排列"""
+        heaps = self.by_ticker if category == 'ticker' else self.by_type
+        return self._frame([record for heap in heaps.values() for record in heap.items()])
+
+    def best_per_ticker(self):
+        """每个标的的最佳看跌/看涨期权（同 screening.select_best_per_ticker）"""
+        if not self.best:
+            return self._frame([])
+        return pd.concat(self.best, ignore_index=True)
+
+
+def rank_partitions(partitions, k=screening.DEFAULT_TOP, where=screening.DEFAULT_SCREEN,
+                    risk_free_rate=screening.RISK_FREE_RATE, verbose=True):
+    """
+    逐个分区计算指标并更新排行
+
+    参数:
+        partitions: 期权链分区的可迭代对象（如 screening.iter_ticker_chains 生成器）
+        verbose: 是否按标的输出汇总（同 screening.print_summary）
+
+    返回:
+        StreamingRanker
+    """
+    ranker = StreamingRanker(k, where)
+    for chains in partitions:
+        results = screening.compute_metrics(chains, risk_free_rate)
+        best = ranker.update(results)
+        if verbose:
+            screening.print_summary(results, best)
+    return ranker
+
+
+def rank_local_options(data_dir, tickers=None, k=screening.DEFAULT_TOP, where=screening.DEFAULT_SCREEN,
+                       band=screening.STRIKE_BAND, now=None, verbose=True):
+    """流式读取 data_dir 下的期权链并排行"""
+    partitions = screening.iter_ticker_chains(data_dir, tickers, now, band)
+    return rank_partitions(partitions, k, where, verbose=verbose)
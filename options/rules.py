@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+声明式筛选规则
+筛选条件写成表达式，例如:
+
+    prob < 0.2 and oi > 500 and dte between 7 and 45
+    type == put and (ret >= 15 or iv > 0.6) and ticker in (SPY, QQQ)
+
+表达式编译成对列数组的向量化布尔掩码。多个筛选一起求值时共用同一份列缓存，
+每一列只取一次，相同的比较条件（如多个筛选都写了 oi > 500）也只计算一次
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from expirations import dte_bucket
+
+# 字段别名: 名称 -> (列名, 缩放系数)。未列出的名称直接当作列名
+FIELDS = {
+    'prob': ('exercise_probability', 0.01),   # 被行权概率（小数，0.2 即 20%）
+    'ret': ('annualized_return', 1),          # 年化收益率（%）
+    'dte': ('days_to_expiry', 1),
+    'oi': ('open_interest', 1),
+    'vol': ('volume', 1),
+    'iv': ('implied_volatility', 1),
+    'price': ('option_price', 1),
+    'spot': ('current_price', 1),
+    'type': ('option_type', None),
+    'expiration': ('expiration_date', None),
+    # 蒙特卡洛评估（montecarlo.py）的结果列
+    'ev': ('mc_ev', 1),
+    'cvar': ('mc_cvar', 1),
+    'pop': ('mc_pop', 1),
+    'kelly': ('kelly_fraction', 1),
+}
+
+# 需要先做蒙特卡洛评估才有的字段
+MONTE_CARLO_FIELDS = {'ev', 'cvar', 'pop', 'kelly'}
+
+# 由其他列计算得到的字段
+DERIVED_FIELDS = {
+    'moneyness': lambda cols: cols.get('strike') / cols.get('spot'),
+    # 到期天数分组（expirations.DTE_BUCKETS）: weekly / monthly / quarterly / leaps
+    'bucket': lambda cols: dte_bucket(cols.get('dte')),
+}
+
+COMPARE_OPS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '=': np.equal,
+    '!=': np.not_equal,
+}
+
+KEYWORDS = {'and', 'or', 'not', 'between', 'in'}
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<date>\d{4}-\d{2}-\d{2})
+      | (?P<number>-?\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|-?\.\d+)
+      | (?P<string>'[^']*'|"[^"]*")
+      | (?P<op><=|>=|==|!=|<|>|=)
+      | (?P<punct>[(),])
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.\-]*)
+    )""", re.VERBOSE)
+
+
+class RuleError(ValueError):
+    """规则表达式有误"""
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None or match.end() == pos:
+            raise RuleError(f"无法解析 '{text[pos:]}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'number':
+            value = float(value)
+        elif kind == 'string':
+            value = value[1:-1]
+        elif kind == 'date':
+            kind = 'string'
+        elif kind == 'name' and value.lower() in KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    递归下降解析，结果是可哈希的元组树:
+        ('or', (子节点...)) / ('and', (子节点...)) / ('not', 子节点)
+        ('cmp', 字段, 运算符, 值) / ('between', 字段, 下限, 上限) / ('in', 字段, (值...))
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value or kind or '更多内容'
+            found = token[1] if token[0] else '表达式结尾'
+            raise RuleError(f"'{self.text}': 期望 {expected}，实际为 {found}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise RuleError(f"'{self.text}': 多余的内容 '{self.peek()[1]}'")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ('keyword', 'or'):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ('or', tuple(children))
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() == ('keyword', 'and'):
+            self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ('and', tuple(children))
+
+    def parse_not(self):
+        if self.peek() == ('keyword', 'not'):
+            self.take()
+            return ('not', self.parse_not())
+        if self.peek() == ('punct', '('):
+            self.take()
+            node = self.parse_or()
+            self.take('punct', ')')
+            return node
+        return self.parse_predicate()
+
+    def parse_value(self):
+        kind, value = self.peek()
+        if kind in ('number', 'string', 'name'):
+            self.pos += 1
+            return value
+        raise RuleError(f"'{self.text}': 期望数值或字符串，实际为 {value if kind else '表达式结尾'}")
+
+    def parse_predicate(self):
+        field = self.take('name')[1]
+        kind, value = self.peek()
+        if kind == 'op':
+            self.take()
+            return ('cmp', field, value, self.parse_value())
+        if (kind, value) == ('keyword', 'between'):
+            self.take()
+            low = self.parse_value()
+            self.take('keyword', 'and')
+            high = self.parse_value()
+            return ('between', field, low, high)
+        if (kind, value) == ('keyword', 'in'):
+            self.take()
+            self.take('punct', '(')
+            values = [self.parse_value()]
+            while self.peek() == ('punct', ','):
+                self.take()
+                values.append(self.parse_value())
+            self.take('punct', ')')
+            return ('in', field, tuple(values))
+        raise RuleError(f"'{self.text}': 字段 {field} 后面应为比较运算符、between 或 in")
+
+
+def parse_rule(text):
+    """把表达式解析成元组树"""
+    if not text or not text.strip():
+        raise RuleError("规则表达式为空")
+    return _Parser(text).parse()
+
+
+def rule_fields(node):
+    """表达式用到的字段名"""
+    if node[0] in ('or', 'and'):
+        return set().union(*(rule_fields(child) for child in node[1]))
+    if node[0] == 'not':
+        return rule_fields(node[1])
+    return {node[1]}
+
+
+def uses_monte_carlo(rule, sort=None):
+    """规则（compile_rule 的结果）或排序字段是否用到蒙特卡洛评估的字段"""
+    fields = rule_fields(rule.node)
+    if sort:
+        fields = fields | {sort.lstrip('-+')}
+    return bool(fields & (MONTE_CARLO_FIELDS | {FIELDS[name][0] for name in MONTE_CARLO_FIELDS}))
+
+
+class ColumnCache:
+    """
+    按需从DataFrame取列（字段别名、缩放、派生字段），并缓存子表达式的掩码
+
+    同一个缓存上求值的所有规则共享列数组和掩码
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.size = len(frame)
+        self.arrays = {}
+        self.masks = {}
+
+    def get(self, name):
+        if name in self.arrays:
+            return self.arrays[name]
+        if name in DERIVED_FIELDS:
+            values = DERIVED_FIELDS[name](self)
+        else:
+            column, scale = FIELDS.get(name, (name, 1))
+            if column not in self.frame.columns:
+                raise RuleError(f"未知字段: {name}")
+            series = self.frame[column]
+            if pd.api.types.is_numeric_dtype(series) and scale is not None:
+                values = series.to_numpy(dtype=np.float64)
+                if scale != 1:
+                    values = values * scale
+            else:
+                values = series.to_numpy(dtype=object)
+        self.arrays[name] = values
+        return values
+
+    def mask(self, node):
+        cached = self.masks.get(node)
+        if cached is None:
+            cached = self._evaluate(node)
+            self.masks[node] = cached
+        return cached
+
+    def _evaluate(self, node):
+        kind = node[0]
+        if kind == 'and':
+            return np.logical_and.reduce([self.mask(child) for child in node[1]])
+        if kind == 'or':
+            return np.logical_or.reduce([self.mask(child) for child in node[1]])
+        if kind == 'not':
+            return ~self.mask(node[1])
+
+        values = self.get(node[1])
+        numeric = values.dtype != object
+        if kind == 'cmp':
+            return COMPARE_OPS[node[2]](values, self._coerce(node[3], numeric, node[1]))
+        if kind == 'between':
+            low = self._coerce(node[2], numeric, node[1])
+            high = self._coerce(node[3], numeric, node[1])
+            return (values >= low) & (values <= high)
+        if kind == 'in':
+            choices = [self._coerce(v, numeric, node[1]) for v in node[2]]
+            return np.isin(values, choices)
+        raise RuleError(f"未知的节点类型: {kind}")
+
+    @staticmethod
+    def _coerce(value, numeric, field):
+        if numeric:
+            if isinstance(value, str):
+                raise RuleError(f"字段 {field} 是数值，不能与 '{value}' 比较")
+            return value
+        return value if isinstance(value, str) else format(value, 'g')
+
+
+def compile_rule(text):
+    """编译单条规则，返回一个接受 DataFrame 或 ColumnCache、返回布尔数组的函数"""
+    node = parse_rule(text)
+
+    def evaluate(data):
+        cache = data if isinstance(data, ColumnCache) else ColumnCache(data)
+        return cache.mask(node)
+
+    evaluate.node = node
+    evaluate.text = text
+    return evaluate
+
+
+class Screen:
+    """
+    一个命名的筛选: where 条件 + 排序 + 条数上限
+
+    sort: 排序字段（列名或别名），"-" 前缀表示降序
+    """
+
+    def __init__(self, name, where, sort='-ret', limit=None):
+        self.name = name
+        self.where = where
+        self.sort = sort
+        self.limit = limit
+        self.rule = compile_rule(where)
+
+    def __repr__(self):
+        return f"Screen({self.name!r}, {self.where!r}, sort={self.sort!r}, limit={self.limit})"
+
+    @classmethod
+    def parse(cls, spec, **kwargs):
+        """解析 "名称=表达式" 形式的命令行参数"""
+        name, sep, where = spec.partition('=')
+        if not sep or not name.strip():
+            raise RuleError(f"筛选应写成 名称=表达式: {spec}")
+        return cls(name.strip(), where.strip(), **kwargs)
+
+
+def evaluate_screens(frame, screens):
+    """
+    一次遍历求出多个筛选的掩码
+
+    返回:
+        DataFrame，每个筛选一列布尔值，索引与 frame 相同
+    """
+    cache = ColumnCache(frame)
+    return pd.DataFrame({screen.name: screen.rule(cache) for screen in screens}, index=frame.index)
+
+
+def _sort_column(frame, name):
+    column, _ = FIELDS.get(name, (name, 1))
+    if column not in frame.columns:
+        raise RuleError(f"未知排序字段: {name}")
+    return column
+
+
+def run_screens(frame, screens):
+    """
+    执行多个筛选
+
+    返回:
+        dict: 筛选名称 -> 排序并截断后的结果 DataFrame
+    """
+    masks = evaluate_screens(frame, screens)
+    results = {}
+    for screen in screens:
+        selected = frame[masks[screen.name].to_numpy()]
+        if screen.sort:
+            descending = screen.sort.startswith('-')
+            column = _sort_column(frame, screen.sort.lstrip('-+'))
+            selected = selected.sort_values(column, ascending=not descending)
+        if screen.limit:
+            selected = selected.head(screen.limit)
+        results[screen.name] = selected
+    return results
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+向量化期权卖方筛选引擎
+把所有标的、所有到期日的期权链读入一个DataFrame，
+按列计算被行权概率和年化收益率，并用分组argmax选出每个标的的最佳看跌/看涨期权
+"""
+
+import os
+import json
+import glob
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from rules import compile_rule
+from expirations import ExpirationCalendar
+
+# 无风险利率（美国10年期国债收益率的近似值）
+RISK_FREE_RATE = 0.04
+
+# 只分析行权价在现价 ±10% 范围内的期权；范围内没有期权时取最接近现价的5个
+STRIKE_BAND = 0.10
+FALLBACK_NEAREST = 5
+
+# 被行权概率上限（%）
+MAX_EXERCISE_PROBABILITY = 30
+
+# 默认筛选条件（rules.py 的表达式语法）及全市场排行的条数
+DEFAULT_SCREEN = f'exercise_probability < {MAX_EXERCISE_PROBABILITY}'
+DEFAULT_TOP = 10
+
+RESULT_COLUMNS = [
+    'ticker', 'option_type', 'expiration_date', 'days_to_expiry', 'strike',
+    'current_price', 'option_price', 'implied_volatility', 'exercise_probability',
+    'annualized_return', 'volume', 'open_interest'
+]
+
+
+def exercise_probability(S, K, T, r, sigma, is_call):
+    """
+    向量化的被行权概率（Black-Scholes风险中性概率）
+    Call: N(d2)，Put: N(-d2)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
+        d2 = d1 - sigma * np.sqrt(T)
+    return np.where(is_call, norm.cdf(d2), norm.cdf(-d2))
+
+
+def annualized_return(option_price, strike_price, spot_price, days_to_expiry, is_call):
+    """
+    向量化的卖方年化收益率（%）
+    Put最大风险 = 行权价 - 期权费；Call最大风险假设为现价的两倍
+    """
+    max_risk = np.where(is_call, spot_price * 2, strike_price - option_price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ret = option_price / max_risk * (365 / days_to_expiry) * 100
+    return np.where(max_risk > 0, ret, 0.0)
+
+
+def _filter_strikes(chain, current_price, band=STRIKE_BAND):
+    """只保留 ±band 范围内的行权价，范围内没有则取最接近现价的几个；band为None时不过滤"""
+    if band is None:
+        return chain
+    min_strike = current_price * (1 - band)
+    max_strike = current_price * (1 + band)
+    filtered = chain[(chain['strike'] >= min_strike) & (chain['strike'] <= max_strike)]
+    if len(filtered) > 0:
+        return filtered
+    return chain.iloc[abs(chain['strike'] - current_price).argsort()[:FALLBACK_NEAREST]]
+
+
+def _expiration_dates(ticker_dir, ticker_info):
+    expiration_dates = ticker_info.get('expiration_dates', [])
+    if not expiration_dates:
+        put_files = glob.glob(os.path.join(ticker_dir, "*_puts.csv"))
+        expiration_dates = [os.path.basename(f).split('_')[0] for f in put_files]
+    return expiration_dates
+
+
+def load_ticker_chains(data_dir, ticker, now=None, band=STRIKE_BAND):
+    """
+    读取单个标的所有未到期的期权链（已按行权价范围过滤）
+
+    返回:
+        DataFrame（每行一个合约，列为 RESULT_COLUMNS 中的原始字段），无数据时返回None
+    """
+    return load_chain_dir(os.path.join(data_dir, ticker), ticker, now, band)
+
+
+def load_chain_dir(ticker_dir, ticker, now=None, band=STRIKE_BAND, option_types=('put', 'call')):
+    """
+    读取一个期权链目录（info.json + <到期日>_puts.csv/_calls.csv）
+
+    ticker_dir 可以是 data/<标的>，也可以是归档目录 data/<标的>/archive/<时间戳>，
+    归档时 now 传入归档日期，到期天数按归档日计算
+    """
+    now = now or datetime.now()
+    info_file = os.path.join(ticker_dir, 'info.json')
+    if not os.path.exists(info_file):
+        print(f"  未找到 {ticker} 的信息文件，跳过...")
+        return None
+
+    with open(info_file, 'r') as f:
+        ticker_info = json.load(f)
+
+    current_price = ticker_info.get('current_price', 0)
+    if current_price == 0:
+        print(f"  无法获取 {ticker} 的当前价格，跳过...")
+        return None
+
+    frames = []
+    expiration_dates = _expiration_dates(ticker_dir, ticker_info)
+    calendar = ExpirationCalendar(expiration_dates)
+    for exp_date in calendar.invalid:
+        print(f"    处理到期日 {exp_date} 时出错: 无法解析日期")
+    dte = calendar.dte(now)
+
+    for exp_date in expiration_dates:
+        if exp_date not in dte:
+            continue
+        try:
+            days_to_expiry = dte[exp_date]
+            if days_to_expiry <= 0:
+                continue
+
+            for option_type in option_types:
+                chain_file = os.path.join(ticker_dir, f"{exp_date}_{option_type}s.csv")
+                if not os.path.exists(chain_file):
+                    continue
+                chain = _filter_strikes(pd.read_csv(chain_file), current_price, band)
+                frames.append(pd.DataFrame({
+                    'ticker': ticker,
+                    'option_type': option_type,
+                    'expiration_date': exp_date,
+                    'days_to_expiry': days_to_expiry,
+                    'strike': chain['strike'].to_numpy(),
+                    'current_price': current_price,
+                    'option_price': chain['lastPrice'].to_numpy(),
+                    'implied_volatility': chain['impliedVolatility'].to_numpy(),
+                    'volume': chain['volume'].fillna(0).to_numpy(),
+                    'open_interest': chain['openInterest'].fillna(0).to_numpy(),
+                    # 买卖价只用于多腿组合的中间价（spreads.py），不在结果中输出
+                    'bid': chain['bid'].to_numpy() if 'bid' in chain.columns else np.nan,
+                    'ask': chain['ask'].to_numpy() if 'ask' in chain.columns else np.nan,
+                }))
+        except Exception as e:
+            print(f"    处理到期日 {exp_date} 时出错: {e}")
+            continue
+
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def list_tickers(data_dir):
+    return [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
+
+
+def iter_ticker_chains(data_dir, tickers=None, now=None, band=STRIKE_BAND):
+    """逐个标的读取期权链（生成器，同一时间只有一个标的的数据在内存中）"""
+    tickers = tickers if tickers is not None else list_tickers(data_dir)
+    for ticker in tickers:
+        try:
+            chains = load_ticker_chains(data_dir, ticker, now, band)
+        except Exception as e:
+            print(f"处理 {ticker} 时出错: {e}")
+            continue
+        if chains is not None:
+            yield chains
+
+
+def load_local_chains(data_dir, tickers=None, now=None, band=STRIKE_BAND):
+    """把所有标的的期权链合并为一个DataFrame"""
+    frames = list(iter_ticker_chains(data_dir, tickers, now, band))
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def compute_metrics(chains, risk_free_rate=RISK_FREE_RATE, keep=()):
+    """
+    按列计算被行权概率（%）和年化收益率（%），返回列顺序为 RESULT_COLUMNS 的新DataFrame
+
+    keep: 额外保留在最前面的列（例如回测用的 asof）
+    """
+    df = chains.copy()
+    is_call = (df['option_type'] == 'call').to_numpy()
+    spot = df['current_price'].to_numpy(dtype=np.float64)
+    strike = df['strike'].to_numpy(dtype=np.float64)
+    price = df['option_price'].to_numpy(dtype=np.float64)
+    days = df['days_to_expiry'].to_numpy(dtype=np.float64)
+    sigma = df['implied_volatility'].to_numpy(dtype=np.float64)
+
+    df['exercise_probability'] = exercise_probability(spot, strike, days / 365, risk_free_rate, sigma, is_call) * 100
+    df['annualized_return'] = annualized_return(price, strike, spot, days, is_call)
+    return df[list(keep) + RESULT_COLUMNS]
+
+
+def select_best_per_ticker(results, where=DEFAULT_SCREEN):
+    """
+    每个标的在满足 where 条件的期权中选出年化收益率最高的看跌和看涨期权（分组argmax）
+
+    返回顺序与逐个标的处理时一致：按标的出现顺序，先put后call
+    """
+    candidates = results[compile_rule(where)(results)]
+    if candidates.empty:
+        return pd.DataFrame(columns=results.columns)
+    best_idx = candidates.groupby(['ticker', 'option_type'], sort=False)['annualized_return'].idxmax()
+    best = results.loc[best_idx.to_numpy()]
+
+    ticker_order = {t: i for i, t in enumerate(pd.unique(results['ticker']))}
+    order = np.lexsort((
+        (best['option_type'] != 'put').to_numpy(),
+        best['ticker'].map(ticker_order).to_numpy(),
+    ))
+    return best.iloc[order].reset_index(drop=True)
+
+
+def top_overall(results, n=DEFAULT_TOP, where=DEFAULT_SCREEN):
+    """全市场满足 where 条件、年化收益率最高的前n个期权"""
+    candidates = results[compile_rule(where)(results)]
+    return candidates.sort_values('annualized_return', ascending=False).head(n)
+
+
+def print_summary(results, best):
+    """按标的输出汇总（代替逐个合约打印）"""
+    if results.empty:
+        return
+    summary = results.groupby('ticker', sort=False).agg(
+        expirations=('expiration_date', 'nunique'),
+        contracts=('strike', 'size'),
+        current_price=('current_price', 'first'),
+    )
+    for row in summary.itertuples():
+        print(f"分析 {row.Index}: 当前股价 {row.current_price}, {row.expirations} 个到期日, {row.contracts} 个期权")
+        for _, opt in best[best['ticker'] == row.Index].iterrows():
+            label = '看跌' if opt['option_type'] == 'put' else '看涨'
+            print(f"  找到最佳{label}期权: 到期日={opt['expiration_date']}, 行权价={opt['strike']}, 年化收益率={opt['annualized_return']:.2f}%")
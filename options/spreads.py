@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多腿期权组合扫描
+对每个到期日枚举垂直价差（牛市看跌价差、熊市看涨价差）、宽跨式（strangle）和铁鹰式（iron condor），
+计算收取的权利金、最大亏损、盈亏平衡点和盈利概率（POP），按风险回报率取前k名。
+宽跨式的Call一侧亏损没有上限，最大亏损和风险回报率记为 NaN，改按 盈利概率 × 权利金/现价 排序
+
+行权价先排序，组合用 searchsorted + 广播生成，不使用嵌套循环：
+- 垂直价差只生成宽度不超过 max_width 的行权价对，总数与行权价数量近似线性
+- 宽跨式和铁鹰式先按单边的风险回报率各保留 candidates 个候选，再做外积
+
+用法:
+    python spreads.py --strategies put_spread iron_condor --max-width 0.05 --min-credit 0.2 --top 20
+"""
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import screening
+from expirations import DTE_BUCKETS, dte_bucket
+
+STRATEGIES = ['put_spread', 'call_spread', 'strangle', 'iron_condor']
+
+# 价差宽度上限（现价的比例）
+DEFAULT_MAX_WIDTH = 0.05
+# 最少收取的权利金（每股）
+DEFAULT_MIN_CREDIT = 0.10
+# 宽跨式/铁鹰式每边保留的候选数
+DEFAULT_CANDIDATES = 200
+DEFAULT_TOP = 20
+# 最大亏损至少一美分，排除按成交价算出的"无风险"价差（通常是过期报价）
+MIN_MAX_LOSS = 0.01
+
+RESULT_COLUMNS = [
+    'ticker', 'strategy', 'expiration_date', 'days_to_expiry', 'dte_bucket', 'current_price',
+    'long_put', 'short_put', 'short_call', 'long_call',
+    'credit', 'max_loss', 'breakeven_low', 'breakeven_high', 'pop',
+    'return_on_risk', 'annualized_return'
+]
+
+
+def leg_prices(chain):
+    """单腿价格: 有有效买卖价时用中间价，否则用最新成交价"""
+    last = chain['option_price'].to_numpy(dtype=np.float64)
+    if 'bid' not in chain.columns or 'ask' not in chain.columns:
+        return last
+    bid = chain['bid'].to_numpy(dtype=np.float64)
+    ask = chain['ask'].to_numpy(dtype=np.float64)
+    quoted = (bid > 0) & (ask >= bid)
+    return np.where(quoted, (bid + ask) / 2, last)
+
+
+def _side(chain, option_type):
+    """某一类型的期权按行权价排序，返回 (行权价, 价格, IV)，去掉价格或IV无效的合约"""
+    side = chain[chain['option_type'] == option_type]
+    strike = side['strike'].to_numpy(dtype=np.float64)
+    price = leg_prices(side)
+    iv = side['implied_volatility'].to_numpy(dtype=np.float64)
+    valid = (price > 0) & (iv > 0) & np.isfinite(strike)
+    order = np.argsort(strike[valid], kind='stable')
+    return strike[valid][order], price[valid][order], iv[valid][order]
+
+
+def _ragged_pairs(strike, max_width, below, allowed=None):
+    """
+    生成宽度不超过 max_width 的 (卖出腿, 买入腿) 下标对
+
+    below=True: 买入腿行权价低于卖出腿（看跌价差）；否则高于卖出腿（看涨价差）
+    allowed: 可作为卖出腿的布尔掩码，不允许的行权价不生成任何组合
+    """
+    n = len(strike)
+    idx = np.arange(n)
+    if below:
+        start = np.searchsorted(strike, strike - max_width, side='left')
+        counts = idx - start
+    else:
+        start = idx + 1
+        counts = np.searchsorted(strike, strike + max_width, side='right') - start
+    counts = np.maximum(counts, 0)
+    if allowed is not None:
+        counts = np.where(allowed, counts, 0)
+    short = np.repeat(idx, counts)
+    # 每个卖出腿内部的偏移量 0..count-1
+    offsets = np.arange(len(short)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return short, np.repeat(start, counts) + offsets
+
+
+def _prob_below(spot, level, years, sigma, r=screening.RISK_FREE_RATE):
+    """到期时价格低于 level 的风险中性概率"""
+    return screening.exercise_probability(spot, level, years, r, sigma, False)
+
+
+def vertical_spreads(strike, price, iv, spot, dte, kind, max_width, min_credit):
+    """
+    垂直价差（卖出价差收取权利金）
+
+    kind='put': 卖出高行权价Put、买入低行权价Put（牛市看跌价差）
+    kind='call': 卖出低行权价Call、买入高行权价Call（熊市看涨价差）
+    卖出腿只用虚值或平值期权
+    """
+    otm = strike <= spot if kind == 'put' else strike >= spot
+    short, long = _ragged_pairs(strike, max_width, below=(kind == 'put'), allowed=otm)
+    credit = price[short] - price[long]
+    keep = credit >= min_credit
+    short, long, credit = short[keep], long[keep], credit[keep]
+
+    width = np.abs(strike[short] - strike[long])
+    max_loss = width - credit
+    keep = max_loss >= MIN_MAX_LOSS
+    short, long, credit, max_loss = short[keep], long[keep], credit[keep], max_loss[keep]
+
+    years = dte / 365
+    if kind == 'put':
+        breakeven = strike[short] - credit
+        pop = 1 - _prob_below(spot, breakeven, years, iv[short])
+    else:
+        breakeven = strike[short] + credit
+        pop = _prob_below(spot, breakeven, years, iv[short])
+    return {
+        'short': short, 'long': long, 'credit': credit, 'max_loss': max_loss,
+        'breakeven': breakeven, 'pop': pop, 'sigma': iv[short],
+    }
+
+
+def _top_candidates(spreads, limit):
+    """按风险回报率保留前 limit 个价差"""
+    ror = spreads['credit'] / spreads['max_loss']
+    if len(ror) <= limit:
+        return {k: v for k, v in spreads.items()}
+    keep = np.argpartition(-ror, limit - 1)[:limit]
+    return {k: v[keep] for k, v in spreads.items()}
+
+
+def iron_condors(put_strike, call_strike, put_spreads, call_spreads, spot, dte, candidates):
+    """
+    铁鹰式 = 牛市看跌价差 + 熊市看涨价差，要求卖出Put行权价低于卖出Call行权价
+
+    最大亏损 = 较宽一边的宽度 - 总权利金（到期时只可能有一边亏损）
+    """
+    puts = _top_candidates(put_spreads, candidates)
+    calls = _top_candidates(call_spreads, candidates)
+    if len(puts['short']) == 0 or len(calls['short']) == 0:
+        return None
+
+    # (P, 1) 与 (1, C) 广播成 P×C 的组合
+    short_put = put_strike[puts['short']][:, None]
+    short_call = call_strike[calls['short']][None, :]
+    valid = short_put < short_call
+    p_idx, c_idx = np.nonzero(valid)
+
+    credit = puts['credit'][p_idx] + calls['credit'][c_idx]
+    put_width = puts['max_loss'][p_idx] + puts['credit'][p_idx]
+    call_width = calls['max_loss'][c_idx] + calls['credit'][c_idx]
+    max_loss = np.maximum(put_width, call_width) - credit
+    keep = max_loss >= MIN_MAX_LOSS
+    p_idx, c_idx, credit, max_loss = p_idx[keep], c_idx[keep], credit[keep], max_loss[keep]
+
+    years = dte / 365
+    low = put_strike[puts['short'][p_idx]] - credit
+    high = call_strike[calls['short'][c_idx]] + credit
+    # 到期价格落在两个盈亏平衡点之间的概率，两边分别用各自卖出腿的IV
+    pop = _prob_below(spot, high, years, calls['sigma'][c_idx]) - _prob_below(spot, low, years, puts['sigma'][p_idx])
+
+    return {
+        'long_put': put_strike[puts['long'][p_idx]],
+        'short_put': put_strike[puts['short'][p_idx]],
+        'short_call': call_strike[calls['short'][c_idx]],
+        'long_call': call_strike[calls['long'][c_idx]],
+        'credit': credit, 'max_loss': max_loss,
+        'breakeven_low': low, 'breakeven_high': high, 'pop': pop,
+    }
+
+
+def strangles(put_side, call_side, spot, dte, min_credit, candidates):
+    """
+    卖出宽跨式: 卖出虚值Put + 卖出虚值Call
+
+    最大亏损没有定义（见 rank_key）
+    """
+    p_strike, p_price, p_iv = put_side
+    c_strike, c_price, c_iv = call_side
+    p_sel = np.flatnonzero(p_strike < spot)
+    c_sel = np.flatnonzero(c_strike > spot)
+    if len(p_sel) == 0 or len(c_sel) == 0:
+        return None
+    # 每边按单腿收益（权利金/行权价）保留候选
+    if len(p_sel) > candidates:
+        p_sel = p_sel[np.argpartition(-(p_price[p_sel] / p_strike[p_sel]), candidates - 1)[:candidates]]
+    if len(c_sel) > candidates:
+        c_sel = c_sel[np.argpartition(-(c_price[c_sel] / c_strike[c_sel]), candidates - 1)[:candidates]]
+
+    credit = (p_price[p_sel][:, None] + c_price[c_sel][None, :]).ravel()
+    p_idx = np.repeat(p_sel, len(c_sel))
+    c_idx = np.tile(c_sel, len(p_sel))
+    keep = credit >= min_credit
+    p_idx, c_idx, credit = p_idx[keep], c_idx[keep], credit[keep]
+
+    # 卖出的Call没有保护，亏损无上限: 按未定义风险的约定记为 NaN，不参与风险回报率排序
+    max_loss = np.full(len(p_idx), np.nan)
+    years = dte / 365
+    low = p_strike[p_idx] - credit
+    high = c_strike[c_idx] + credit
+    pop = _prob_below(spot, high, years, c_iv[c_idx]) - _prob_below(spot, low, years, p_iv[p_idx])
+    return {
+        'long_put': np.full(len(p_idx), np.nan),
+        'short_put': p_strike[p_idx],
+        'short_call': c_strike[c_idx],
+        'long_call': np.full(len(p_idx), np.nan),
+        'credit': credit, 'max_loss': max_loss,
+        'breakeven_low': low, 'breakeven_high': high, 'pop': pop,
+    }
+
+
+def _vertical_columns(strike, spreads, kind):
+    nan = np.full(len(spreads['short']), np.nan)
+    if kind == 'put':
+        legs = {'long_put': strike[spreads['long']], 'short_put': strike[spreads['short']],
+                'short_call': nan, 'long_call': nan,
+                'breakeven_low': spreads['breakeven'], 'breakeven_high': nan}
+    else:
+        legs = {'long_put': nan, 'short_put': nan,
+                'short_call': strike[spreads['short']], 'long_call': strike[spreads['long']],
+                'breakeven_low': nan, 'breakeven_high': spreads['breakeven']}
+    legs.update(credit=spreads['credit'], max_loss=spreads['max_loss'], pop=spreads['pop'])
+    return legs
+
+
+def rank_key(result):
+    """排序依据: 风险回报率；最大亏损未定义的组合（宽跨式）按 盈利概率 × 权利金/现价"""
+    return result['return_on_risk'].fillna(result['pop'] * result['credit'] / result['current_price'])
+
+
+def _sort_by_rank(result, kind='quicksort'):
+    return result.iloc[np.argsort(-rank_key(result).to_numpy(), kind=kind)]
+
+
+def scan_expiration(chain, strategies=STRATEGIES, max_width=DEFAULT_MAX_WIDTH,
+                    min_credit=DEFAULT_MIN_CREDIT, candidates=DEFAULT_CANDIDATES):
+    """
+    扫描单个标的、单个到期日的期权链（screening.load_local_chains 格式）
+
+    返回:
+        DataFrame，列为 RESULT_COLUMNS
+    """
+    spot = float(chain['current_price'].iloc[0])
+    dte = float(chain['days_to_expiry'].iloc[0])
+    width = max_width * spot
+    put_side = _side(chain, 'put')
+    call_side = _side(chain, 'call')
+
+    need_puts = 'put_spread' in strategies or 'iron_condor' in strategies
+    need_calls = 'call_spread' in strategies or 'iron_condor' in strategies
+    put_spreads = vertical_spreads(*put_side, spot, dte, 'put', width, min_credit) if need_puts else None
+    call_spreads = vertical_spreads(*call_side, spot, dte, 'call', width, min_credit) if need_calls else None
+
+    blocks = []
+    if 'put_spread' in strategies:
+        blocks.append(('put_spread', _vertical_columns(put_side[0], put_spreads, 'put')))
+    if 'call_spread' in strategies:
+        blocks.append(('call_spread', _vertical_columns(call_side[0], call_spreads, 'call')))
+    if 'strangle' in strategies:
+        blocks.append(('strangle', strangles(put_side, call_side, spot, dte, min_credit, candidates)))
+    if 'iron_condor' in strategies:
+        blocks.append(('iron_condor', iron_condors(put_side[0], call_side[0], put_spreads, call_spreads,
+                                                   spot, dte, candidates)))
+
+    frames = []
+    for strategy, columns in blocks:
+        if columns is None or len(columns['credit']) == 0:
+            continue
+        frame = pd.DataFrame(columns)
+        frame.insert(0, 'strategy', strategy)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    result = pd.concat(frames, ignore_index=True)
+    result['ticker'] = chain['ticker'].iloc[0]
+    result['expiration_date'] = chain['expiration_date'].iloc[0]
+    result['days_to_expiry'] = dte
+    result['dte_bucket'] = dte_bucket(dte).item()
+    result['current_price'] = spot
+    result['return_on_risk'] = result['credit'] / result['max_loss']
+    result['annualized_return'] = result['return_on_risk'] * (365 / dte) * 100
+    return result[RESULT_COLUMNS]
+
+
+def scan_spreads(chains, strategies=STRATEGIES, max_width=DEFAULT_MAX_WIDTH, min_credit=DEFAULT_MIN_CREDIT,
+                 candidates=DEFAULT_CANDIDATES, min_pop=0.0, top=DEFAULT_TOP, buckets=None):
+    """
+    扫描所有标的、所有到期日，返回每种策略排名（rank_key）最高的前 top 个组合
+
+    buckets: 只扫描这些到期天数分组（expirations.DTE_BUCKETS 的标签）
+    """
+    if buckets:
+        chains = chains[np.isin(dte_bucket(chains['days_to_expiry'].to_numpy()), list(buckets))]
+    frames = []
+    for _, chain in chains.groupby(['ticker', 'expiration_date'], sort=False):
+        result = scan_expiration(chain, strategies, max_width, min_credit, candidates)
+        if min_pop > 0:
+            result = result[result['pop'] >= min_pop]
+        if len(result):
+            # 每个到期日先截断，合并时的数据量与到期日数量成正比
+            frames.append(_sort_by_rank(result).groupby('strategy', sort=False).head(top))
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    results = pd.concat(frames, ignore_index=True)
+    results = _sort_by_rank(results, kind='stable')
+    return results.groupby('strategy', sort=False).head(top).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多腿期权组合扫描')
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+    parser.add_argument('--tickers', nargs='*', help='只扫描这些标的（默认 data 目录下所有标的）')
+    parser.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=STRATEGIES)
+    parser.add_argument('--max-width', type=float, default=DEFAULT_MAX_WIDTH, help='价差宽度上限（现价的比例）')
+    parser.add_argument('--min-credit', type=float, default=DEFAULT_MIN_CREDIT, help='最少收取的权利金（每股）')
+    parser.add_argument('--min-pop', type=float, default=0.0, help='最低盈利概率（0-1）')
+    parser.add_argument('--candidates', type=int, default=DEFAULT_CANDIDATES, help='宽跨式/铁鹰式每边的候选数')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='每种策略输出的组合数')
+    parser.add_argument('--buckets', nargs='+', choices=[name for name, _, _ in DTE_BUCKETS],
+                        help='只扫描这些到期天数分组')
+    parser.add_argument('--output', help='结果CSV路径（默认 results/spread_scan.csv）')
+    args = parser.parse_args()
+
+    chains = screening.load_local_chains(args.data_dir, args.tickers, band=None)
+    print(f"读取 {chains['ticker'].nunique()} 个股票的 {len(chains)} 个期权")
+    results = scan_spreads(chains, args.strategies, args.max_width, args.min_credit,
+                           args.candidates, args.min_pop, args.top, args.buckets)
+    if results.empty:
+        print("没有符合条件的组合")
+        return
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'spread_scan.csv')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    results.to_csv(output, index=False)
+
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.width', 1000)
+    for strategy, group in results.groupby('strategy', sort=False):
+        order = '盈利概率×权利金/现价' if strategy == 'strangle' else '风险回报率'
+        print(f"\n{strategy} 前 {len(group)} 名 (按{order}排序):")
+        print(group.drop(columns=['strategy']).head(10).to_string(index=False, float_format=lambda x: f'{x:.2f}'))
+    print(f"\n保存结果到 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+序列化性能对比
+在合成的期权链上比较旧路径 replace({np.nan: None}).to_dict('records') + json
+与 serializers 模块的构建耗时
+
+用法:
+    python bench_serializer.py [--rows 5000] [--repeat 20]
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import serializers
+
+
+def make_chain(rows, seed=0):
+    """生成与 options_with_greeks.csv 列结构一致的合成期权链，约10%的单元格为NaN"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'contractSymbol': [f'NVDA250117C{i:08d}' for i in range(rows)],
+        'lastTradeDate': '2025-01-10 20:59:59+00:00',
+        'strike': np.round(rng.uniform(50, 250, rows), 1),
+        'lastPrice': rng.uniform(0.01, 50, rows),
+        'bid': rng.uniform(0.01, 50, rows),
+        'ask': rng.uniform(0.01, 50, rows),
+        'change': rng.normal(0, 1, rows),
+        'percentChange': rng.normal(0, 5, rows),
+        'volume': rng.integers(0, 5000, rows).astype(float),
+        'openInterest': rng.integers(0, 20000, rows).astype(float),
+        'impliedVolatility': rng.uniform(0.1, 1.5, rows),
+        'inTheMoney': rng.random(rows) > 0.5,
+        'contractSize': 'REGULAR',
+        'currency': 'USD',
+        'optionType': np.where(rng.random(rows) > 0.5, 'CALL', 'PUT'),
+        'expirationDate': '2025-01-17',
+        'underlyingPrice': 140.0,
+        'bs_value': rng.uniform(0, 50, rows),
+        'delta': rng.uniform(-1, 1, rows),
+        'gamma': rng.uniform(0, 0.1, rows),
+        'theta': rng.uniform(-1, 0, rows),
+        'vega': rng.uniform(0, 1, rows),
+        'rho': rng.uniform(-0.5, 0.5, rows),
+        'calculated_iv': np.nan,
+    })
+    for col in ['lastPrice', 'bid', 'ask', 'volume', 'impliedVolatility', 'delta', 'gamma', 'theta', 'vega']:
+        df.loc[rng.random(rows) < 0.1, col] = np.nan
+    return df
+
+
+def legacy_path(df):
+    records = df.replace({np.nan: None}).to_dict('records')
+    return json.dumps({'calls': records}).encode('utf-8')
+
+
+def records_path(df):
+    records = serializers.records_from_columns(serializers.columns_from_frame(df))
+    return serializers.dumps({'calls': records})
+
+
+def columns_path(df):
+    return serializers.dumps({'calls': serializers.columns_from_frame(df)})
+
+
+def arrow_path(df):
+    return serializers.arrow_ipc(serializers.columns_from_frame(df))
+
+
+def timeit(func, df, repeat):
+    """返回 (中位数耗时ms, 负载字节数)"""
+    payload = func(df)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    df = make_chain(args.rows)
+
+    print("=" * 60)
+    print(f"序列化性能对比 ({args.rows} 行, 重复 {args.repeat} 次取中位数)")
+    print(f"JSON编码器: {'orjson' if serializers.orjson is not None else 'json (fallback)'}")
+    print("=" * 60)
+
+    paths = [
+        ('legacy replace+to_dict', legacy_path),
+        ('serializers records', records_path),
+        ('serializers columns', columns_path),
+    ]
+    if serializers.pa is not None:
+        paths.append(('arrow ipc', arrow_path))
+
+    baseline = None
+    for name, func in paths:
+        ms, size = timeit(func, df, args.repeat)
+        baseline = baseline or ms
+        print(f"{name:<26} {ms:>9.2f} ms  {size / 1024:>9.1f} KB  x{baseline / ms:.1f}")
+
+
+if __name__ == '__main__':
+    main()
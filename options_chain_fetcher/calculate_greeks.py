@@ -12,6 +12,8 @@ from scipy.stats import norm
 import os
 import json
 
+from snapshot import archive_snapshot
+
 def black_scholes_greeks(S, K, T, r, sigma, option_type='call'):
     """
     使用Black-Scholes模型计算期权Greeks
@@ -203,11 +205,19 @@ def calculate_greeks_for_options(ticker, risk_free_rate=0.045):
     result_df = pd.concat([df, greeks_df], axis=1)
     
     # 保存结果
+    # 先写临时文件再原子替换，避免Dashboard读到写了一半的文件
     output_file = os.path.join(data_dir, 'options_with_greeks.csv')
-    result_df.to_csv(output_file, index=False, encoding='utf-8-sig')
+    tmp_file = output_file + '.tmp'
+    result_df.to_csv(tmp_file, index=False, encoding='utf-8-sig')
+    os.replace(tmp_file, output_file)
     
     print(f"✓ 已保存带Greeks的期权数据到: {output_file}")
     
+    # 归档本次快照，供Dashboard历史走势使用
+    archive_dir = archive_snapshot(ticker)
+    if archive_dir:
+        print(f"✓ 已归档快照到: {archive_dir}")
+    
     # 显示统计信息（只统计有效值）
     valid_greeks = result_df[result_df['delta'].notna()]
     if len(valid_greeks) > 0:
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+期权链查询引擎
+在内存快照上用向量化布尔掩码完成列投影、筛选、排序和游标分页
+"""
+
+import base64
+import json
+
+import numpy as np
+
+DEFAULT_COLUMNS = [
+    'contractSymbol', 'optionType', 'expirationDate', 'strike',
+    'lastPrice', 'bid', 'ask', 'volume', 'openInterest',
+    'impliedVolatility', 'delta', 'gamma', 'theta', 'vega'
+]
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+# 数值范围筛选: 参数名 -> (列名, 比较方式)
+RANGE_FILTERS = {
+    'delta_min': ('delta', 'ge'),
+    'delta_max': ('delta', 'le'),
+    'moneyness_min': ('moneyness', 'ge'),
+    'moneyness_max': ('moneyness', 'le'),
+    'min_volume': ('volume', 'ge'),
+    'min_oi': ('openInterest', 'ge'),
+}
+
+
+class QueryError(ValueError):
+    """查询参数不合法"""
+    pass
+
+
+def _parse_float(args, name):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise QueryError(f"参数 {name} 必须是数字: {value}")
+
+
+def _split_list(value):
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def encode_cursor(version, offset):
+    """游标 = 快照版本 + 偏移量，快照更新后旧游标失效"""
+    raw = json.dumps({'v': version, 'o': offset}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor, version):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        offset = int(payload['o'])
+    except Exception:
+        raise QueryError("无效的游标")
+    if payload.get('v') != version:
+        raise QueryError("快照已更新，游标已失效，请重新查询")
+    if offset < 0:
+        raise QueryError("无效的游标")
+    return offset
+
+
+def parse_query_args(args):
+    """
+    解析查询参数（args 为 request.args 或普通dict）
+
+    支持的参数:
+        columns: 逗号分隔的列名
+        expiration: 逗号分隔的到期日
+        type: call / put
+        delta_min, delta_max, moneyness_min, moneyness_max, min_volume, min_oi
+        sort: 逗号分隔的排序键，前缀 '-' 表示降序，例如 "strike,-volume"
+        limit: 每页行数
+        cursor: 上一页返回的 next_cursor
+    """
+    query = {
+        'columns': _split_list(args.get('columns')) or list(DEFAULT_COLUMNS),
+        'expirations': _split_list(args.get('expiration')),
+        'option_type': None,
+        'ranges': {},
+        'sort': [],
+        'limit': DEFAULT_LIMIT,
+        'cursor': args.get('cursor') or None,
+    }
+
+    option_type = args.get('type')
+    if option_type:
+        option_type = option_type.upper()
+        if option_type not in ('CALL', 'PUT'):
+            raise QueryError(f"参数 type 只能是 call 或 put: {args.get('type')}")
+        query['option_type'] = option_type
+
+    for name in RANGE_FILTERS:
+        value = _parse_float(args, name)
+        if value is not None:
+            query['ranges'][name] = value
+
+    for key in _split_list(args.get('sort')):
+        descending = key.startswith('-')
+        query['sort'].append((key.lstrip('-+'), descending))
+
+    limit = args.get('limit')
+    if limit:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise QueryError(f"参数 limit 必须是整数: {limit}")
+        if limit <= 0:
+            raise QueryError("参数 limit 必须大于0")
+        query['limit'] = min(limit, MAX_LIMIT)
+
+    return query
+
+
+def build_mask(snapshot, query):
+    """根据筛选条件生成布尔掩码"""
+    mask = np.ones(snapshot.size, dtype=bool)
+
+    if query['expirations']:
+        exp_mask = np.zeros(snapshot.size, dtype=bool)
+        exp_mask[snapshot.rows_for_expirations(query['expirations'])] = True
+        mask &= exp_mask
+
+    if query['option_type'] == 'CALL':
+        mask &= snapshot.is_call
+    elif query['option_type'] == 'PUT':
+        mask &= ~snapshot.is_call
+
+    for name, value in query['ranges'].items():
+        col, op = RANGE_FILTERS[name]
+        if not snapshot.has_column(col):
+            raise QueryError(f"快照中没有列 {col}")
+        values = snapshot.column(col)
+        # NaN 与任何数比较都为False，自然被过滤
+        if op == 'ge':
+            mask &= values >= value
+        else:
+            mask &= values <= value
+
+    return mask
+
+
+def _sort_key(values, descending):
+    """把一列转换为可用于 np.lexsort 的数值键"""
+    if values.dtype.kind != 'f':
+        # 字符串列先编码为整数
+        keys = np.array([str(v) for v in values], dtype=object)
+        _, values = np.unique(keys, return_inverse=True)
+        values = values.astype(np.float64)
+    if descending:
+        values = -values
+    return values
+
+
+def order_rows(snapshot, rows, sort):
+    """对行号数组按排序键排序（稳定排序，NaN排最后）"""
+    if not sort or len(rows) == 0:
+        return rows
+    keys = []
+    for name, descending in sort:
+        if not snapshot.has_column(name):
+            raise QueryError(f"无法按不存在的列排序: {name}")
+        keys.append(_sort_key(snapshot.column(name)[rows], descending))
+    # np.lexsort 以最后一个键为主键
+    order = np.lexsort(keys[::-1])
+    return rows[order]
+
+
+def query_chain(snapshot, query):
+    """
+    执行查询，返回列式结果
+
+    返回:
+        dict: total（筛选后总行数）、columns（列名）、data（列名 -> 数组）、next_cursor
+    """
+    for name in query['columns']:
+        if not snapshot.has_column(name):
+            raise QueryError(f"快照中没有列 {name}")
+
+    rows = np.flatnonzero(build_mask(snapshot, query))
+    rows = order_rows(snapshot, rows, query['sort'])
+
+    offset = decode_cursor(query['cursor'], snapshot.version) if query['cursor'] else 0
+    page = rows[offset:offset + query['limit']]
+    next_offset = offset + len(page)
+
+    return {
+        'ticker': snapshot.ticker,
+        'version': snapshot.version,
+        'total': int(len(rows)),
+        'columns': query['columns'],
+        'data': {name: snapshot.column(name)[page] for name in query['columns']},
+        'next_cursor': encode_cursor(snapshot.version, next_offset) if next_offset < len(rows) else None,
+    }
+
@@ -6,27 +6,61 @@
 提供可视化界面查看期权链数据
 """
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request
 import pandas as pd
 import json
 import os
 from datetime import datetime
 
+from snapshot import load_snapshot
+from chain_query import QueryError, parse_query_args, query_chain
+import serializers
+import metrics
+import history
+import surface
+
 app = Flask(__name__)
+metrics.init_app(app)
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 TICKERS = ["NVDA", "QQQ", "IBIT"]
 
+def payload_response(payload, arrow_data=None):
+    """
+    按请求参数 format 输出响应
+    format=json（默认）: 由NumPy数组直接编码的JSON
+    format=arrow: Arrow IPC stream，arrow_data 为列名 -> 数组
+    """
+    fmt = request.args.get('format', 'json')
+    if fmt == 'arrow':
+        if arrow_data is None:
+            return jsonify({'error': 'Arrow format not supported for this endpoint'}), 400
+        try:
+            return Response(serializers.arrow_ipc(arrow_data), mimetype=serializers.ARROW_MIMETYPE)
+        except serializers.SerializationError as e:
+            return jsonify({'error': str(e)}), 406
+    if fmt != 'json':
+        return jsonify({'error': f'Unknown format: {fmt}'}), 400
+    return Response(serializers.dumps(payload), mimetype=serializers.JSON_MIMETYPE)
+
+@metrics.timed('load_stock_info')
 def load_stock_info(ticker):
     """加载股票基本信息"""
+    snapshot = load_snapshot(ticker)
+    if snapshot is not None:
+        return snapshot.info
     info_file = os.path.join(DATA_DIR, ticker, 'stock_info.json')
     if os.path.exists(info_file):
         with open(info_file, 'r') as f:
             return json.load(f)
     return None
 
+@metrics.timed('load_options_data')
 def load_options_data(ticker):
-    """加载期权数据"""
+    """加载期权数据（返回缓存的快照DataFrame，调用方不要原地修改）"""
+    snapshot = load_snapshot(ticker)
+    if snapshot is not None:
+        return snapshot.frame
     greeks_file = os.path.join(DATA_DIR, ticker, 'options_with_greeks.csv')
     if os.path.exists(greeks_file):
         df = pd.read_csv(greeks_file)
@@ -161,18 +195,45 @@ def get_options_chain(ticker, expiration):
         puts_otm.head(15)
     ]).sort_values(['strike', 'volume'], ascending=[False, False])
     
-    # 转换为字典，并处理NaN值
-    import numpy as np
-    calls_data = calls_selected.replace({np.nan: None}).to_dict('records')
-    puts_data = puts_selected.replace({np.nan: None}).to_dict('records')
+    # 直接从列数组序列化；orient=columns 时返回列式数据，默认按行返回
+    calls_columns = serializers.columns_from_frame(calls_selected)
+    puts_columns = serializers.columns_from_frame(puts_selected)
     
-    return jsonify({
+    if request.args.get('orient') == 'columns':
+        calls_data, puts_data = calls_columns, puts_columns
+    else:
+        calls_data = serializers.records_from_columns(calls_columns)
+        puts_data = serializers.records_from_columns(puts_columns)
+    
+    arrow_data = serializers.columns_from_frame(pd.concat([calls_selected, puts_selected], ignore_index=True))
+    
+    return payload_response({
         'ticker': ticker,
         'expiration': expiration,
         'current_price': current_price,
         'calls': calls_data,
         'puts': puts_data
-    })
+    }, arrow_data)
+
+@app.route('/api/query/<ticker>')
+def query_options(ticker):
+    """
+    期权链查询接口
+    支持列投影、到期日/类型/Delta/Moneyness/成交量筛选、排序和游标分页，
+    参数说明见 chain_query.parse_query_args
+    """
+    snapshot = load_snapshot(ticker)
+    if snapshot is None:
+        return jsonify({'error': 'Data not found'}), 404
+    
+    try:
+        query = parse_query_args(request.args)
+        result = query_chain(snapshot, query)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    result['current_price'] = snapshot.current_price
+    return payload_response(result, result['data'])
 
 @app.route('/api/volatility/<ticker>')
 def get_volatility_data(ticker):
@@ -206,6 +267,77 @@ def get_volatility_data(ticker):
         'rv': rv_values
     })
 
+@app.route('/api/history/<ticker>/<series>')
+def get_history(ticker, series):
+    """
+    历史时间序列（来自归档快照，服务端降采样）
+    series: iv / hv / rv / skew / term
+    参数: points（每条线最多点数，默认500）、method（lttb / minmax）、start、end
+    """
+    if series not in history.SERIES_FIELDS:
+        return jsonify({'error': f'Unknown series: {series}'}), 404
+    
+    method = request.args.get('method', 'lttb')
+    if method not in history.DOWNSAMPLERS:
+        return jsonify({'error': f'Unknown method: {method}'}), 400
+    try:
+        points = int(request.args.get('points', 500))
+    except ValueError:
+        return jsonify({'error': 'points must be an integer'}), 400
+    points = max(3, min(points, 5000))
+    
+    hist = history.load_history(ticker)
+    if hist is None:
+        return jsonify({'error': 'History not found'}), 404
+    
+    try:
+        data = history.history_series(hist, series, points, method,
+                                      request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return payload_response({
+        'ticker': ticker,
+        'series': series,
+        'method': method,
+        'total_snapshots': int(len(hist)),
+        'data': data
+    })
+
+@app.route('/api/surface/<ticker>')
+def get_surface(ticker):
+    """
+    波动率曲面 / Greeks网格（moneyness × 到期天数，每个快照只计算一次）
+    参数: side（otm / call / put，默认otm）、fields（逗号分隔，默认impliedVolatility）、
+         format（json / bin，bin为float32二进制编码，格式见 surface.encode_binary）
+    """
+    snapshot = load_snapshot(ticker)
+    if snapshot is None:
+        return jsonify({'error': 'Data not found'}), 404
+    
+    side = request.args.get('side', 'otm')
+    if side not in surface.SIDES:
+        return jsonify({'error': f'Unknown side: {side}'}), 400
+    
+    surf = surface.get_surface(snapshot)
+    fields = [f for f in request.args.get('fields', 'impliedVolatility').split(',') if f]
+    unknown = [f for f in fields if f not in surf['grids'][side]]
+    if unknown:
+        return jsonify({'error': f'Unknown fields: {unknown}'}), 400
+    
+    if request.args.get('format') == 'bin':
+        return Response(surface.encode_binary(surf, side, fields), mimetype=surface.BINARY_MIMETYPE)
+    
+    return payload_response({
+        'ticker': ticker,
+        'side': side,
+        'current_price': surf['current_price'],
+        'moneyness': surf['moneyness'],
+        'tenor': surf['tenor'],
+        'expirations': surf['expirations'],
+        'grids': {field: surf['grids'][side][field] for field in fields}
+    })
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("期权数据Dashboard启动中...")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+历史波动率时间序列
+从归档快照中提取ATM隐含波动率、HV/RV、25 Delta偏度和期限结构，
+并在服务端降采样（LTTB或最大/最小值分桶）到指定点数
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from snapshot_archive import ARCHIVE_DIRNAME, list_archives
+
+from snapshot import DATA_DIR
+
+# 期限结构插值的固定期限（天）
+TERM_TENORS = [7, 30, 60, 90]
+
+# 偏度使用最接近该天数的到期日
+SKEW_TARGET_DAYS = 30
+
+METRICS_FILENAME = 'metrics.json'
+
+# 每种序列包含的字段
+SERIES_FIELDS = {
+    'iv': ['atm_iv'],
+    'hv': ['HV_10d', 'HV_20d', 'HV_30d', 'HV_60d'],
+    'rv': ['RV_10d', 'RV_20d', 'RV_30d'],
+    'skew': ['skew_25d'],
+    'term': [f'iv_{days}d' for days in TERM_TENORS],
+}
+
+_history_cache = {}
+_history_lock = threading.Lock()
+
+
+def atm_iv_by_expiration(frame, spot, asof):
+    """
+    每个到期日的ATM隐含波动率（最接近现价的行权价上Call和Put的IV均值）
+
+    返回:
+        (到期天数数组, IV数组)，按到期天数升序
+    """
+    iv = pd.to_numeric(frame['impliedVolatility'], errors='coerce')
+    df = frame.loc[iv > 0, ['expirationDate', 'optionType', 'strike']].copy()
+    if df.empty:
+        return np.array([]), np.array([])
+    df['iv'] = iv[iv > 0]
+    df['dist'] = (df['strike'] - spot).abs()
+
+    nearest = df.loc[df.groupby(['expirationDate', 'optionType'])['dist'].idxmin()]
+    by_exp = nearest.groupby('expirationDate')['iv'].mean()
+
+    days = (pd.to_datetime(by_exp.index) - pd.Timestamp(asof).normalize()).days.to_numpy(dtype=float)
+    keep = days > 0
+    order = np.argsort(days[keep])
+    return days[keep][order], by_exp.to_numpy()[keep][order]
+
+
+def skew_25d(frame, spot, asof):
+    """25 Delta 偏度 = 25Δ Put IV - 25Δ Call IV（取最接近30天的到期日）"""
+    iv = pd.to_numeric(frame['impliedVolatility'], errors='coerce')
+    delta = pd.to_numeric(frame['delta'], errors='coerce')
+    valid = (iv > 0) & delta.notna()
+    if not valid.any():
+        return np.nan
+
+    expirations = frame.loc[valid, 'expirationDate']
+    days = (pd.to_datetime(expirations) - pd.Timestamp(asof).normalize()).dt.days
+    days = days[days > 0]
+    if days.empty:
+        return np.nan
+    target_exp = expirations[(days - SKEW_TARGET_DAYS).abs().idxmin()]
+
+    in_exp = valid & (frame['expirationDate'] == target_exp)
+    puts = in_exp & (frame['optionType'] == 'PUT')
+    calls = in_exp & (frame['optionType'] == 'CALL')
+    if not puts.any() or not calls.any():
+        return np.nan
+    put_iv = iv[(delta[puts] + 0.25).abs().idxmin()]
+    call_iv = iv[(delta[calls] - 0.25).abs().idxmin()]
+    return float(put_iv - call_iv)
+
+
+def snapshot_metrics(info, frame):
+    """从单个快照计算一行历史指标"""
+    spot = float(info['current_price'])
+    asof = datetime.fromisoformat(info['timestamp'])
+
+    row = {'timestamp': info['timestamp'], 'spot': spot}
+    row.update(info.get('historical_volatility', {}))
+    row.update(info.get('realized_volatility', {}))
+
+    days, ivs = atm_iv_by_expiration(frame, spot, asof)
+    row['atm_iv'] = float(ivs[0]) if len(ivs) else None
+    for tenor in TERM_TENORS:
+        # 只在已有到期日范围内插值，不外推
+        if len(days) and days[0] <= tenor <= days[-1]:
+            row[f'iv_{tenor}d'] = float(np.interp(tenor, days, ivs))
+        else:
+            row[f'iv_{tenor}d'] = None
+
+    skew = skew_25d(frame, spot, asof)
+    row['skew_25d'] = None if np.isnan(skew) else skew
+    return row
+
+
+def _archive_metrics(archive_path):
+    """读取或计算单个归档的指标，结果缓存到归档目录的 metrics.json"""
+    metrics_file = os.path.join(archive_path, METRICS_FILENAME)
+    if os.path.exists(metrics_file):
+        with open(metrics_file, 'r') as f:
+            return json.load(f)
+
+    with open(os.path.join(archive_path, 'stock_info.json'), 'r') as f:
+        info = json.load(f)
+    frame = pd.read_csv(os.path.join(archive_path, 'options_with_greeks.csv'))
+    row = snapshot_metrics(info, frame)
+
+    with open(metrics_file, 'w') as f:
+        json.dump(row, f)
+    return row
+
+
+def load_history(ticker, data_dir=DATA_DIR):
+    """
+    加载标的的历史指标表（按时间升序）
+
+    只处理新增的归档，已处理过的从内存/磁盘缓存中读取。没有归档时返回None
+    """
+    names = list_archives(data_dir, ticker)
+    if not names:
+        return None
+
+    key = (data_dir, ticker)
+    with _history_lock:
+        cached = _history_cache.get(key)
+        if cached is not None and cached[0] == names[-1] and cached[1] == len(names):
+            return cached[2]
+
+        known = cached[3] if cached is not None else {}
+        rows = []
+        for name in names:
+            if name not in known:
+                try:
+                    known[name] = _archive_metrics(os.path.join(data_dir, ticker, ARCHIVE_DIRNAME, name))
+                except Exception as e:
+                    print(f"读取归档 {ticker}/{name} 失败: {e}")
+                    continue
+            rows.append(known[name])
+
+        history = pd.DataFrame(rows)
+        history['time'] = pd.to_datetime(history['timestamp'], format='ISO8601')
+        history = history.sort_values('time').reset_index(drop=True)
+        # 毫秒时间戳，便于前端直接使用
+        history['t'] = (history['time'] - pd.Timestamp('1970-01-01')) // pd.Timedelta(milliseconds=1)
+        _history_cache[key] = (names[-1], len(names), history, known)
+        return history
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样
+
+    保留视觉上最重要的点，首尾两点始终保留。返回所选点的下标
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # 中间 n-2 个点分成 threshold-2 个桶
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    prev = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # 下一个桶的平均点（最后一个桶用终点）
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[prev] - avg_x) * (by - y[prev]) - (x[prev] - bx) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def minmax_buckets(x, y, threshold):
+    """
+    最大/最小值分桶降采样
+
+    每个桶保留最小值和最大值两个点（按时间顺序），能保留所有尖峰。返回所选点的下标
+    """
+    n = len(x)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+
+    num_buckets = max(threshold // 2, 1)
+    edges = np.linspace(0, n, num_buckets + 1).astype(int)
+
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        seg = y[start:end]
+        lo = start + int(np.argmin(seg))
+        hi = start + int(np.argmax(seg))
+        selected.extend(sorted({lo, hi}))
+    return np.array(selected, dtype=int)
+
+
+DOWNSAMPLERS = {
+    'lttb': lttb,
+    'minmax': minmax_buckets,
+}
+
+
+def downsample_series(t, values, points, method='lttb'):
+    """去掉缺失值后降采样，返回 (时间列表, 数值列表)"""
+    values = np.asarray(values, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    keep = ~np.isnan(values)
+    t, values = t[keep], values[keep]
+    if len(t) == 0:
+        return [], []
+    idx = DOWNSAMPLERS[method](t, values, points)
+    return t[idx].astype(np.int64).tolist(), values[idx].tolist()
+
+
+def history_series(history, series, points=500, method='lttb', start=None, end=None):
+    """
+    取某类指标的降采样时间序列
+
+    参数:
+        series: iv / hv / rv / skew / term
+        points: 每条线最多返回的点数
+        method: lttb 或 minmax
+        start, end: 可选的起止日期（字符串）
+    """
+    if start is not None:
+        history = history[history['time'] >= pd.Timestamp(start)]
+    if end is not None:
+        history = history[history['time'] <= pd.Timestamp(end)]
+
+    result = {}
+    for field in SERIES_FIELDS[series]:
+        if field not in history.columns:
+            continue
+        t, v = downsample_series(history['t'].to_numpy(), history[field].to_numpy(dtype=np.float64), points, method)
+        result[field] = {'t': t, 'v': v}
+    return result
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dashboard压力测试
+模拟浏览器打开Dashboard的真实请求序列（概览 -> 波动率 -> 标的 -> 期权链，
+再切换若干到期日标签），并发回放后按接口统计RPS和延迟分位数
+
+用法:
+    python loadtest.py --url http://localhost:5000 --clients 16 --duration 30
+"""
+
+import argparse
+import random
+import threading
+import time
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+import numpy as np
+
+
+class Recorder:
+    """线程安全的按接口计时记录"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, size, ok):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.bytes[route] += size
+            if not ok:
+                self.errors[route] += 1
+
+
+def fetch(base_url, path, route, recorder, timeout):
+    """请求一个接口并记录耗时，返回解析后的JSON（失败返回None）"""
+    start = time.perf_counter()
+    body = b''
+    ok = True
+    try:
+        with urlopen(base_url + path, timeout=timeout) as resp:
+            body = resp.read()
+    except (HTTPError, URLError, OSError):
+        ok = False
+    recorder.record(route, time.perf_counter() - start, len(body), ok)
+    if not ok:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def dashboard_session(base_url, recorder, rng, timeout, tab_clicks):
+    """一次完整的页面访问"""
+    overview = fetch(base_url, '/api/overview', '/api/overview', recorder, timeout)
+    if not overview:
+        return
+    tickers = [item['ticker'] for item in overview]
+    ticker = rng.choice(tickers)
+
+    fetch(base_url, f'/api/volatility/{ticker}', '/api/volatility/<ticker>', recorder, timeout)
+    detail = fetch(base_url, f'/api/ticker/{ticker}', '/api/ticker/<ticker>', recorder, timeout)
+    if not detail or not detail.get('expirations'):
+        return
+    expirations = detail['expirations']
+
+    fetch(base_url, f'/api/options/{ticker}/{expirations[0]}',
+          '/api/options/<ticker>/<expiration>', recorder, timeout)
+
+    # 用户切换到期日标签、切换其他标的的波动率图
+    for _ in range(rng.randint(0, tab_clicks)):
+        if rng.random() < 0.7:
+            expiration = rng.choice(expirations)
+            fetch(base_url, f'/api/options/{ticker}/{expiration}',
+                  '/api/options/<ticker>/<expiration>', recorder, timeout)
+        else:
+            fetch(base_url, f'/api/volatility/{rng.choice(tickers)}',
+                  '/api/volatility/<ticker>', recorder, timeout)
+
+    if rng.random() < 0.3:
+        fetch(base_url, f'/api/query/{ticker}?type=put&delta_min=-0.3&min_volume=10&sort=-volume&limit=50',
+              '/api/query/<ticker>', recorder, timeout)
+
+
+def client_loop(base_url, recorder, deadline, seed, timeout, tab_clicks):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        dashboard_session(base_url, recorder, rng, timeout, tab_clicks)
+
+
+def print_report(recorder, elapsed):
+    print("\n" + "="*100)
+    print(f"{'接口':<40}{'请求数':>8}{'错误':>6}{'RPS':>9}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'KB/请求':>9}")
+    print("-"*100)
+    total = 0
+    for route in sorted(recorder.latencies):
+        samples = np.array(recorder.latencies[route]) * 1000
+        count = len(samples)
+        total += count
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        kb = recorder.bytes[route] / count / 1024
+        print(f"{route:<40}{count:>8}{recorder.errors[route]:>6}{count / elapsed:>9.1f}"
+              f"{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}{kb:>9.1f}")
+    print("-"*100)
+    print(f"总计: {total} 个请求, {elapsed:.1f} 秒, {total / elapsed:.1f} RPS")
+    print("="*100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dashboard压力测试')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=16, help='并发用户数')
+    parser.add_argument('--duration', type=float, default=30, help='测试时长（秒）')
+    parser.add_argument('--timeout', type=float, default=10, help='单个请求超时（秒）')
+    parser.add_argument('--tab-clicks', type=int, default=5, help='每次访问最多切换标签的次数')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    recorder = Recorder()
+
+    print(f"压力测试 {base_url}: {args.clients} 个并发用户, {args.duration:.0f} 秒")
+    start = time.perf_counter()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        for i in range(args.clients):
+            pool.submit(client_loop, base_url, recorder, deadline, args.seed + i, args.timeout, args.tab_clicks)
+    print_report(recorder, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
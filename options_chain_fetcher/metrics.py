@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dashboard运行指标
+记录每个接口的延迟直方图、响应大小、状态码和快照缓存命中率，
+以及数据加载函数的耗时，通过 /metrics 以Prometheus文本格式输出
+
+注意: 指标保存在进程内，gunicorn多worker时每个worker各自统计
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+import snapshot
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    text = ','.join(f'{name}="{str(value)}"' for name, value in pairs)
+    return '{' + text + '}'
+
+
+class Counter:
+    """按标签累加的计数器"""
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    """按标签分组的累积直方图"""
+
+    def __init__(self, name, description, buckets, label_names=()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        # labels -> [各桶计数..., 总数, 总和]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, ("le", bound))} {cumulative}')
+                label_text = _format_labels(self.label_names, labels)
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, ("le", "+Inf"))} {series[-2]}')
+                lines.append(f'{self.name}_count{label_text} {series[-2]}')
+                lines.append(f'{self.name}_sum{label_text} {series[-1]}')
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    'dashboard_request_duration_seconds', '接口处理耗时（秒）', LATENCY_BUCKETS, ('route', 'method'))
+RESPONSE_SIZE = Histogram(
+    'dashboard_response_size_bytes', '响应体大小（字节）', SIZE_BUCKETS, ('route',))
+REQUESTS = Counter(
+    'dashboard_requests_total', '请求数', ('route', 'method', 'status'))
+CACHE_ACCESS = Counter(
+    'dashboard_snapshot_cache_total', '快照缓存访问次数（result=hit/miss）', ('route', 'result'))
+FUNCTION_LATENCY = Histogram(
+    'dashboard_function_duration_seconds', '数据加载函数耗时（秒）', LATENCY_BUCKETS, ('function',))
+
+ALL_METRICS = [REQUEST_LATENCY, RESPONSE_SIZE, REQUESTS, CACHE_ACCESS, FUNCTION_LATENCY]
+
+
+def _current_route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return '<none>'
+
+
+def _on_cache_access(ticker, hit):
+    CACHE_ACCESS.inc((_current_route(), 'hit' if hit else 'miss'))
+
+
+def timed(name):
+    """装饰器：记录函数耗时"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                FUNCTION_LATENCY.observe(time.perf_counter() - start, (name,))
+        return wrapper
+    return decorator
+
+
+def cache_hit_ratio(route):
+    """某个接口的快照缓存命中率（无访问时返回None）"""
+    hits = CACHE_ACCESS.get((route, 'hit'))
+    misses = CACHE_ACCESS.get((route, 'miss'))
+    total = hits + misses
+    return hits / total if total else None
+
+
+def render():
+    """所有指标的Prometheus文本格式"""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    # 命中率是派生值，方便直接查看
+    lines.append('# HELP dashboard_snapshot_cache_hit_ratio 快照缓存命中率')
+    lines.append('# TYPE dashboard_snapshot_cache_hit_ratio gauge')
+    routes = sorted({labels[0] for labels in CACHE_ACCESS._values})
+    for route in routes:
+        lines.append(f'dashboard_snapshot_cache_hit_ratio{{route="{route}"}} {cache_hit_ratio(route):.6f}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """给Flask应用挂载计时中间件和 /metrics 接口"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        route = _current_route() if request.url_rule is not None else '<unmatched>'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, (route, request.method))
+        REQUESTS.inc((route, request.method, str(response.status_code)))
+        if not response.is_streamed:
+            RESPONSE_SIZE.observe(response.calculate_content_length() or 0, (route,))
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(render(), mimetype=PROMETHEUS_MIMETYPE)
+
+    snapshot.add_cache_listener(_on_cache_access)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+终端实时监控
+监视数据目录，每当有新快照时刷新自选标的的平值期权阶梯、IV和Greeks。
+屏幕按单元格比对，只重绘发生变化的单元格，监控几十个标的时CPU占用也很低
+
+用法:
+    python view_data.py monitor NVDA QQQ IBIT --interval 2 --strikes 5
+"""
+
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from snapshot import DATA_DIR, load_snapshot, snapshot_version
+
+# 阶梯表的列: (表头, 宽度)
+LADDER_COLUMNS = [
+    ('C.Last', 7), ('C.IV', 6), ('C.Δ', 6), ('C.Γ', 7), ('C.Θ', 7),
+    ('Strike', 9),
+    ('P.Last', 7), ('P.IV', 6), ('P.Δ', 7), ('P.Γ', 7), ('P.Θ', 7),
+]
+PANEL_GAP = 3
+
+CSI = '\x1b['
+
+
+def _fmt(value, fmt):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return '-'
+    return format(value, fmt)
+
+
+class TerminalScreen:
+    """
+    单元格级差量渲染
+
+    cells: (行, 列) -> 文本。每一帧与上一帧比较，只输出变化的单元格
+    """
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.cells = {}
+        self.size = None
+
+    def render(self, cells):
+        """输出差量，返回本帧重绘的单元格数"""
+        size = shutil.get_terminal_size()
+        out = []
+        if size != self.size:
+            # 终端尺寸变化时整屏重绘
+            out.append(f'{CSI}2J')
+            self.cells = {}
+            self.size = size
+
+        changed = 0
+        for pos, text in cells.items():
+            if self.cells.get(pos) != text and pos[0] < size.lines:
+                out.append(f'{CSI}{pos[0] + 1};{pos[1] + 1}H{text}')
+                changed += 1
+        for pos, old in self.cells.items():
+            if pos not in cells and pos[0] < size.lines:
+                out.append(f'{CSI}{pos[0] + 1};{pos[1] + 1}H{" " * len(old)}')
+                changed += 1
+
+        self.cells = {pos: text for pos, text in cells.items() if pos[0] < size.lines}
+        if out:
+            out.append(f'{CSI}{size.lines};1H')
+            self.stream.write(''.join(out))
+            self.stream.flush()
+        return changed
+
+    def start(self):
+        if sys.platform == 'win32':
+            # 启用Windows 10控制台的ANSI转义支持
+            os.system('')
+        self.stream.write(f'{CSI}?25l{CSI}2J')
+        self.stream.flush()
+
+    def stop(self):
+        self.stream.write(f'{CSI}?25h\n')
+        self.stream.flush()
+
+
+def panel_width():
+    return sum(width for _, width in LADDER_COLUMNS) + len(LADDER_COLUMNS) - 1
+
+
+def build_panel(snapshot, strikes, expiration_index=0):
+    """
+    构建单个标的面板的单元格
+
+    返回:
+        dict: (相对行, 相对列) -> 文本，每个数值是一个独立单元格
+    """
+    cells = {}
+    width = panel_width()
+    expirations = snapshot.expirations
+    if not expirations:
+        cells[(0, 0)] = f'{snapshot.ticker:<8} 无期权数据'.ljust(width)
+        return cells
+    expiration = expirations[min(expiration_index, len(expirations) - 1)]
+
+    rows = snapshot.expiration_index[expiration]
+    strike = snapshot.column('strike')
+    iv = snapshot.column('impliedVolatility')
+    spot = snapshot.current_price
+
+    # 标题行: 标的、现价、到期日、ATM IV、HV30
+    unique_strikes = np.unique(strike[rows])
+    atm_pos = int(np.argmin(np.abs(unique_strikes - spot))) if len(unique_strikes) else 0
+    atm_rows = rows[strike[rows] == unique_strikes[atm_pos]] if len(unique_strikes) else rows[:0]
+    atm_iv = float(np.nanmean(iv[atm_rows])) if np.isfinite(iv[atm_rows]).any() else None
+    hv30 = snapshot.info.get('historical_volatility', {}).get('HV_30d')
+    stamp = snapshot.info.get('timestamp', '')[11:19]
+
+    cells[(0, 0)] = f'{snapshot.ticker:<6}'
+    cells[(0, 7)] = f'${spot:>10.2f}'
+    cells[(0, 19)] = f'{expiration}'
+    cells[(0, 31)] = f'ATM IV {_fmt(atm_iv, "6.1%")}'
+    cells[(0, 46)] = f'HV30 {_fmt(hv30, "6.1%")}'
+    cells[(0, width - 8)] = f'{stamp:>8}'
+
+    col = 0
+    for title, w in LADDER_COLUMNS:
+        cells[(1, col)] = f'{title:>{w}}'
+        col += w + 1
+
+    # 平值附近的行权价阶梯（上下各 strikes 个）
+    lo = max(atm_pos - strikes, 0)
+    ladder = unique_strikes[lo:atm_pos + strikes + 1]
+    call_rows = rows[snapshot.is_call[rows]]
+    put_rows = rows[~snapshot.is_call[rows]]
+    call_by_strike = dict(zip(strike[call_rows].tolist(), call_rows.tolist()))
+    put_by_strike = dict(zip(strike[put_rows].tolist(), put_rows.tolist()))
+
+    fields = [('lastPrice', '.2f'), ('impliedVolatility', '.1%'), ('delta', '.3f'),
+              ('gamma', '.4f'), ('theta', '.3f')]
+    for i, k in enumerate(ladder.tolist()):
+        line = 2 + i
+        values = []
+        for side in (call_by_strike, put_by_strike):
+            row = side.get(k)
+            side_values = []
+            for field, fmt in fields:
+                value = snapshot.column(field)[row] if row is not None and snapshot.has_column(field) else None
+                side_values.append(_fmt(value, fmt))
+            values.append(side_values)
+        marker = '*' if k == unique_strikes[atm_pos] else ' '
+        texts = values[0] + [f'{marker}{k:.2f}'] + values[1]
+        col = 0
+        for text, (_, w) in zip(texts, LADDER_COLUMNS):
+            cells[(line, col)] = f'{text:>{w}}'[:w]
+            col += w + 1
+    return cells
+
+
+class Monitor:
+    """轮询快照版本，只为发生变化的标的重建面板"""
+
+    def __init__(self, tickers, strikes=5, expiration_index=0, data_dir=DATA_DIR):
+        self.tickers = list(tickers)
+        self.strikes = strikes
+        self.expiration_index = expiration_index
+        self.data_dir = data_dir
+        self.versions = {}
+        self.panels = {}
+
+    def poll(self):
+        """检查所有标的，返回本轮有更新的标的"""
+        updated = []
+        for ticker in self.tickers:
+            version = snapshot_version(ticker, self.data_dir)
+            if version is None or version == self.versions.get(ticker):
+                continue
+            snapshot = load_snapshot(ticker, self.data_dir)
+            if snapshot is None:
+                continue
+            self.versions[ticker] = version
+            self.panels[ticker] = build_panel(snapshot, self.strikes, self.expiration_index)
+            updated.append(ticker)
+        return updated
+
+    def layout(self, term_width):
+        """把各标的面板按列排布成整屏单元格"""
+        width = panel_width() + PANEL_GAP
+        per_row = max(term_width // width, 1)
+        panel_height = 2 * self.strikes + 1 + 3
+
+        cells = {}
+        for i, ticker in enumerate(self.tickers):
+            top = 1 + (i // per_row) * panel_height
+            left = (i % per_row) * width
+            panel = self.panels.get(ticker) or {(0, 0): f'{ticker:<6} 等待数据...'}
+            for (r, c), text in panel.items():
+                cells[(top + r, left + c)] = text
+        return cells
+
+
+def run_monitor(tickers, interval=2.0, strikes=5, expiration_index=0):
+    """运行监控直到 Ctrl+C"""
+    monitor = Monitor(tickers, strikes, expiration_index)
+    screen = TerminalScreen()
+    screen.start()
+    last_update = '-'
+    try:
+        while True:
+            updated = monitor.poll()
+            if updated:
+                last_update = datetime.now().strftime('%H:%M:%S')
+            cells = monitor.layout(shutil.get_terminal_size().columns)
+            cells[(0, 0)] = (f'期权监控 {len(tickers)} 个标的 | 最近更新 {last_update} '
+                             f'| 每 {interval:g} 秒检查 | Ctrl+C 退出')
+            screen.render(cells)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        screen.stop()
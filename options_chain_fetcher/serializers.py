@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+API响应序列化
+直接从NumPy数组生成JSON（NaN输出为null），不再经过
+DataFrame.replace({np.nan: None}).to_dict('records') 逐单元格构造字典。
+安装了 orjson 时使用 orjson，安装了 pyarrow 时支持 Arrow IPC 格式。
+"""
+
+import io
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MIMETYPE = 'application/json'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+
+class SerializationError(ValueError):
+    """不支持的输出格式"""
+    pass
+
+
+def _object_to_list(values):
+    """object数组转列表，NaN转为None"""
+    return [None if (isinstance(v, float) and v != v) else v for v in values.tolist()]
+
+
+def _float_to_json(values):
+    """浮点列整体序列化后把 NaN/Infinity 替换为 null（列中只有数字，替换是安全的）"""
+    text = json.dumps(values.tolist())
+    return text.replace('-Infinity', 'null').replace('Infinity', 'null').replace('NaN', 'null')
+
+
+def _normalize(obj):
+    """
+    把负载中的数组转换为编码器能直接处理的形式
+
+    只递归进入dict；列表（如 records_from_columns 的结果）视为已是纯Python值，
+    避免逐行遍历
+    """
+    if isinstance(obj, dict):
+        return {key: _normalize(value) for key, value in obj.items()}
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'O':
+            return _object_to_list(obj)
+        if orjson is None and obj.dtype.kind != 'f':
+            return obj.tolist()
+        return obj
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float) and obj != obj:
+        return None
+    return obj
+
+
+def _encode_fallback(obj):
+    """无orjson时的手写编码器，浮点数组按整列序列化"""
+    if isinstance(obj, dict):
+        items = (f'{json.dumps(str(key), ensure_ascii=False)}:{_encode_fallback(value)}' for key, value in obj.items())
+        return '{' + ','.join(items) + '}'
+    if isinstance(obj, np.ndarray):
+        return _float_to_json(obj)
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def dumps(payload):
+    """
+    把包含NumPy数组的负载编码为JSON字节串
+
+    数组按列整体序列化，NaN和无穷大输出为null
+    """
+    payload = _normalize(payload)
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return _encode_fallback(payload).encode('utf-8')
+
+
+def columns_from_frame(df, columns=None):
+    """DataFrame转为 列名 -> NumPy数组 的字典"""
+    columns = columns if columns is not None else list(df.columns)
+    return {col: df[col].to_numpy() for col in columns}
+
+
+def records_from_columns(data):
+    """
+    列式数据转为记录列表（行式）
+
+    每列先整体 tolist() 再按行zip，比 to_dict('records') 快一个数量级
+    """
+    names = list(data.keys())
+    lists = []
+    for name in names:
+        values = data[name]
+        if values.dtype.kind == 'f':
+            lists.append([None if v != v else v for v in values.tolist()])
+        elif values.dtype.kind == 'O':
+            lists.append(_object_to_list(values))
+        else:
+            lists.append(values.tolist())
+    return [dict(zip(names, row)) for row in zip(*lists)]
+
+
+def arrow_ipc(data):
+    """
+    列式数据编码为 Arrow IPC stream（批量下载用）
+
+    需要安装 pyarrow
+    """
+    if pa is None:
+        raise SerializationError("Arrow格式需要安装 pyarrow")
+    table = pa.table({name: pa.array(values, from_pandas=True) for name, values in data.items()})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
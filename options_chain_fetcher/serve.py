@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dashboard生产模式启动脚本
+使用多进程/多线程WSGI服务器代替Flask开发服务器：
+- 启动时预加载所有标的的快照缓存
+- 后台线程监视数据文件，新快照写入完成后平滑替换缓存，无需重启
+
+用法:
+    python serve.py                          # 自动选择服务器
+    python serve.py --server gunicorn --workers 4 --threads 8
+    python serve.py --server waitress --threads 16   # Windows
+"""
+
+import argparse
+import os
+import sys
+
+from dashboard import app, TICKERS
+from snapshot import DATA_DIR, SnapshotWatcher, preload_snapshots
+
+
+def start_snapshot_cache(interval, settle):
+    """预加载快照并启动监视线程（每个工作进程各执行一次）"""
+    loaded = preload_snapshots(TICKERS, DATA_DIR)
+    print(f"[pid {os.getpid()}] 已预加载快照: {', '.join(loaded) if loaded else '无'}")
+    watcher = SnapshotWatcher(TICKERS, DATA_DIR, interval=interval, settle=settle)
+    watcher.start()
+    return watcher
+
+
+def run_waitress(args):
+    from waitress import serve
+    start_snapshot_cache(args.watch_interval, args.settle)
+    serve(app, host=args.host, port=args.port, threads=args.threads)
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    def post_worker_init(worker):
+        # 监视线程不能跨fork继承，在每个worker中启动
+        start_snapshot_cache(args.watch_interval, args.settle)
+
+    # 在master中预加载一次，fork后的worker共享已解析的快照页面
+    preload_snapshots(TICKERS, DATA_DIR)
+
+    options = {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'graceful_timeout': 30,
+        'post_worker_init': post_worker_init,
+        'accesslog': '-' if args.access_log else None,
+    }
+    DashboardApplication(options).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='期权数据Dashboard生产模式')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress'], default='auto')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='gunicorn进程数')
+    parser.add_argument('--threads', type=int, default=8, help='每个进程的线程数')
+    parser.add_argument('--watch-interval', type=float, default=5.0, help='检查新快照的间隔（秒）')
+    parser.add_argument('--settle', type=float, default=2.0, help='文件修改后等待写入完成的时间（秒）')
+    parser.add_argument('--access-log', action='store_true', help='输出访问日志（仅gunicorn）')
+    args = parser.parse_args()
+
+    server = args.server
+    if server == 'auto':
+        # gunicorn不支持Windows
+        server = 'waitress' if sys.platform == 'win32' else 'gunicorn'
+
+    print("\n" + "="*60)
+    print(f"期权数据Dashboard生产模式 ({server})")
+    print("="*60)
+    print(f"\n访问地址: http://localhost:{args.port}")
+    print("按 Ctrl+C 停止服务器\n")
+
+    try:
+        if server == 'gunicorn':
+            run_gunicorn(args)
+        else:
+            run_waitress(args)
+    except ImportError as e:
+        print(f"无法启动 {server}: {e}")
+        print("请先安装: pip install gunicorn  (Windows: pip install waitress)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+期权快照内存缓存
+每个标的的 options_with_greeks.csv 和 stock_info.json 只解析一次，
+各列转换为类型化的NumPy数组，按文件修改时间自动失效
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import snapshot_archive
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# 需要转换为float64的数值列（CSV中缺失的列会被忽略）
+NUMERIC_COLUMNS = [
+    'strike', 'lastPrice', 'bid', 'ask', 'change', 'percentChange',
+    'volume', 'openInterest', 'impliedVolatility', 'underlyingPrice',
+    'bs_value', 'delta', 'gamma', 'theta', 'vega', 'rho', 'calculated_iv'
+]
+
+# 历史快照归档（布局见 snapshot_archive）: data/<ticker>/archive/<YYYYMMDDTHHMMSS>/
+ARCHIVE_FILES = ['stock_info.json', 'options_with_greeks.csv']
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+# 后台监视线程运行时，请求路径直接使用缓存，不再检查文件修改时间
+_watcher_active = False
+
+# 缓存访问回调 func(ticker, hit)，供运行指标统计命中率
+_cache_listeners = []
+
+
+class OptionSnapshot:
+    """单个标的的期权链快照（只读）"""
+
+    def __init__(self, ticker, info, frame, version):
+        self.ticker = ticker
+        self.info = info
+        self.frame = frame
+        self.version = version
+        self.current_price = float(info['current_price'])
+        self.size = len(frame)
+
+        # 按列保存类型化数组
+        self.columns = {}
+        for col in frame.columns:
+            if col in NUMERIC_COLUMNS:
+                self.columns[col] = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64)
+            else:
+                self.columns[col] = frame[col].to_numpy(dtype=object)
+
+        # 派生列
+        strike = self.columns['strike']
+        self.columns['moneyness'] = strike / self.current_price
+        self.columns['distance_from_atm'] = np.abs(strike - self.current_price)
+
+        self.is_call = self.columns['optionType'] == 'CALL'
+
+        # 到期日索引: 到期日 -> 行号数组（按行权价升序）
+        exp_values = self.columns['expirationDate'].astype(str)
+        order = np.lexsort((strike, exp_values))
+        uniques, starts = np.unique(exp_values[order], return_index=True)
+        bounds = list(starts) + [len(order)]
+        self.expiration_index = {
+            exp: order[bounds[i]:bounds[i + 1]] for i, exp in enumerate(uniques.tolist())
+        }
+        self.expirations = sorted(self.expiration_index)
+
+    def column(self, name):
+        """按名称获取列数组"""
+        return self.columns[name]
+
+    def has_column(self, name):
+        return name in self.columns
+
+    def rows_for_expirations(self, expirations):
+        """指定到期日的行号（不存在的到期日忽略）"""
+        parts = [self.expiration_index[exp] for exp in expirations if exp in self.expiration_index]
+        if not parts:
+            return np.array([], dtype=np.intp)
+        return np.concatenate(parts)
+
+
+def _file_version(*paths):
+    """用文件的修改时间生成快照版本号，任一文件缺失则返回None"""
+    stamps = []
+    for path in paths:
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            return None
+    return '-'.join(str(s) for s in stamps)
+
+
+def snapshot_version(ticker, data_dir=DATA_DIR):
+    """标的当前数据文件的版本号（只做stat，不解析文件），数据不存在时返回None"""
+    return _file_version(os.path.join(data_dir, ticker, 'options_with_greeks.csv'),
+                         os.path.join(data_dir, ticker, 'stock_info.json'))
+
+
+def load_snapshot(ticker, data_dir=DATA_DIR):
+    """
+    获取标的的最新快照
+
+    文件未变化时直接返回缓存对象；文件更新后重新解析。
+    SnapshotWatcher 运行时直接返回缓存，由监视线程负责重新加载。
+    数据不存在时返回None。
+    """
+    if _watcher_active:
+        snapshot = _cache.get((data_dir, ticker))
+        if snapshot is not None:
+            _notify(ticker, True)
+            return snapshot
+
+    greeks_file = os.path.join(data_dir, ticker, 'options_with_greeks.csv')
+    info_file = os.path.join(data_dir, ticker, 'stock_info.json')
+
+    version = _file_version(greeks_file, info_file)
+    if version is None:
+        return None
+
+    key = (data_dir, ticker)
+    snapshot = _cache.get(key)
+    if snapshot is not None and snapshot.version == version:
+        _notify(ticker, True)
+        return snapshot
+    _notify(ticker, False)
+    return _reload(key, greeks_file, info_file, version)
+
+
+def add_cache_listener(func):
+    """注册缓存访问回调 func(ticker, hit)"""
+    if func not in _cache_listeners:
+        _cache_listeners.append(func)
+
+
+def _notify(ticker, hit):
+    for func in _cache_listeners:
+        func(ticker, hit)
+
+
+def _reload(key, greeks_file, info_file, version):
+    """解析文件并替换缓存；正在处理的请求继续持有旧快照对象"""
+    ticker = key[1]
+
+    with _cache_lock:
+        # 其他线程可能已完成加载
+        snapshot = _cache.get(key)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with open(info_file, 'r') as f:
+            info = json.load(f)
+        frame = pd.read_csv(greeks_file)
+        snapshot = OptionSnapshot(ticker, info, frame, version)
+        _cache[key] = snapshot
+        return snapshot
+
+
+def archive_snapshot(ticker, data_dir=DATA_DIR):
+    """
+    把当前快照复制到归档目录，供历史时间序列使用
+
+    目录名取自 stock_info.json 的时间戳，同一时间戳只归档一次。
+    返回归档目录，数据不存在时返回None
+    """
+    ticker_dir = os.path.join(data_dir, ticker)
+    info_file = os.path.join(ticker_dir, 'stock_info.json')
+    if not all(os.path.exists(os.path.join(ticker_dir, name)) for name in ARCHIVE_FILES):
+        return None
+
+    with open(info_file, 'r') as f:
+        info = json.load(f)
+    name = snapshot_archive.archive_name(datetime.fromisoformat(info['timestamp']))
+    return snapshot_archive.create_archive(ticker_dir, name, ARCHIVE_FILES)
+
+
+def preload_snapshots(tickers, data_dir=DATA_DIR):
+    """启动时预先加载所有标的的快照，返回成功加载的标的列表"""
+    loaded = []
+    for ticker in tickers:
+        try:
+            if load_snapshot(ticker, data_dir) is not None:
+                loaded.append(ticker)
+        except Exception as e:
+            print(f"预加载 {ticker} 快照失败: {e}")
+    return loaded
+
+
+class SnapshotWatcher(threading.Thread):
+    """
+    后台快照监视线程
+
+    定期检查数据文件的修改时间，文件写入完成（修改时间稳定超过 settle 秒）后
+    在后台重新解析并原子替换缓存，请求路径不承担解析开销
+    """
+
+    def __init__(self, tickers, data_dir=DATA_DIR, interval=5.0, settle=2.0):
+        super().__init__(name='snapshot-watcher', daemon=True)
+        self.tickers = list(tickers)
+        self.data_dir = data_dir
+        self.interval = interval
+        self.settle = settle
+        self._stop_event = threading.Event()
+
+    def check_once(self):
+        """检查一次所有标的，返回本次重新加载的标的列表"""
+        reloaded = []
+        now_ns = time.time_ns()
+        for ticker in self.tickers:
+            key = (self.data_dir, ticker)
+            greeks_file = os.path.join(self.data_dir, ticker, 'options_with_greeks.csv')
+            info_file = os.path.join(self.data_dir, ticker, 'stock_info.json')
+            version = _file_version(greeks_file, info_file)
+            if version is None:
+                continue
+            current = _cache.get(key)
+            if current is not None and current.version == version:
+                continue
+            # 文件仍在写入时等待下一轮
+            newest = max(int(stamp) for stamp in version.split('-'))
+            if now_ns - newest < self.settle * 1e9:
+                continue
+            try:
+                _reload(key, greeks_file, info_file, version)
+                reloaded.append(ticker)
+            except Exception as e:
+                print(f"重新加载 {ticker} 快照失败: {e}")
+        return reloaded
+
+    def run(self):
+        global _watcher_active
+        _watcher_active = True
+        try:
+            while not self._stop_event.wait(self.interval):
+                for ticker in self.check_once():
+                    print(f"已加载 {ticker} 的新快照")
+        finally:
+            _watcher_active = False
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+波动率曲面
+每个快照预先计算一次 moneyness × 到期天数 的IV网格和Greeks网格，
+支持紧凑的二进制编码（float32），浏览器用几KB数据即可绘制3D曲面或热力图
+"""
+
+import struct
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# moneyness（行权价/现价）网格
+MONEYNESS_GRID = np.round(np.arange(0.70, 1.3001, 0.025), 3)
+
+SURFACE_FIELDS = ['impliedVolatility', 'delta', 'gamma', 'theta', 'vega']
+
+# otm: 行权价低于现价用Put、高于现价用Call（构建IV曲面的常用做法）
+SIDES = ['otm', 'call', 'put']
+
+BINARY_MAGIC = b'VSRF'
+BINARY_VERSION = 1
+BINARY_MIMETYPE = 'application/octet-stream'
+
+_surface_cache = {}
+_surface_lock = threading.Lock()
+
+
+def _side_mask(is_call, moneyness, side):
+    if side == 'call':
+        return is_call
+    if side == 'put':
+        return ~is_call
+    return (is_call & (moneyness >= 1.0)) | (~is_call & (moneyness < 1.0))
+
+
+def build_surface(snapshot, moneyness_grid=MONEYNESS_GRID):
+    """
+    从快照构建曲面网格
+
+    返回:
+        dict: moneyness（列坐标）、tenor（行坐标，到期天数）、expirations、
+              grids[side][field] -> 形状为 (len(tenor), len(moneyness)) 的float32数组，
+              超出该到期日行权价范围的格子为NaN（不外推）
+    """
+    asof = pd.Timestamp(datetime.fromisoformat(snapshot.info['timestamp'])).normalize()
+    expirations = snapshot.expirations
+    tenors = np.array([(pd.Timestamp(exp) - asof).days for exp in expirations], dtype=np.float64)
+    keep = tenors > 0
+    expirations = [exp for exp, k in zip(expirations, keep) if k]
+    tenors = tenors[keep]
+
+    moneyness = snapshot.column('moneyness')
+    exp_col = snapshot.column('expirationDate')
+    iv = snapshot.column('impliedVolatility')
+    valid_iv = iv > 0
+
+    grids = {}
+    for side in SIDES:
+        side_mask = _side_mask(snapshot.is_call, moneyness, side) & valid_iv
+        grids[side] = {}
+        for field in SURFACE_FIELDS:
+            if not snapshot.has_column(field):
+                continue
+            values = snapshot.column(field)
+            grid = np.full((len(tenors), len(moneyness_grid)), np.nan, dtype=np.float32)
+            for i, exp in enumerate(expirations):
+                rows = np.flatnonzero(side_mask & (exp_col == exp) & ~np.isnan(values))
+                if len(rows) < 2:
+                    continue
+                order = np.argsort(moneyness[rows])
+                m = moneyness[rows][order]
+                v = values[rows][order]
+                grid[i] = np.interp(moneyness_grid, m, v, left=np.nan, right=np.nan)
+            grids[side][field] = grid
+
+    return {
+        'ticker': snapshot.ticker,
+        'version': snapshot.version,
+        'current_price': snapshot.current_price,
+        'moneyness': moneyness_grid.astype(np.float32),
+        'tenor': tenors.astype(np.float32),
+        'expirations': expirations,
+        'grids': grids,
+    }
+
+
+def get_surface(snapshot):
+    """获取快照对应的曲面（每个快照版本只计算一次）"""
+    cached = _surface_cache.get(snapshot.ticker)
+    if cached is not None and cached['version'] == snapshot.version:
+        return cached
+    with _surface_lock:
+        cached = _surface_cache.get(snapshot.ticker)
+        if cached is None or cached['version'] != snapshot.version:
+            cached = build_surface(snapshot)
+            _surface_cache[snapshot.ticker] = cached
+        return cached
+
+
+def encode_binary(surface, side, fields):
+    """
+    二进制编码（小端序）:
+        4s   魔数 'VSRF'
+        B    版本号
+        B    字段数
+        H    moneyness点数 M
+        H    期限点数 T
+        f    现价
+        M*f  moneyness坐标
+        T*f  期限坐标（天）
+        每个字段: B 名称长度 + 名称(ASCII) + T*M*f 网格（按行展开，缺失为NaN）
+    """
+    m = surface['moneyness']
+    t = surface['tenor']
+    parts = [
+        struct.pack('<4sBBHHf', BINARY_MAGIC, BINARY_VERSION, len(fields), len(m), len(t), surface['current_price']),
+        m.astype('<f4').tobytes(),
+        t.astype('<f4').tobytes(),
+    ]
+    for field in fields:
+        name = field.encode('ascii')
+        parts.append(struct.pack('<B', len(name)) + name)
+        parts.append(surface['grids'][side][field].astype('<f4').tobytes())
+    return b''.join(parts)
+
+
+def decode_binary(data):
+    """解码 encode_binary 的结果（用于测试和Python客户端）"""
+    magic, version, num_fields, num_m, num_t, price = struct.unpack_from('<4sBBHHf', data, 0)
+    if magic != BINARY_MAGIC:
+        raise ValueError("不是曲面二进制数据")
+    offset = struct.calcsize('<4sBBHHf')
+    m = np.frombuffer(data, '<f4', num_m, offset)
+    offset += 4 * num_m
+    t = np.frombuffer(data, '<f4', num_t, offset)
+    offset += 4 * num_t
+    grids = {}
+    for _ in range(num_fields):
+        length = data[offset]
+        name = data[offset + 1:offset + 1 + length].decode('ascii')
+        offset += 1 + length
+        grids[name] = np.frombuffer(data, '<f4', num_t * num_m, offset).reshape(num_t, num_m)
+        offset += 4 * num_t * num_m
+    return {'version': version, 'current_price': price, 'moneyness': m, 'tenor': t, 'grids': grids}
@@ -4,147 +4,296 @@
 """
 数据查看工具
 快速查看下载的期权数据和Greeks
+
+每个标的的数据只加载一次（snapshot.OptionSnapshot，按到期日建立索引），
+摘要、平值期权和任意条件查询都在同一份内存数据上完成
+
+用法:
+    python view_data.py                                  # 所有标的的摘要和最近到期日的平值期权
+    python view_data.py NVDA --expiration 2025-01-17     # 指定到期日的平值期权
+    python view_data.py query --type put --moneyness 0.9 1.0 --delta -0.3 -0.1 --min-oi 500
+    python view_data.py query NVDA QQQ --sort=-openInterest --format csv > out.csv
+    python view_data.py monitor NVDA QQQ IBIT --interval 2        # 终端实时监控
 """
 
-import pandas as pd
-import json
+import argparse
 import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from snapshot import DATA_DIR, load_snapshot
+from chain_query import DEFAULT_COLUMNS, QueryError, parse_query_args, query_chain
+import serializers
+
+DEFAULT_TICKERS = ["NVDA", "QQQ", "IBIT"]
+
+ATM_COLUMNS = ['strike', 'lastPrice', 'bid', 'ask', 'volume',
+               'impliedVolatility', 'delta', 'gamma', 'theta', 'vega']
 
-def display_stock_info(ticker):
+
+def list_universe():
+    """数据目录中所有有快照的标的"""
+    if not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(d for d in os.listdir(DATA_DIR)
+                  if os.path.exists(os.path.join(DATA_DIR, d, 'options_with_greeks.csv')))
+
+
+def display_stock_info(snapshot):
     """显示股票基本信息"""
-    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", ticker)
-    stock_info_file = os.path.join(data_dir, 'stock_info.json')
-    
-    if not os.path.exists(stock_info_file):
-        print(f"找不到 {ticker} 的数据")
-        return
-    
-    with open(stock_info_file, 'r') as f:
-        info = json.load(f)
-    
+    info = snapshot.info
+
     print(f"\n{'='*60}")
-    print(f"{ticker} - 股票信息")
+    print(f"{snapshot.ticker} - 股票信息")
     print(f"{'='*60}")
     print(f"当前股价: ${info['current_price']:.2f}")
     print(f"更新时间: {info['timestamp']}")
-    
+
     print(f"\n历史波动率 (HV):")
     for key, val in info['historical_volatility'].items():
         print(f"  {key}: {val*100:.2f}%")
-    
+
     print(f"\n实现波动率 (RV):")
     for key, val in info['realized_volatility'].items():
         print(f"  {key}: {val*100:.2f}%")
 
-def display_options_summary(ticker):
+
+def display_options_summary(snapshot):
     """显示期权数据摘要"""
-    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", ticker)
-    greeks_file = os.path.join(data_dir, 'options_with_greeks.csv')
-    
-    if not os.path.exists(greeks_file):
-        print(f"找不到 {ticker} 的期权数据")
-        return
-    
-    df = pd.read_csv(greeks_file)
-    
+    delta = snapshot.column('delta')
+    iv = snapshot.column('impliedVolatility')
+    is_call = snapshot.is_call
+
     print(f"\n期权数据摘要:")
-    print(f"  总期权数: {len(df)}")
-    print(f"  看涨期权: {len(df[df['optionType']=='CALL'])}")
-    print(f"  看跌期权: {len(df[df['optionType']=='PUT'])}")
-    print(f"  到期日数量: {df['expirationDate'].nunique()}")
-    
+    print(f"  总期权数: {snapshot.size}")
+    print(f"  看涨期权: {int(is_call.sum())}")
+    print(f"  看跌期权: {int((~is_call).sum())}")
+    print(f"  到期日数量: {len(snapshot.expirations)}")
+
     print(f"\nGreeks统计 (非零值):")
-    
+
     # 过滤掉零值和无效值
-    valid_df = df[(df['delta'].notna()) & (df['delta'] != 0)]
-    
-    if len(valid_df) > 0:
+    valid = ~np.isnan(delta) & (delta != 0)
+
+    if valid.any():
         print(f"\nDelta:")
-        print(f"  Call平均: {valid_df[valid_df['optionType']=='CALL']['delta'].mean():.4f}")
-        print(f"  Put平均: {valid_df[valid_df['optionType']=='PUT']['delta'].mean():.4f}")
-        
-        print(f"\nGamma (平均): {valid_df['gamma'].mean():.6f}")
-        print(f"Theta (平均): {valid_df['theta'].mean():.4f}")
-        print(f"Vega (平均): {valid_df['vega'].mean():.4f}")
-    
+        print(f"  Call平均: {np.mean(delta[valid & is_call]) if (valid & is_call).any() else np.nan:.4f}")
+        print(f"  Put平均: {np.mean(delta[valid & ~is_call]) if (valid & ~is_call).any() else np.nan:.4f}")
+
+        print(f"\nGamma (平均): {np.nanmean(snapshot.column('gamma')[valid]):.6f}")
+        print(f"Theta (平均): {np.nanmean(snapshot.column('theta')[valid]):.4f}")
+        print(f"Vega (平均): {np.nanmean(snapshot.column('vega')[valid]):.4f}")
+
     # 显示隐含波动率分布
-    iv_data = df[df['impliedVolatility'].notna() & (df['impliedVolatility'] > 0)]
-    if len(iv_data) > 0:
+    iv_valid = iv[iv > 0]
+    if len(iv_valid) > 0:
         print(f"\n隐含波动率 (IV):")
-        print(f"  平均: {iv_data['impliedVolatility'].mean()*100:.2f}%")
-        print(f"  中位数: {iv_data['impliedVolatility'].median()*100:.2f}%")
-        print(f"  最小: {iv_data['impliedVolatility'].min()*100:.2f}%")
-        print(f"  最大: {iv_data['impliedVolatility'].max()*100:.2f}%")
-
-def show_atm_options(ticker, num_strikes=5):
-    """显示平值附近的期权"""
-    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", ticker)
-    greeks_file = os.path.join(data_dir, 'options_with_greeks.csv')
-    stock_info_file = os.path.join(data_dir, 'stock_info.json')
-    
-    if not os.path.exists(greeks_file) or not os.path.exists(stock_info_file):
-        print(f"找不到 {ticker} 的完整数据")
+        print(f"  平均: {iv_valid.mean()*100:.2f}%")
+        print(f"  中位数: {np.median(iv_valid)*100:.2f}%")
+        print(f"  最小: {iv_valid.min()*100:.2f}%")
+        print(f"  最大: {iv_valid.max()*100:.2f}%")
+
+
+def _set_display_options():
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.width', None)
+    pd.set_option('display.float_format', lambda x: f'{x:.4f}' if abs(x) < 1 else f'{x:.2f}')
+
+
+def show_atm_options(snapshot, num_strikes=5, expiration=None):
+    """显示平值附近的期权（默认最近的到期日）"""
+    if not snapshot.expirations:
+        print(f"{snapshot.ticker} 没有期权数据")
+        return
+    expiration = expiration or snapshot.expirations[0]
+    if expiration not in snapshot.expiration_index:
+        print(f"{snapshot.ticker} 没有到期日 {expiration}，可用: {', '.join(snapshot.expirations)}")
         return
-    
-    with open(stock_info_file, 'r') as f:
-        info = json.load(f)
-    
-    current_price = info['current_price']
-    df = pd.read_csv(greeks_file)
-    
-    # 找到第一个到期日的期权
-    first_exp = df['expirationDate'].min()
-    exp_df = df[df['expirationDate'] == first_exp].copy()
-    
-    # 计算距离平值的距离
-    exp_df['distance_from_atm'] = abs(exp_df['strike'] - current_price)
-    
-    # 排序并选择最接近平值的期权
-    exp_df = exp_df.sort_values('distance_from_atm')
-    
+
+    rows = snapshot.expiration_index[expiration]
+    distance = snapshot.column('distance_from_atm')
+
     print(f"\n{'='*60}")
-    print(f"{ticker} - 平值附近期权 (到期日: {first_exp})")
-    print(f"当前股价: ${current_price:.2f}")
+    print(f"{snapshot.ticker} - 平值附近期权 (到期日: {expiration})")
+    print(f"当前股价: ${snapshot.current_price:.2f}")
     print(f"{'='*60}")
-    
+
+    available_cols = [col for col in ATM_COLUMNS if snapshot.has_column(col)]
+    _set_display_options()
+
     # 分别显示Call和Put
-    for opt_type in ['CALL', 'PUT']:
+    for opt_type, type_mask in [('CALL', snapshot.is_call), ('PUT', ~snapshot.is_call)]:
         print(f"\n{opt_type}期权:")
-        type_df = exp_df[exp_df['optionType'] == opt_type].head(num_strikes)
-        
-        display_cols = ['strike', 'lastPrice', 'bid', 'ask', 'volume', 
-                       'impliedVolatility', 'delta', 'gamma', 'theta', 'vega']
-        
-        # 选择存在的列
-        available_cols = [col for col in display_cols if col in type_df.columns]
-        
-        if len(type_df) > 0:
-            pd.set_option('display.max_columns', None)
-            pd.set_option('display.width', None)
-            pd.set_option('display.float_format', lambda x: f'{x:.4f}' if abs(x) < 1 else f'{x:.2f}')
-            print(type_df[available_cols].to_string(index=False))
-
-def main():
-    """主函数：显示所有标的的数据"""
-    tickers = ["NVDA", "QQQ", "IBIT"]
-    
+        type_rows = rows[type_mask[rows]]
+        # 按距离平值排序并选择最接近平值的期权
+        type_rows = type_rows[np.argsort(distance[type_rows], kind='stable')][:num_strikes]
+
+        if len(type_rows) > 0:
+            table = pd.DataFrame({col: snapshot.column(col)[type_rows] for col in available_cols})
+            print(table.to_string(index=False))
+
+
+def run_summary(args):
+    """默认模式：显示每个标的的摘要"""
+    tickers = args.tickers or DEFAULT_TICKERS
+
     print("="*60)
     print("期权链数据查看器")
     print("="*60)
-    
+
     for ticker in tickers:
         try:
-            display_stock_info(ticker)
-            display_options_summary(ticker)
-            show_atm_options(ticker)
+            snapshot = load_snapshot(ticker)
+            if snapshot is None:
+                print(f"\n找不到 {ticker} 的完整数据")
+                continue
+            display_stock_info(snapshot)
+            display_options_summary(snapshot)
+            show_atm_options(snapshot, args.strikes, args.expiration)
             print("\n")
         except Exception as e:
             print(f"\n查看 {ticker} 数据时出错: {e}")
             continue
-    
+
     print("="*60)
     print("提示: 详细数据请查看 data/ 目录下的CSV文件")
     print("="*60)
 
+
+def build_query_args(args):
+    """把命令行参数转换为 chain_query.parse_query_args 的参数"""
+    query_args = {}
+    if args.columns:
+        query_args['columns'] = args.columns
+    if args.expiration:
+        query_args['expiration'] = args.expiration
+    if args.type:
+        query_args['type'] = args.type
+    if args.delta:
+        query_args['delta_min'], query_args['delta_max'] = (str(v) for v in args.delta)
+    if args.moneyness:
+        query_args['moneyness_min'], query_args['moneyness_max'] = (str(v) for v in args.moneyness)
+    if args.min_oi is not None:
+        query_args['min_oi'] = str(args.min_oi)
+    if args.min_volume is not None:
+        query_args['min_volume'] = str(args.min_volume)
+    if args.sort:
+        query_args['sort'] = args.sort
+    return query_args
+
+
+def run_query(args):
+    """查询模式：在所有（或指定）标的上执行筛选"""
+    tickers = args.tickers or list_universe()
+    try:
+        query = parse_query_args(build_query_args(args))
+    except QueryError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    # 命令行不分页
+    query['limit'] = sys.maxsize
+    # 多个标的合并后要按排序键重新排序，排序键不在输出列中时也要取出来，输出前再去掉
+    output_columns = list(query['columns'])
+    query['columns'] = output_columns + [name for name, _ in query['sort'] if name not in output_columns]
+
+    frames = []
+    for ticker in tickers:
+        snapshot = load_snapshot(ticker)
+        if snapshot is None:
+            print(f"找不到 {ticker} 的数据", file=sys.stderr)
+            continue
+        try:
+            result = query_chain(snapshot, query)
+        except QueryError as e:
+            print(f"{ticker}: {e}", file=sys.stderr)
+            continue
+        if result['total'] == 0:
+            continue
+        frame = pd.DataFrame(result['data'], columns=result['columns'])
+        frame.insert(0, 'ticker', ticker)
+        frames.append(frame)
+
+    if not frames:
+        print("没有符合条件的期权", file=sys.stderr)
+        return 1
+
+    table = pd.concat(frames, ignore_index=True)
+    if query['sort'] and len(frames) > 1:
+        # 多个标的合并后重新排序
+        table = table.sort_values([name for name, _ in query['sort']],
+                                  ascending=[not desc for _, desc in query['sort']],
+                                  kind='stable', na_position='last')
+    table = table[['ticker'] + output_columns]
+    if args.limit:
+        table = table.head(args.limit)
+
+    if args.format == 'csv':
+        table.to_csv(sys.stdout, index=False)
+    elif args.format == 'json':
+        sys.stdout.write(serializers.dumps(serializers.columns_from_frame(table)).decode('utf-8') + '\n')
+    else:
+        _set_display_options()
+        print(table.to_string(index=False))
+        print(f"\n共 {len(table)} 条")
+    return 0
+
+
+def run_monitor(args):
+    """监控模式：有新快照时刷新终端"""
+    from monitor import run_monitor as start_monitor
+    tickers = args.tickers or DEFAULT_TICKERS
+    start_monitor(tickers, args.interval, args.strikes, args.expiration_index)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='期权链数据查看器')
+    parser.add_argument('tickers', nargs='*', help=f'标的代码（默认 {" ".join(DEFAULT_TICKERS)}）')
+    parser.add_argument('--expiration', help='显示平值期权的到期日（默认最近到期日）')
+    parser.add_argument('--strikes', type=int, default=5, help='每种类型显示的平值期权数量')
+    parser.set_defaults(func=run_summary)
+    return parser
+
+
+def build_query_parser():
+    parser = argparse.ArgumentParser(prog='view_data.py query', description='期权条件查询')
+    parser.add_argument('tickers', nargs='*', help='标的代码（默认 data/ 下所有标的）')
+    parser.add_argument('--expiration', help='到期日，逗号分隔')
+    parser.add_argument('--type', choices=['call', 'put'])
+    parser.add_argument('--moneyness', nargs=2, type=float, metavar=('MIN', 'MAX'), help='行权价/现价 范围')
+    parser.add_argument('--delta', nargs=2, type=float, metavar=('MIN', 'MAX'), help='Delta范围')
+    parser.add_argument('--min-oi', type=float, help='最小持仓量')
+    parser.add_argument('--min-volume', type=float, help='最小成交量')
+    parser.add_argument('--columns', default=','.join(DEFAULT_COLUMNS), help='输出列，逗号分隔')
+    parser.add_argument('--sort', help='排序键，逗号分隔，"-"前缀降序（负号开头时写成 --sort=-volume）')
+    parser.add_argument('--limit', type=int, help='最多输出行数')
+    parser.add_argument('--format', choices=['table', 'csv', 'json'], default='table')
+    parser.set_defaults(func=run_query)
+    return parser
+
+
+def build_monitor_parser():
+    parser = argparse.ArgumentParser(prog='view_data.py monitor', description='终端实时监控')
+    parser.add_argument('tickers', nargs='*', help=f'自选标的（默认 {" ".join(DEFAULT_TICKERS)}）')
+    parser.add_argument('--interval', type=float, default=2.0, help='检查新快照的间隔（秒）')
+    parser.add_argument('--strikes', type=int, default=5, help='平值上下各显示的行权价数量')
+    parser.add_argument('--expiration-index', type=int, default=0, help='显示第几个到期日（0为最近）')
+    parser.set_defaults(func=run_monitor)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'query':
+        args = build_query_parser().parse_args(argv[1:])
+    elif argv and argv[0] == 'monitor':
+        args = build_monitor_parser().parse_args(argv[1:])
+    else:
+        args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地价格库
+各目录的脚本共用一份 yfinance 日线数据缓存：每个代码一个列式文件（npz，每列一个数组），
+第一次下载全部历史，之后只下载最后一个缓存日期之后的部分。
+
+复权检查: 增量下载时从缓存最后 OVERLAP_ROWS 个交易日开始下载（最后一行可能是盘中数据，不参与比较），
+与缓存中相同日期的数据比较校验和。拆股或新的分红会改变整段复权价格，校验和不一致时重新下载全部历史。
+文件本身也保存校验和，读取时校验失败（文件损坏）同样重新下载
+
+用法:
+    import price_store
+    hist = price_store.get_history('^GSPC', start='1974-01-01')
+"""
+
+import os
+import json
+import time
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# 缓存有效期（秒）：有效期内直接读本地文件，不访问网络
+DEFAULT_MAX_AGE = 12 * 3600
+
+# 增量下载时与缓存重叠的交易日数，用来检查复权是否变化
+OVERLAP_ROWS = 5
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# 校验和使用的价格列和精度（小数位）
+CHECKSUM_COLUMNS = ['Open', 'High', 'Low', 'Close']
+CHECKSUM_DECIMALS = 4
+
+
+def _normalize(hist):
+    """统一为不带时区的日期索引和固定的列"""
+    hist = hist.copy()
+    if isinstance(hist.columns, pd.MultiIndex):
+        hist.columns = hist.columns.get_level_values(0)
+    index = pd.DatetimeIndex(hist.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    hist.index = index.normalize().as_unit('ns').rename('Date')
+    for column in COLUMNS:
+        if column not in hist.columns:
+            hist[column] = 0.0 if column in ('Dividends', 'Stock Splits') else np.nan
+    hist = hist[COLUMNS].astype(np.float64)
+    return hist[~hist.index.duplicated(keep='last')].sort_index()
+
+
+def fetch_yfinance(symbol, start=None):
+    """从 yfinance 下载复权后的日线（start 为None时下载全部历史）"""
+    if yf is None:
+        raise ImportError('需要安装 yfinance 才能下载价格数据')
+    ticker = yf.Ticker(symbol)
+    if start is None:
+        hist = ticker.history(period='max', auto_adjust=True)
+    else:
+        hist = ticker.history(start=pd.Timestamp(start).strftime('%Y-%m-%d'), auto_adjust=True)
+    return _normalize(hist)
+
+
+def checksum(hist):
+    """价格列按固定精度取整后的校验和（日期也计入）"""
+    digest = hashlib.sha256(hist.index.as_unit('ns').asi8.tobytes())
+    values = np.round(hist[CHECKSUM_COLUMNS].to_numpy(dtype=np.float64), CHECKSUM_DECIMALS)
+    digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+class PriceStore:
+    """
+    价格库
+
+    参数:
+        root: 存放 <代码>.npz 的目录
+        max_age: 缓存有效期（秒），0 表示每次都检查新数据
+        fetch: 下载函数 fetch(symbol, start) -> DataFrame，默认 fetch_yfinance
+    """
+
+    def __init__(self, root=DEFAULT_DIR, max_age=DEFAULT_MAX_AGE, fetch=fetch_yfinance):
+        self.root = root
+        self.max_age = max_age
+        self.fetch = fetch
+
+    def path(self, symbol):
+        return os.path.join(self.root, symbol.replace('/', '_') + '.npz')
+
+    def load(self, symbol):
+        """读取缓存，返回 (DataFrame, 元数据)；没有缓存或校验失败时返回 (None, None)"""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                hist = pd.DataFrame({column: data[column] for column in COLUMNS},
+                                    index=pd.DatetimeIndex(data['date'].astype('datetime64[ns]'), name='Date'))
+        except Exception as e:
+            print(f"读取 {symbol} 的价格缓存失败: {e}")
+            return None, None
+        if meta.get('checksum') != checksum(hist):
+            print(f"{symbol} 的价格缓存校验失败，重新下载")
+            return None, None
+        return hist, meta
+
+    def save(self, symbol, hist):
+        """写入缓存（先写临时文件再替换，中断时不会留下半个文件）"""
+        os.makedirs(self.root, exist_ok=True)
+        meta = {'symbol': symbol, 'fetched_at': time.time(), 'rows': len(hist), 'checksum': checksum(hist)}
+        arrays = {column: hist[column].to_numpy(dtype=np.float64) for column in COLUMNS}
+        path = self.path(symbol)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, date=hist.index.as_unit('ns').asi8, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+        return meta
+
+    def update(self, symbol, cached=None):
+        """下载缓存之后的新数据并合并；没有缓存或复权发生变化时下载全部历史"""
+        if cached is None or cached.empty:
+            hist = self.fetch(symbol, None)
+            self.save(symbol, hist)
+            return hist
+
+        # 最后一行可能是盘中数据，不参与比较，用新数据替换
+        overlap = cached.iloc[-OVERLAP_ROWS - 1:-1]
+        tail = self.fetch(symbol, cached.index[max(len(cached) - OVERLAP_ROWS - 1, 0)])
+        if tail.empty:
+            hist = cached
+        else:
+            fetched_overlap = tail[tail.index < cached.index[-1]]
+            if not fetched_overlap.index.equals(overlap.index) or checksum(fetched_overlap) != checksum(overlap):
+                print(f"{symbol} 的历史价格已重新复权（拆股或分红），重新下载全部历史")
+                hist = self.fetch(symbol, None)
+            else:
+                hist = pd.concat([cached.iloc[:-1], tail[tail.index >= cached.index[-1]]])
+        self.save(symbol, hist)
+        return hist
+
+    def history(self, symbol, start=None, end=None, offline=False):
+        """
+        日线数据（复权），列为 COLUMNS，索引为不带时区的日期
+
+        start/end 与 yfinance 相同：包含 start，不包含 end。
+        offline=True 时只读本地缓存（没有缓存时返回空表）
+        """
+        hist, meta = self.load(symbol)
+        stale = meta is None or time.time() - meta['fetched_at'] >= self.max_age
+        if stale and not offline:
+            try:
+                hist = self.update(symbol, hist)
+            except Exception as e:
+                if hist is None:
+                    raise
+                print(f"更新 {symbol} 的价格失败，使用本地缓存: {e}")
+        if hist is None:
+            hist = pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype=np.float64)
+
+        if start is not None:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        if end is not None:
+            hist = hist[hist.index < pd.Timestamp(end)]
+        return hist.copy()
+
+
+_default_store = None
+
+
+def get_history(symbol, start=None, end=None, offline=False):
+    """使用默认价格库（price_store/data）读取日线"""
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store.history(symbol, start, end, offline)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+期权数据归档
+options（下载期权链后）和 options_chain_fetcher（计算Greeks后）共用的归档布局:
+
+    <数据目录>/<标的>/archive/<YYYYMMDDTHHMMSS>/
+
+每次归档是一个以时间戳命名的新目录，写入后不再修改；同一天的多次归档各自保留，
+需要按天取数据的一方（期权回测）使用当天最后一次归档。旧版按日期命名的目录（YYYY-MM-DD）仍可读取
+
+用法:
+    import snapshot_archive
+    target = snapshot_archive.create_archive(ticker_dir, snapshot_archive.archive_name(now), files)
+    names = snapshot_archive.list_archives(data_dir, ticker)
+"""
+
+import os
+import json
+import shutil
+from datetime import datetime
+
+ARCHIVE_DIRNAME = 'archive'
+NAME_FORMAT = '%Y%m%dT%H%M%S'
+# 旧版 options/chain_archive.py 按日期命名的归档
+LEGACY_NAME_FORMAT = '%Y-%m-%d'
+
+# 写入中的临时目录和替换时移开的旧目录，列出归档时跳过
+_TMP_SUFFIX = '.tmp'
+_OLD_SUFFIX = '.old'
+
+
+def archive_name(timestamp):
+    """归档目录名（精确到秒）"""
+    return timestamp.strftime(NAME_FORMAT)
+
+
+def archive_time(name):
+    """归档目录名对应的时间"""
+    for fmt in (NAME_FORMAT, LEGACY_NAME_FORMAT):
+        try:
+            return datetime.strptime(name, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的归档目录名: {name}")
+
+
+def archive_dir(data_dir, ticker):
+    return os.path.join(data_dir, ticker, ARCHIVE_DIRNAME)
+
+
+def list_archives(data_dir, ticker):
+    """按时间顺序列出标的的归档目录名"""
+    root = archive_dir(data_dir, ticker)
+    if not os.path.isdir(root):
+        return []
+    names = [name for name in os.listdir(root)
+             if not name.endswith((_TMP_SUFFIX, _OLD_SUFFIX)) and os.path.isdir(os.path.join(root, name))]
+    return sorted(names, key=archive_time)
+
+
+def create_archive(ticker_dir, name, files, info=None, info_name='info.json', replace=False):
+    """
+    把 ticker_dir 下的 files（文件名列表，不存在的跳过）复制到 archive/<name>/
+
+    info 不为None时另外写入 info_name。目录已存在时 replace=False 直接返回（同一份数据只归档一次），
+    replace=True 时用新数据替换。返回归档目录
+
+    先写到临时目录，完成后再改名，读取方不会看到只写了一半的归档。
+    替换已有目录时先把旧目录移开再改名（两次 rename 之间该名称短暂不存在），最后删除旧目录
+    """
+    target = os.path.join(ticker_dir, ARCHIVE_DIRNAME, name)
+    if os.path.isdir(target) and not replace:
+        return target
+
+    tmp_target = target + _TMP_SUFFIX
+    if os.path.isdir(tmp_target):
+        shutil.rmtree(tmp_target)
+    os.makedirs(tmp_target)
+    for file_name in files:
+        path = os.path.join(ticker_dir, file_name)
+        if os.path.exists(path):
+            shutil.copy2(path, os.path.join(tmp_target, file_name))
+    if info is not None:
+        with open(os.path.join(tmp_target, info_name), 'w') as f:
+            json.dump(info, f)
+
+    if not os.path.isdir(target):
+        os.replace(tmp_target, target)
+        return target
+    old_target = target + _OLD_SUFFIX
+    if os.path.isdir(old_target):
+        shutil.rmtree(old_target)
+    os.replace(target, old_target)
+    os.replace(tmp_target, target)
+    shutil.rmtree(old_target)
+    return target
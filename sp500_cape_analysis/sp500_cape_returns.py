@@ -1,4 +1,3 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -9,15 +8,15 @@ from statsmodels.nonparametric.smoothers_lowess import lowess
 import os
 import time
 
+import price_store
+
 def get_sp500_data():
     """获取标普500数据，从1974年开始到现在"""
     max_retries = 5
     for attempt in range(max_retries):
         try:
             print(f"  尝试下载 SP500 数据 (第 {attempt + 1}/{max_retries} 次)...")
-            # 不设置 session，让 yfinance 自己处理
-            ticker = yf.Ticker('^GSPC')
-            sp500 = ticker.history(start='1974-01-01', auto_adjust=True)
+            sp500 = price_store.get_history('^GSPC', start='1974-01-01')
             
             if sp500.empty:
                 raise Exception("获取标普500数据失败")
@@ -11,14 +11,15 @@ import os
 import time
 import io
 
+import price_store
+
 def get_sp500_data():
     """获取标普500数据，从1990年开始到现在"""
     max_retries = 5
     for attempt in range(max_retries):
         try:
             print(f"  尝试下载 SP500 数据 (第 {attempt + 1}/{max_retries} 次)...")
-            ticker = yf.Ticker('^GSPC')
-            sp500 = ticker.history(start='1990-01-01', auto_adjust=True)
+            sp500 = price_store.get_history('^GSPC', start='1990-01-01')
             
             if sp500.empty:
                 raise Exception("获取标普500数据失败")
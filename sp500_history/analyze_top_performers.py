@@ -1,10 +1,11 @@
 import json
 import pandas as pd
-import yfinance as yf
 from datetime import datetime
 import os
 import time
 
+import price_store
+
 def load_historical_components():
     """加载历史成分股数据"""
     file_path = 'data/sp500_historical_components.json'
@@ -18,12 +19,8 @@ def get_stock_data(symbol, year):
         start_date = f"{year}-01-01"
         end_date = f"{year}-12-31"
         
-        df = yf.download(
-            symbol,
-            start=start_date,
-            end=end_date,
-            progress=False
-        )
+        # 全部历史缓存在本地价格库中，各年份共用
+        df = price_store.get_history(symbol, start=start_date, end=end_date)
         
         if df.empty or len(df) < 2:
             print(f"{symbol} 数据不足")